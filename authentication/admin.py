@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import ClerkEvent
 
-# Register your models here.
+
+class ClerkEventAdmin(admin.ModelAdmin):
+    list_display = ('type', 'clerk_user_id', 'occurred_at', 'received_at', 'applied_at')
+    list_filter = ('type',)
+    search_fields = ('=clerk_user_id', '=svix_id')
+    readonly_fields = ('svix_id', 'type', 'clerk_user_id', 'data', 'occurred_at', 'received_at', 'applied_at')
+
+
+admin.site.register(ClerkEvent, ClerkEventAdmin)
@@ -0,0 +1,112 @@
+"""
+Async counterpart of ``ClerkAuthentication`` for the async read views.
+
+JWKS documents and first-sight Clerk user lookups go through one pooled
+``httpx.AsyncClient`` per event loop, so concurrent requests share TLS
+connections instead of opening one each, and the JWKS is cached in
+process for ``JWKS_CACHE_SECONDS``.
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.exceptions import AuthenticationFailed
+
+from server.tracing import span
+from .auth import clerk_user_fields
+
+logger = logging.getLogger(__name__)
+
+JWKS_CACHE_SECONDS = 300
+HTTP_TIMEOUT = httpx.Timeout(5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+_clients = {}
+_jwks = {'keys': {}, 'fetched_at': 0.0}
+
+
+def get_http_client():
+    """The pooled client for the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    return client
+
+
+async def get_signing_key(token):
+    kid = jwt.get_unverified_header(token).get('kid')
+    expired = time.monotonic() - _jwks['fetched_at'] > JWKS_CACHE_SECONDS
+    if expired or kid not in _jwks['keys']:
+        with span('auth.jwks_fetch'):
+            response = await get_http_client().get(settings.CLERK_JWKS_URL)
+            response.raise_for_status()
+        _jwks['keys'] = {
+            key.key_id: key for key in jwt.PyJWKSet.from_dict(response.json()).keys
+        }
+        _jwks['fetched_at'] = time.monotonic()
+    try:
+        return _jwks['keys'][kid]
+    except KeyError:
+        raise AuthenticationFailed('Unknown signing key')
+
+
+async def get_clerk_user_info(user_id):
+    with span('auth.clerk_user', clerk_user_id=user_id):
+        response = await get_http_client().get(
+            f"{settings.CLERK_API_BASE_URL}/users/{user_id}",
+            headers={"Authorization": f"Bearer {settings.CLERK_API_KEY}"},
+        )
+    if response.status_code != 200:
+        raise AuthenticationFailed("Failed to fetch user info from Clerk")
+    return response.json()
+
+
+async def authenticate(request):
+    """
+    Return the Django user for the request's Clerk token, or None when the
+    request carries no bearer token. Raises ``AuthenticationFailed``.
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    token = auth_header.split(' ')[1]
+
+    try:
+        with span('auth.jwks'):
+            signing_key = await get_signing_key(token)
+            payload = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=["RS256"],
+                issuer=settings.CLERK_ISSUER_URL,
+                options={"verify_signature": True, "require_aud": False},
+            )
+    except jwt.InvalidTokenError as e:
+        raise AuthenticationFailed(f'Invalid token: {str(e)}')
+
+    clerk_user_id = payload.get('sub')
+    if not clerk_user_id:
+        raise AuthenticationFailed('Invalid token payload')
+
+    # As in ClerkAuthentication, webhooks keep known users fresh
+    user = await User.objects.filter(username=clerk_user_id).afirst()
+    if user is None:
+        try:
+            user_info = await get_clerk_user_info(clerk_user_id)
+        except httpx.HTTPError as e:
+            raise AuthenticationFailed(f'Authentication failed: {str(e)}')
+
+        with span('auth.user_upsert', clerk_user_id=clerk_user_id):
+            user, _ = await User.objects.aupdate_or_create(
+                username=clerk_user_id,
+                defaults=clerk_user_fields(user_info),
+            )
+    if not user.is_active:
+        raise AuthenticationFailed('User account is disabled')
+    request.auth_token = token
+    return user
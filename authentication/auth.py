@@ -1,4 +1,5 @@
 import jwt
+import logging
 import requests
 from jwt.jwks_client import PyJWKClient
 from django.conf import settings
@@ -6,6 +7,25 @@ from django.contrib.auth.models import User
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
 from functools import lru_cache
+from server.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def clerk_user_fields(user_info):
+    """Local ``User`` fields from a Clerk user object (API response or webhook data)"""
+    addresses = user_info.get('email_addresses') or [{}]
+    primary = next(
+        (a for a in addresses if a.get('id') == user_info.get('primary_email_address_id')),
+        addresses[0],
+    )
+    return {
+        'email': primary.get('email_address', ''),
+        'first_name': user_info.get('first_name') or '',
+        'last_name': user_info.get('last_name') or '',
+        'is_active': True,
+    }
+
 
 class ClerkAuthentication(authentication.BaseAuthentication):
 
@@ -20,7 +40,9 @@ class ClerkAuthentication(authentication.BaseAuthentication):
             "Authorization": f"Bearer {settings.CLERK_API_KEY}"
         }
         url = f"{settings.CLERK_API_BASE_URL}/users/{user_id}"
-        response = requests.get(url, headers=headers)
+        with span('auth.clerk_user', clerk_user_id=user_id) as current:
+            response = requests.get(url, headers=headers)
+            current.set_attribute('status', response.status_code)
         if response.status_code != 200:
             raise AuthenticationFailed("Failed to fetch user info from Clerk")
         return response.json()
@@ -36,63 +58,42 @@ class ClerkAuthentication(authentication.BaseAuthentication):
         token = auth_header.split(' ')[1]
 
         try:
-            jwks_client = self.get_jwks_client()
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
-
-            payload = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["RS256"],
-                issuer=settings.CLERK_ISSUER_URL,
-                options={
-                    "verify_signature": True,
-                    "require_aud": False
-                }
-            )
+            with span('auth.jwks'):
+                jwks_client = self.get_jwks_client()
+                signing_key = jwks_client.get_signing_key_from_jwt(token)
+
+                payload = jwt.decode(
+                    token,
+                    signing_key.key,
+                    algorithms=["RS256"],
+                    issuer=settings.CLERK_ISSUER_URL,
+                    options={
+                        "verify_signature": True,
+                        "require_aud": False
+                    }
+                )
 
             clerk_user_id = payload.get('sub')
             if not clerk_user_id:
                 raise AuthenticationFailed('Invalid token payload')
 
-            # 🔄 Fetch full user info from Clerk
-            user_info = self.get_clerk_user_info(clerk_user_id)
-
-            # print(f"User info: {user_info}")
-
-            email = user_info.get('email_addresses', [{}])[0].get('email_address', '')
-            first_name = user_info.get('first_name') or ''
-            last_name = user_info.get('last_name') or ''
-            user_image = user_info.get('image_url', '')
-
-
-            # print(f"User ID: {clerk_user_id}")
-            # print(f"User Email: {email}")
-            # print(f"User Name: {first_name} {last_name}")
-            # print(f"User Image: {user_image}")
-            
-
-            # 👤 Get or create the Django user
-            user, _ = User.objects.get_or_create(
-                username=clerk_user_id,
-                defaults={
-                    'email': email,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    # 'user_image': user_image
-                }
-            )
-
-            # 🚀 Update the user's information
-            user.email = email
-            user.first_name = first_name
-            user.last_name = last_name
-            # user.user_image = user_image
-
-            try:
-                user.save()
-            except Exception as e:
-                print("Error saving user:", str(e))
-                raise AuthenticationFailed("User creation failed")
+            # Webhooks (authentication.webhooks) keep known users fresh, so
+            # Clerk is only asked about users seen here for the first time
+            user = User.objects.filter(username=clerk_user_id).first()
+            if user is None:
+                user_info = self.get_clerk_user_info(clerk_user_id)
+                with span('auth.user_upsert', clerk_user_id=clerk_user_id):
+                    try:
+                        user, _ = User.objects.update_or_create(
+                            username=clerk_user_id,
+                            defaults=clerk_user_fields(user_info),
+                        )
+                    except Exception as e:
+                        logger.error("Error saving user", extra={'clerk_user_id': clerk_user_id, 'error': str(e)})
+                        raise AuthenticationFailed("User creation failed")
+
+            if not user.is_active:
+                raise AuthenticationFailed('User account is disabled')
 
             # print(f"User ID: {user.username}")
             # print(f"User Email: {user.email}")
@@ -0,0 +1,100 @@
+"""
+A local stand-in for Clerk, for load tests and offline development.
+
+``LocalClerk`` generates an RSA key, signs session tokens with it and
+serves the two Clerk endpoints the API calls: the JWKS document and the
+user lookup. Point the server under test at it with::
+
+    CLERK_ISSUER_URL=http://127.0.0.1:<port>
+    CLERK_API_BASE_URL=http://127.0.0.1:<port>
+
+``CLERK_JWKS_URL`` is derived from the issuer. Every user id is known;
+its name and email are made up from the id.
+"""
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+KEY_ID = 'local-clerk'
+TOKEN_LIFETIME = 60 * 60
+
+
+def local_user_info(user_id):
+    """A Clerk user object, as returned by ``GET /users/<id>``"""
+    return {
+        'id': user_id,
+        'first_name': 'Load',
+        'last_name': user_id,
+        'primary_email_address_id': f'idn_{user_id}',
+        'email_addresses': [{'id': f'idn_{user_id}', 'email_address': f'{user_id}@load.local'}],
+    }
+
+
+class LocalClerk:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({'kid': KEY_ID, 'use': 'sig', 'alg': 'RS256'})
+        self.jwks = {'keys': [jwk]}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def token(self, user_id, lifetime=TOKEN_LIFETIME):
+        """A session token for ``user_id``, as the frontend would send it"""
+        now = int(time.time())
+        payload = {'sub': user_id, 'iss': self.url, 'iat': now, 'nbf': now, 'exp': now + lifetime}
+        return jwt.encode(payload, self.private_key, algorithm='RS256', headers={'kid': KEY_ID})
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='local-clerk', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler(self):
+        clerk = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/.well-known/jwks.json':
+                    self.reply(200, clerk.jwks)
+                elif self.path.startswith('/users/') and len(self.path) > len('/users/'):
+                    self.reply(200, local_user_info(self.path[len('/users/'):]))
+                else:
+                    self.reply(404, {'errors': [{'code': 'resource_not_found'}]})
+
+            def reply(self, status, body):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
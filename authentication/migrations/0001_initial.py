@@ -0,0 +1,32 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClerkEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('svix_id', models.CharField(max_length=100, unique=True)),
+                ('type', models.CharField(max_length=50)),
+                ('clerk_user_id', models.CharField(max_length=200)),
+                ('data', models.JSONField()),
+                ('occurred_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['occurred_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('applied_at__isnull', True)), fields=['occurred_at', 'id'], name='clerk_event_pending_idx'), models.Index(fields=['clerk_user_id', 'occurred_at'], name='clerk_event_user_idx')],
+            },
+        ),
+    ]
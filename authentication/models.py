@@ -1,3 +1,28 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 
-# Create your models here.
+
+class ClerkEvent(models.Model):
+    """
+    A Clerk user webhook delivery, applied to the User table in batches by
+    ``authentication.tasks.apply_clerk_events``. Applied rows are kept for a
+    while so redeliveries are recognised by their Svix message id.
+    """
+    svix_id = models.CharField(max_length=100, unique=True)
+    type = models.CharField(max_length=50)
+    clerk_user_id = models.CharField(max_length=200)
+    data = models.JSONField()
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField(default=timezone.now)
+    applied_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['occurred_at', 'id']
+        indexes = [
+            models.Index(fields=['occurred_at', 'id'], name='clerk_event_pending_idx', condition=Q(applied_at__isnull=True)),
+            models.Index(fields=['clerk_user_id', 'occurred_at'], name='clerk_event_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.clerk_user_id}"
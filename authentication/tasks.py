@@ -0,0 +1,66 @@
+"""Applies Clerk webhook deliveries to the User table, see ``authentication.webhooks``"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from taskqueue.queue import task
+from .auth import clerk_user_fields
+from .models import ClerkEvent
+
+APPLY_BATCH_SIZE = 500
+EVENT_RETENTION = timedelta(days=7)
+
+
+@task
+def apply_clerk_events(batch_size=APPLY_BATCH_SIZE):
+    """Apply every pending delivery, a batch of users per statement"""
+    while _apply_batch(batch_size):
+        pass
+    ClerkEvent.objects.filter(
+        applied_at__isnull=False, received_at__lt=timezone.now() - EVENT_RETENTION
+    ).delete()
+
+
+def _apply_batch(batch_size):
+    with transaction.atomic():
+        events = list(
+            ClerkEvent.objects.select_for_update(skip_locked=True)
+            .filter(applied_at__isnull=True)
+            .order_by('occurred_at', 'id')[:batch_size]
+        )
+        if not events:
+            return False
+
+        # Deliveries can arrive out of order; skip any older than what a
+        # previous batch already applied for the same user
+        applied = dict(
+            ClerkEvent.objects.filter(
+                clerk_user_id__in={event.clerk_user_id for event in events},
+                applied_at__isnull=False,
+            ).values('clerk_user_id').annotate(latest=Max('occurred_at')).values_list('clerk_user_id', 'latest')
+        )
+        latest = {}
+        for event in events:
+            newest_applied = applied.get(event.clerk_user_id)
+            if newest_applied is None or event.occurred_at >= newest_applied:
+                latest[event.clerk_user_id] = event
+
+        upserts = [
+            User(username=user_id, **clerk_user_fields(event.data))
+            for user_id, event in latest.items() if event.type != 'user.deleted'
+        ]
+        User.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=['username'],
+            update_fields=['email', 'first_name', 'last_name', 'is_active'],
+        )
+        # Deactivate rather than delete: groups and events reference users
+        deleted = [user_id for user_id, event in latest.items() if event.type == 'user.deleted']
+        User.objects.filter(username__in=deleted).update(is_active=False)
+
+        ClerkEvent.objects.filter(pk__in=[event.pk for event in events]).update(applied_at=timezone.now())
+    return True
@@ -1,3 +1,115 @@
-from django.test import TestCase
+import base64
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from taskqueue.models import Task
+from taskqueue.queue import run_pending
+from .auth import ClerkAuthentication
+from .local_clerk import LocalClerk
+from .models import ClerkEvent
+from .tasks import apply_clerk_events
+from .webhooks import ClerkWebhookSender
+
+SECRET = 'whsec_' + base64.b64encode(b'test-webhook-secret').decode()
+
+
+@override_settings(CLERK_WEBHOOK_SECRET=SECRET)
+class ClerkWebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.sender = ClerkWebhookSender(SECRET)
+        self.url = reverse('clerk-webhook')
+
+    def deliver(self, event, **kwargs):
+        body, headers = self.sender.signed(event, **kwargs)
+        return self.client.post(
+            self.url, body, content_type='application/json',
+            **{'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()},
+        )
+
+    def test_events_are_applied_in_a_batch(self):
+        User.objects.create(username='user_2', email='old@example.com')
+        now = time.time()
+        self.deliver(self.sender.event('user.created', 'user_1', 'one@example.com', 'Ada', timestamp=now))
+        self.deliver(self.sender.event('user.updated', 'user_2', 'new@example.com', 'Bo', timestamp=now))
+        self.deliver(self.sender.event('user.updated', 'user_1', 'one@new.example.com', 'Ada', timestamp=now + 1))
+        self.deliver(self.sender.event('user.deleted', 'user_3', timestamp=now))
+        User.objects.create(username='user_3')
+
+        # One queued run covers every delivery
+        self.assertEqual(Task.objects.filter(name=apply_clerk_events.task_name).count(), 1)
+        Task.objects.update(run_at=Task.objects.get().created_at)
+        run_pending()
+
+        self.assertEqual(User.objects.get(username='user_1').email, 'one@new.example.com')
+        self.assertEqual(User.objects.get(username='user_2').first_name, 'Bo')
+        self.assertFalse(User.objects.get(username='user_3').is_active)
+        self.assertFalse(ClerkEvent.objects.filter(applied_at__isnull=True).exists())
+
+    def test_redelivery_and_stale_events_are_ignored(self):
+        now = time.time()
+        event = self.sender.event('user.updated', 'user_1', 'new@example.com', timestamp=now)
+        self.deliver(event, msg_id='msg_1')
+        self.deliver(event, msg_id='msg_1')
+        self.assertEqual(ClerkEvent.objects.count(), 1)
+        apply_clerk_events()
+
+        self.deliver(self.sender.event('user.updated', 'user_1', 'old@example.com', timestamp=now - 60))
+        apply_clerk_events()
+        self.assertEqual(User.objects.get(username='user_1').email, 'new@example.com')
+
+    def test_bad_signature_is_rejected(self):
+        body, headers = self.sender.signed(self.sender.event('user.created', 'user_1', 'a@example.com'))
+        headers['svix-signature'] = 'v1,' + base64.b64encode(b'forged').decode()
+        response = self.client.post(
+            self.url, body, content_type='application/json',
+            **{'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.deliver(self.sender.event('user.created', 'user_1', 'a@example.com'),
+                                timestamp=time.time() - 3600)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClerkEvent.objects.exists())
+
+
+class ClerkAuthenticationTests(TestCase):
+    def authenticate(self, clerk_user_id):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Bearer token')
+        signing_key = mock.Mock(key='key')
+        with mock.patch.object(ClerkAuthentication, 'get_jwks_client') as jwks, \
+                mock.patch('authentication.auth.jwt.decode', return_value={'sub': clerk_user_id}), \
+                mock.patch.object(ClerkAuthentication, 'get_clerk_user_info', return_value={
+                    'first_name': 'Ada', 'email_addresses': [{'email_address': 'ada@example.com'}],
+                }) as user_info:
+            jwks.return_value.get_signing_key_from_jwt.return_value = signing_key
+            user, _ = ClerkAuthentication().authenticate(request)
+        return user, user_info
+
+    def test_clerk_is_only_asked_about_new_users(self):
+        user, user_info = self.authenticate('user_1')
+        self.assertEqual(user.email, 'ada@example.com')
+        user_info.assert_called_once()
+
+        User.objects.filter(pk=user.pk).update(email='webhook@example.com')
+        user, user_info = self.authenticate('user_1')
+        self.assertEqual(user.email, 'webhook@example.com')
+        user_info.assert_not_called()
+
+
+class LocalClerkTests(TestCase):
+    def test_tokens_authenticate_against_the_local_clerk(self):
+        with LocalClerk() as clerk, override_settings(
+            CLERK_ISSUER_URL=clerk.url,
+            CLERK_JWKS_URL=f'{clerk.url}/.well-known/jwks.json',
+            CLERK_API_BASE_URL=clerk.url,
+        ):
+            request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {clerk.token('user_load')}")
+            user, _ = ClerkAuthentication().authenticate(request)
+        self.assertEqual(user.username, 'user_load')
+        self.assertEqual(user.email, 'user_load@load.local')
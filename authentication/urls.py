@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import VerifyTokenView
+from .views import ClerkWebhookView, VerifyTokenView
 
 urlpatterns = [
     path('verify/', VerifyTokenView.as_view(), name='verify-token'),
+    path('webhooks/clerk/', ClerkWebhookView.as_view(), name='clerk-webhook'),
 ] 
\ No newline at end of file
@@ -1,15 +1,33 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
 from django.shortcuts import render
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
+from server.throttling import ACTION_THROTTLES, PreAuthThrottleMixin
+from taskqueue.models import Task
+from taskqueue.queue import enqueue, get_task_setting
 from .auth import ClerkAuthentication
+from .models import ClerkEvent
+from .tasks import apply_clerk_events
+from .webhooks import USER_EVENTS, InvalidSignature, verify
+
+logger = logging.getLogger(__name__)
+
+# Lets a burst of deliveries collect into one batch
+APPLY_DELAY = timedelta(seconds=5)
 
 # Create your views here.
 
-class VerifyTokenView(APIView):
+class VerifyTokenView(PreAuthThrottleMixin, APIView):
     permission_classes = [AllowAny]
     authentication_classes = [ClerkAuthentication]
+    throttle_classes = ACTION_THROTTLES
+    throttle_scope = 'verify_token'
 
     def post(self, request):
         try:
@@ -27,3 +45,51 @@ class VerifyTokenView(APIView):
                 'valid': False,
                 'error': str(e)
             }, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class ClerkWebhookView(APIView):
+    """
+    Receives Clerk user events. Deliveries are recorded as they arrive and
+    applied to the User table in batches by a queued task.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        # The signature covers the raw bytes, so read them before parsing
+        body = request.body
+        try:
+            verify(settings.CLERK_WEBHOOK_SECRET, request.headers, body)
+        except InvalidSignature as e:
+            logger.warning("Rejected Clerk webhook", extra={'error': str(e)})
+            return Response({'detail': 'Invalid signature.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        event = request.data
+        if event.get('type') not in USER_EVENTS:
+            return Response({'status': 'ignored'})
+        data = event.get('data') or {}
+        if not data.get('id'):
+            return Response({'detail': 'Event has no user id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        timestamp = event.get('timestamp')
+        occurred_at = (
+            datetime.fromtimestamp(timestamp / 1000, tz=dt_timezone.utc) if timestamp else timezone.now()
+        )
+        # Redeliveries share the Svix message id and are dropped here
+        ClerkEvent.objects.bulk_create([ClerkEvent(
+            svix_id=request.headers['svix-id'],
+            type=event['type'],
+            clerk_user_id=data['id'],
+            data=data,
+            occurred_at=occurred_at,
+        )], ignore_conflicts=True)
+
+        # A run that has not started yet will pick this event up too; one
+        # already running may have finished its last batch, so queue another
+        if get_task_setting('EAGER', False):
+            apply_clerk_events.delay()
+        elif not Task.objects.filter(
+            name=apply_clerk_events.task_name, status=Task.QUEUED, run_at__gt=timezone.now()
+        ).exists():
+            enqueue(apply_clerk_events.task_name, run_at=timezone.now() + APPLY_DELAY)
+        return Response({'status': 'received'})
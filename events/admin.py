@@ -1,9 +1,81 @@
 from django.contrib import admin
-from .models import Event
+from django.db.models import Q, Subquery
+from server.paginators import EstimatedCountPaginator, PaginatedInlineMixin
+from .models import Event, EventImage, EventRegistration, EventSeries
+
+
+class EventRegistrationInline(PaginatedInlineMixin, admin.TabularInline):
+    model = EventRegistration
+    fields = ('user_id', 'user_name', 'user_email', 'registered_at')
+    readonly_fields = ('registered_at',)
+    extra = 0
+    per_page = 25
+
+
+class EventImageInline(admin.TabularInline):
+    model = EventImage
+    extra = 0
+
 
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('title', 'date', 'location', 'type', 'attendees', 'spots_left')
-    list_filter = ('is_online', 'type', 'is_free')
+    list_display = ('title', 'date', 'location', 'type', 'attendees', 'spots_left', 'groupId')
+    list_filter = ('is_archived', 'is_online', 'type', 'is_free')
+    search_fields = ('title', 'description', 'organizer')
+    # Large tables: estimate the unfiltered count and skip the second
+    # COUNT(*) the changelist runs to show "x of y selected"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('groupId',)
+    autocomplete_fields = ('groupId',)
+    raw_id_fields = ('series',)
+    readonly_fields = ('created_at', 'updated_at')
+    inlines = [EventImageInline, EventRegistrationInline]
+
+
+class EventSeriesAdmin(admin.ModelAdmin):
+    list_display = ('title', 'frequency', 'interval', 'starts_on', 'until', 'location', 'type')
+    list_filter = ('frequency', 'type', 'is_online')
     search_fields = ('title', 'description', 'organizer')
+    autocomplete_fields = ('groupId',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+class EventRegistrationAdmin(admin.ModelAdmin):
+    list_display = ('user_name', 'user_email', 'event', 'registered_at')
+    list_filter = ('registered_at',)
+    # Whole-value matches only, see get_search_results
+    search_fields = ('=user_id', '=user_email', '=event__slug')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('event',)
+    raw_id_fields = ('event',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        One index lookup per column on the registrations table, combined
+        as a bitmap OR: user ids exactly, emails case-insensitively through
+        event_reg_email_upper_idx, and the event by slug in a subquery that
+        runs once, since a condition on the joined table defeats the OR.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        event_id = Event.objects.filter(slug=term).order_by().values('id')[:1]
+        return queryset.filter(
+            Q(user_id=term) | Q(user_email__iexact=term) | Q(event=Subquery(event_id))
+        ), False
+
+
+class EventImageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event')
+    search_fields = ('=event__slug',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('event',)
+    raw_id_fields = ('event',)
+
 
 admin.site.register(Event, EventAdmin)
+admin.site.register(EventRegistration, EventRegistrationAdmin)
+admin.site.register(EventImage, EventImageAdmin)
+admin.site.register(EventSeries, EventSeriesAdmin)
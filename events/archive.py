@@ -0,0 +1,57 @@
+"""
+Hot/archive split for past events.
+
+Events that ended more than ``settings.EVENT_ARCHIVE_AFTER_DAYS`` ago are
+flagged ``is_archived`` by the ``archive_events`` command. The default list,
+search and ``upcoming`` only read the hot rows, through partial indexes that
+leave archived events out, so their cost follows the number of current
+events rather than all of history. ``?include_archived=true`` reads both.
+
+Archived events stay in the events table: registrations, images,
+recommendations and groups all reference them, and detail pages, calendar
+feeds and ``my_registrations`` keep working for them. Archiving bumps
+``updated_at``, so delta sync hands the row back flagged ``is_archived``
+and clients can drop it from their hot list.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+ARCHIVE_BATCH_SIZE = 1000
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def archive_cutoff(now=None):
+    """Events dated before this ISO date belong in the archive"""
+    window = timedelta(days=settings.EVENT_ARCHIVE_AFTER_DAYS)
+    return ((now or timezone.now()) - window).date().isoformat()
+
+
+def include_archived(request):
+    return request.query_params.get('include_archived', '').lower() in TRUE_VALUES
+
+
+def archive_past_events(now=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move events that fell out of the window into the archive, and back
+    any whose date was edited into the window again.
+    Returns ``(archived, restored)`` counts.
+    """
+    from .models import Event
+
+    cutoff = archive_cutoff(now)
+    archived = _update_in_batches(Event.objects.filter(is_archived=False, date__lt=cutoff), True, batch_size)
+    restored = _update_in_batches(Event.objects.filter(is_archived=True, date__gte=cutoff), False, batch_size)
+    return archived, restored
+
+
+def _update_in_batches(queryset, is_archived, batch_size):
+    # Short transactions keep row locks brief on a busy table
+    total = 0
+    now = timezone.now()
+    while True:
+        ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += queryset.model.objects.filter(id__in=ids).update(is_archived=is_archived, updated_at=now)
@@ -0,0 +1,159 @@
+"""
+Async read endpoints for the ASGI deployment.
+
+DRF views are sync only, so these are plain Django async views mounted under
+``/api/async/``. They reuse the viewsets' ``get_queryset``/``filter_queryset``
+(filters, search, ordering and ``?near=`` behave the same) to build the
+query, run it with the async ORM, and serialize with the same serializers.
+Lists and ``upcoming`` merge in series occurrences through the viewset
+too (see ``events.series``), and occurrence slugs resolve in the detail.
+Authentication goes through ``authentication.async_auth``, which verifies
+Clerk tokens with a pooled async HTTP client instead of a blocking request.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.text import slugify
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from authentication.async_auth import authenticate
+from .models import EventRegistration
+from .views import EventViewSet
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False)
+
+
+def async_view(view):
+    """
+    Authenticate the request asynchronously and turn API errors into JSON
+    responses the way DRF's exception handler would.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # require_GET only wraps sync views before Django 5.0
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            request.user = await authenticate(request) or AnonymousUser()
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            # Field errors keep their shape, as in DRF's exception handler
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return json_response(data, status=exc.status_code)
+
+    return wrapper
+
+
+def viewset_for(viewset_class, request, action, **kwargs):
+    """An initialised viewset, used for its queryset and serializer logic"""
+    drf_request = Request(request, authenticators=())
+    drf_request.user = request.user
+    view = viewset_class(request=drf_request, action=action, args=(), kwargs=kwargs, format_kwarg=None)
+    view.headers = {}
+    return view
+
+
+async def serialize(view, objects, many=True, prefetch=()):
+    def run():
+        if prefetch:
+            # Unsaved series occurrences have no related rows to fetch
+            saved = [obj for obj in (objects if many else [objects]) if obj.pk is not None]
+            prefetch_related_objects(saved, *prefetch)
+        return view.get_serializer(objects, many=many).data
+
+    return await sync_to_async(run)()
+
+
+async def paginate(view, queryset, prefetch=()):
+    """
+    Async counterpart of ``PageNumberPagination`` with the same response
+    shape. ``queryset`` may also be an ``OccurrenceList``, paged in a thread.
+    """
+    request = view.request
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page_number = int(request.query_params.get('page', 1))
+    except ValueError:
+        page_number = 0
+    if hasattr(queryset, 'acount'):
+        count = await queryset.acount()
+    else:
+        count = await sync_to_async(queryset.count)()
+    last_page = max(1, -(-count // page_size))
+    if not 1 <= page_number <= last_page:
+        return json_response({'detail': 'Invalid page.'}, status=404)
+
+    offset = (page_number - 1) * page_size
+    if hasattr(queryset, 'acount'):
+        page = [obj async for obj in queryset[offset:offset + page_size]]
+    else:
+        page = await sync_to_async(lambda: queryset[offset:offset + page_size])()
+    url = request.build_absolute_uri()
+    previous_url = None
+    if page_number > 1:
+        previous_url = remove_query_param(url, 'page') if page_number == 2 else replace_query_param(url, 'page', page_number - 1)
+    return json_response({
+        'count': count,
+        'next': replace_query_param(url, 'page', page_number + 1) if page_number < last_page else None,
+        'previous': previous_url,
+        'results': await serialize(view, page, prefetch=prefetch),
+    })
+
+
+async def get_by_slug(queryset, slug, name):
+    """Same lookup as the viewsets' ``get_object``, with the slugify fallback"""
+    obj = await queryset.filter(slug=slug).afirst()
+    if obj is None:
+        obj = await queryset.filter(slug=slugify(slug)).afirst()
+    if obj is None:
+        return None, json_response({'detail': f'No {name} found with slug: {slug}'}, status=404)
+    return obj, None
+
+
+@async_view
+async def event_list(request):
+    view = viewset_for(EventViewSet, request, 'list')
+    if 'updated_since' in request.GET:
+        # The same delta payload, token checks and tombstones as the sync list
+        response = await sync_to_async(view.delta_sync)(view.request)
+        return json_response(response.data, status=response.status_code)
+    queryset = await sync_to_async(view.get_list_events)()
+    return await paginate(view, queryset, prefetch=['images'])
+
+
+@async_view
+async def event_detail(request, slug):
+    view = viewset_for(EventViewSet, request, 'retrieve', slug=slug)
+    queryset = await sync_to_async(lambda: view.filter_queryset(view.get_queryset()))()
+    event, error = await get_by_slug(queryset, slug, 'event')
+    if error:
+        event = await sync_to_async(view.get_occurrence)(slug)
+        if event is None:
+            return error
+    return json_response(await serialize(view, event, many=False, prefetch=['images']))
+
+
+@async_view
+async def event_upcoming(request):
+    view = viewset_for(EventViewSet, request, 'upcoming')
+    events = await sync_to_async(lambda: list(view.get_upcoming_events()))()
+    return json_response(await serialize(view, events, prefetch=['images']))
+
+
+@async_view
+async def my_registrations(request):
+    if not request.user.is_authenticated:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    view = viewset_for(EventViewSet, request, 'my_registrations')
+    event_ids = EventRegistration.objects.filter(user_id=request.user.id).values('event_id')
+    events = view.get_queryset().filter(id__in=event_ids)
+    return json_response(await serialize(view, [event async for event in events], prefetch=['images']))
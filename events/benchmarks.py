@@ -0,0 +1,313 @@
+"""
+Offline endpoint benchmarks.
+
+Seeds a deterministic data set, replays the hot API endpoints through the
+DRF test client and records latency percentiles and query counts for each
+one. Clerk is bypassed with ``force_authenticate`` and images are stored as
+plain Cloudinary public IDs, so nothing here touches the network.
+
+``load_test`` is the exception: it measures throughput of already running
+servers over HTTP, see the ``benchmark_concurrency`` command.
+"""
+import asyncio
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+import httpx
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from group.models import Group, GroupImage, group_search_vector
+from .models import Event, EventImage, EventRegistration
+from .suggest import rebuild_search_tags
+from .trending import rebuild_trending
+
+# Maximum number of queries each endpoint may run for a single request.
+# Raise a budget only together with the change that justifies it.
+ENDPOINT_BUDGETS = {
+    'event-list': 13,
+    'event-detail': 2,
+    'event-search': 12,
+    'event-upcoming': 11,
+    'event-trending': 2,
+    'event-my-registrations': 7,
+    'event-attendees': 2,
+    'event-register': 8,
+    'group-join': 5,
+    'search-suggest': 5,
+    'event-calendar': 2,
+}
+
+# p99 latency targets in milliseconds, checked by the benchmark_endpoints command
+LATENCY_TARGETS = {
+    'search-suggest': 20,
+}
+
+# Number of events the benchmark member is registered for
+MEMBER_REGISTRATIONS = 5
+# Seeded images are placeholder names; render them without any image service
+LOCAL_IMAGE_STORAGE = 'server.storage.LocalImageStorage'
+
+
+def seed_benchmark_data(events=50, groups=10, members=20, registrations=10, images=2):
+    """
+    Create a benchmark data set and return the objects the scenarios need.
+
+    ``members`` users join every group, ``registrations`` of them register
+    for every event and each event gets ``images`` image rows. The returned
+    ``member`` is registered for a fixed handful of events so per-user
+    endpoints stay comparable across data set sizes.
+    """
+    owner, _ = User.objects.get_or_create(
+        username='bench-owner',
+        defaults={'email': 'owner@bench.local', 'first_name': 'Bench', 'last_name': 'Owner'}
+    )
+    users = User.objects.bulk_create([
+        User(
+            username=f'bench-user-{i}',
+            email=f'user{i}@bench.local',
+            first_name='Bench',
+            last_name=f'User {i}',
+        )
+        for i in range(members)
+    ])
+
+    group_objs = Group.objects.bulk_create([
+        Group(
+            name=f'Bench Group {i}',
+            slug=f'bench-group-{i}',
+            description='Benchmark group',
+            category=Group.CATEGORY_CHOICES[i % len(Group.CATEGORY_CHOICES)][0],
+            tags=['bench', f'tag-{i % 5}'],
+            location='Kampala',
+            is_online=bool(i % 2),
+            member_count=members + 1,
+            # The events below are dealt out round-robin
+            event_count=len(range(i, events, groups)),
+            owner=owner,
+        )
+        for i in range(groups)
+    ])
+    # bulk_create skips Group.save, which maintains this
+    Group.objects.filter(pk__in=[group.pk for group in group_objs]).update(search_vector=group_search_vector())
+    Membership = Group.members.through
+    Membership.objects.bulk_create([
+        Membership(group_id=group.id, user_id=user.id)
+        for group in group_objs
+        for user in [owner] + users
+    ])
+    GroupImage.objects.bulk_create([
+        GroupImage(group=group, image=f'groups/bench-{group.id}', is_cover=True)
+        for group in group_objs
+    ])
+
+    today = timezone.now().date()
+    event_objs = Event.objects.bulk_create([
+        Event(
+            title=f'Bench Event {i}',
+            slug=f'bench-event-{i}',
+            description='Benchmark event',
+            # Half the events are in the past so the upcoming split has work to do
+            date=(today + timedelta(days=i - events // 2)).isoformat(),
+            time='10:00',
+            # bulk_create skips Event.save, which fills this in
+            starts_at=timezone.make_aware(datetime.combine(today + timedelta(days=i - events // 2), dt_time(10))),
+            location='Kampala',
+            is_online=bool(i % 3 == 0),
+            type=Event.EVENT_TYPES[i % len(Event.EVENT_TYPES)][0],
+            tags=['bench', f'tag-{i % 5}'],
+            organizer='Bench Org',
+            attendees=registrations,
+            is_free=bool(i % 2),
+            spots_left=events * members,
+            groupId=group_objs[i % len(group_objs)] if group_objs else None,
+            created_by=str(owner),
+        )
+        for i in range(events)
+    ])
+    EventImage.objects.bulk_create([
+        EventImage(event=event, image=f'events/bench-{event.id}-{n}')
+        for event in event_objs
+        for n in range(images)
+    ])
+    EventRegistration.objects.bulk_create([
+        EventRegistration(
+            event=event,
+            user_id=str(user.id),
+            user_email=user.email,
+            user_name=f'{user.first_name} {user.last_name}',
+        )
+        for event in event_objs
+        for user in users[1:registrations + 1]
+    ])
+    member = users[0] if users else owner
+    EventRegistration.objects.bulk_create([
+        EventRegistration(event=event, user_id=str(member.id), user_email=member.email)
+        for event in event_objs[events // 2:events // 2 + MEMBER_REGISTRATIONS]
+    ])
+    # As after a periodic batch run, so register only does incremental updates
+    rebuild_trending()
+    rebuild_search_tags()
+
+    return {
+        'owner': owner,
+        'member': member,
+        'event': event_objs[len(event_objs) // 2],
+        'group': group_objs[0],
+    }
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class BenchmarkResult:
+    def __init__(self, name, budget, target_ms=None):
+        self.name = name
+        self.budget = budget
+        self.target_ms = target_ms
+        self.latencies = []
+        self.queries = []
+        self.statuses = set()
+
+    @property
+    def max_queries(self):
+        return max(self.queries) if self.queries else 0
+
+    @property
+    def over_budget(self):
+        return self.max_queries > self.budget
+
+    @property
+    def over_target(self):
+        return self.target_ms is not None and percentile(self.latencies, 99) * 1000 > self.target_ms
+
+    def summary(self):
+        return {
+            'endpoint': self.name,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'queries': self.max_queries,
+            'budget': self.budget,
+            'statuses': sorted(self.statuses),
+        }
+
+
+def _scenarios(data):
+    """
+    Yield ``(name, method, url_factory, user_factory)`` for every endpoint.
+
+    Write scenarios get a fresh user per call so each iteration exercises
+    the real registration/join path instead of the "already done" branch.
+    """
+    event, group = data['event'], data['group']
+    owner, member = data['owner'], data['member']
+
+    def fresh_user():
+        n = User.objects.count()
+        return User.objects.create(username=f'bench-fresh-{n}', email=f'fresh{n}@bench.local')
+
+    yield 'event-list', 'get', lambda: reverse('event-list'), lambda: member
+    yield 'event-detail', 'get', lambda: reverse('event-detail', kwargs={'slug': event.slug}), lambda: member
+    yield 'event-search', 'get', lambda: reverse('event-list') + '?search=Bench', lambda: member
+    yield 'event-upcoming', 'get', lambda: reverse('event-upcoming'), lambda: member
+    yield 'event-trending', 'get', lambda: reverse('event-trending'), lambda: member
+    yield 'event-my-registrations', 'get', lambda: reverse('event-my-registrations'), lambda: member
+    yield 'event-attendees', 'get', lambda: reverse('event-attendees', kwargs={'slug': event.slug}), lambda: owner
+    yield 'event-register', 'post', lambda: reverse('event-register', kwargs={'slug': event.slug}), fresh_user
+    yield 'group-join', 'post', lambda: reverse('group-join', kwargs={'slug': group.slug}), fresh_user
+    yield 'event-calendar', 'get', lambda: reverse('event-calendar') + f'?month={timezone.now():%Y-%m}&by=type', lambda: member
+    yield 'search-suggest', 'get', lambda: reverse('search-suggest') + '?q=ben', lambda: member
+
+
+def run_benchmarks(data, iterations=20, budgets=None):
+    """
+    Replay every scenario ``iterations`` times against seeded ``data``.
+
+    Returns a list of ``BenchmarkResult`` in scenario order. Rate limits
+    are switched off for the run; the benchmark measures endpoint cost.
+    Seeded image names are rendered by ``LOCAL_IMAGE_STORAGE``, so runs
+    need no image service credentials.
+    """
+    rest_framework = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+    with override_settings(REST_FRAMEWORK=rest_framework, IMAGE_STORAGE=LOCAL_IMAGE_STORAGE):
+        return _run_benchmarks(data, iterations, budgets or ENDPOINT_BUDGETS)
+
+
+def _run_benchmarks(data, iterations, budgets):
+    # 'localhost' is in ALLOWED_HOSTS, so this also works outside the test runner
+    client = APIClient(SERVER_NAME='localhost')
+    results = []
+
+    for name, method, url_factory, user_factory in _scenarios(data):
+        result = BenchmarkResult(name, budgets[name], LATENCY_TARGETS.get(name))
+        for _ in range(iterations):
+            url = url_factory()
+            client.force_authenticate(user=user_factory())
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = getattr(client, method)(url)
+                result.latencies.append(time.perf_counter() - started)
+            result.queries.append(len(ctx.captured_queries))
+            result.statuses.add(response.status_code)
+        client.force_authenticate(user=None)
+        results.append(result)
+
+    return results
+
+
+# Each pair is the sync DRF path and its async counterpart from
+# events.async_views / group.async_views. ``{event}``/``{group}`` are slugs.
+CONCURRENCY_ENDPOINTS = [
+    ('event-list', '/api/events/events/', '/api/async/events/'),
+    ('event-detail', '/api/events/events/{event}/', '/api/async/events/{event}/'),
+    ('event-upcoming', '/api/events/events/upcoming/', '/api/async/events/upcoming/'),
+    ('event-my-registrations', '/api/events/events/my_registrations/', '/api/async/events/my_registrations/'),
+    ('group-list', '/api/groups/', '/api/async/groups/'),
+    ('group-detail', '/api/groups/{group}/', '/api/async/groups/{group}/'),
+]
+
+
+async def load_test(base_url, path, requests=1000, concurrency=100, headers=None):
+    """
+    Fire ``requests`` GETs at a running server, ``concurrency`` at a time.
+    Returns a summary with throughput, latency percentiles and status counts.
+    """
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    status = (await client.get(path)).status_code
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'statuses': statuses,
+    }
@@ -0,0 +1,265 @@
+"""
+iCalendar (RFC 5545) feeds for events.
+
+Feeds are validated with an ETag derived from a single aggregate over the
+events in the feed (latest ``updated_at`` plus row count), so a poller
+whose copy is current gets a 304 without any rows being read. Changed
+feeds are streamed from a server-side cursor and the rendered body is
+cached under its ETag for the next poller.
+"""
+import hashlib
+import time as clock
+from datetime import datetime, time
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from rest_framework.renderers import BaseRenderer
+
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_MAX_AGE = 5 * 60
+FEED_TOKEN_SALT = 'events.calendar'
+MONTH_CACHE_TIMEOUT = 60 * 60
+# Part of every month key; changing a series moves them all, see invalidate_series_months
+SERIES_VERSION_KEY = 'events:calendar:series'
+
+
+class ICalendarRenderer(BaseRenderer):
+    """Lets DRF negotiate ``text/calendar``; feed views return raw responses"""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses reach the renderer
+        if data is None:
+            return b''
+        return str(data).encode(self.charset)
+
+
+def make_feed_token(user_id):
+    return signing.Signer(salt=FEED_TOKEN_SALT).sign(str(user_id))
+
+
+def read_feed_token(token):
+    """Return the user id a feed token was issued for, or None if tampered"""
+    try:
+        return signing.Signer(salt=FEED_TOKEN_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def _escape(value):
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line to 75 octets as RFC 5545 requires"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        # Never split inside a multi-byte character
+        while limit < len(encoded) and (encoded[limit] & 0xC0) == 0x80:
+            limit -= 1
+        parts.append(encoded[:limit].decode('utf-8'))
+        encoded = encoded[limit:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_datetime(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_dates(event):
+    """
+    Return ``(DTSTART, DTEND)`` property lines for an event, or None.
+
+    ``Event.date``/``time`` are free text; only ISO dates and ``HH:MM``
+    times can be placed on a calendar. Unparseable times fall back to an
+    all-day entry and unparseable dates leave the event out of the feed.
+    """
+    day = parse_date(event.date or '')
+    if day is None:
+        return None
+    try:
+        start = parse_time(event.time or '')
+        end = parse_time(event.end_time or '')
+    except ValueError:
+        start = end = None
+    if start is None:
+        return f'DTSTART;VALUE=DATE:{day:%Y%m%d}', None
+    dtstart = f'DTSTART:{day:%Y%m%d}T{start:%H%M%S}'
+    dtend = f'DTEND:{day:%Y%m%d}T{end:%H%M%S}' if end and end > start else None
+    return dtstart, dtend
+
+
+def event_start(event):
+    """
+    Aware start of an event from its free-text ``date``/``time``, or None.
+    Times that do not parse count as the start of the day.
+    """
+    day = parse_date(event.date or '')
+    if day is None:
+        return None
+    try:
+        start = parse_time(event.time or '')
+    except ValueError:
+        start = None
+    return timezone.make_aware(datetime.combine(day, start or time.min))
+
+
+def apply_event_start(instance):
+    instance.starts_at = event_start(instance)
+
+
+def _month_cache_key(month, split, version):
+    return f"events:calendar:{version}:{month:%Y-%m}:{split or 'all'}"
+
+
+def invalidate_month(starts_at):
+    """Drop the cached histograms of the month ``starts_at`` falls in"""
+    if starts_at is not None:
+        month = timezone.localtime(starts_at).date()
+        version = cache.get(SERIES_VERSION_KEY, 0)
+        cache.delete_many([_month_cache_key(month, None, version), _month_cache_key(month, 'type', version)])
+
+
+def invalidate_series_months():
+    """Drop every cached histogram; a series can have occurrences in any month"""
+    cache.set(SERIES_VERSION_KEY, clock.time_ns(), None)
+
+
+def month_histogram(queryset, month, split=None, occurrences=None):
+    """
+    Event counts per day of ``month`` (a date in it) from one aggregate over
+    the indexed ``starts_at``, optionally split by ``type``. Cached per month
+    until an event in it changes, see ``invalidate_month``.
+
+    ``occurrences(start, end)`` returns the unsaved series occurrences
+    between two datetimes (see events.series); they are counted too.
+    """
+    cache_key = _month_cache_key(month, split, cache.get(SERIES_VERSION_KEY, 0))
+    data = cache.get(cache_key)
+    if data is not None:
+        return data
+
+    first = timezone.make_aware(datetime(month.year, month.month, 1))
+    following = timezone.make_aware(
+        datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    )
+    rows = (
+        queryset.filter(starts_at__gte=first, starts_at__lt=following)
+        .annotate(day=TruncDate('starts_at'))
+        .values('day', *([split] if split else []))
+        .annotate(count=Count('id'))
+        .order_by('day')
+    )
+    days = {}
+
+    def add(date, value, count):
+        day = days.setdefault(date, {'date': date.isoformat(), 'count': 0})
+        day['count'] += count
+        if split:
+            by = day.setdefault(f'by_{split}', {})
+            by[value] = by.get(value, 0) + count
+
+    for row in rows:
+        add(row['day'], row[split] if split else None, row['count'])
+    for occurrence in occurrences(first, following) if occurrences else ():
+        add(timezone.localtime(occurrence.starts_at).date(), getattr(occurrence, split) if split else None, 1)
+    data = {'month': f'{month:%Y-%m}', 'days': [days[date] for date in sorted(days)]}
+    cache.set(cache_key, data, MONTH_CACHE_TIMEOUT)
+    return data
+
+
+def ical_lines(events, name):
+    """Yield the feed line by line so large feeds are never held in memory"""
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Meetula//Events//EN\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+    stamp = _format_datetime(timezone.now())
+
+    for event in events:
+        dates = _event_dates(event)
+        if dates is None:
+            continue
+        dtstart, dtend = dates
+        yield 'BEGIN:VEVENT\r\n'
+        yield f'UID:event-{event.id}@meetula\r\n'
+        yield f'DTSTAMP:{_format_datetime(event.updated_at) if event.updated_at else stamp}\r\n'
+        yield f'{dtstart}\r\n'
+        if dtend:
+            yield f'{dtend}\r\n'
+        yield _fold(f'SUMMARY:{_escape(event.title)}')
+        yield _fold(f'DESCRIPTION:{_escape(event.description)}')
+        yield _fold(f'LOCATION:{_escape(event.location)}')
+        if event.registration_url:
+            yield _fold(f'URL:{event.registration_url}')
+        yield 'END:VEVENT\r\n'
+
+    yield 'END:VCALENDAR\r\n'
+
+
+def feed_etag(scope, queryset, *extra):
+    """Fingerprint a feed from one aggregate query over its events"""
+    stats = queryset.order_by().aggregate(latest=Max('updated_at'), total=Count('id'))
+    raw = f"{scope}:{stats['latest']}:{stats['total']}:" + ':'.join(str(value) for value in extra)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    candidates = [value.strip().removeprefix('W/').strip('"') for value in header.split(',')]
+    return etag in candidates or '*' in candidates
+
+
+def _cache_body(cache_key, lines):
+    chunks = []
+    for chunk in lines:
+        chunks.append(chunk)
+        yield chunk
+    cache.set(cache_key, ''.join(chunks), FEED_CACHE_TIMEOUT)
+
+
+def feed_response(request, queryset, name, etag, private=False):
+    """
+    Serve a calendar feed with conditional GET support.
+
+    Returns 304 when the client's copy matches ``etag``, the cached body
+    when another poller already rendered this version, and otherwise a
+    streamed render that is cached as it goes out.
+    """
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        cache_key = f'ical_feed:{etag}'
+        body = cache.get(cache_key)
+        if body is not None:
+            response = HttpResponse(body)
+        else:
+            events = queryset.only(
+                'id', 'title', 'description', 'location', 'date', 'time',
+                'end_time', 'registration_url', 'updated_at',
+            ).order_by('date').iterator(chunk_size=500)
+            response = StreamingHttpResponse(_cache_body(cache_key, ical_lines(events, name)))
+        response['Content-Type'] = 'text/calendar; charset=utf-8'
+
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = f"{'private' if private else 'public'}, max-age={FEED_MAX_AGE}"
+    return response
@@ -0,0 +1,100 @@
+"""
+Facet counts for filter sidebars.
+
+``GET .../facets/`` takes the same query parameters as the list and returns
+a count for every option of each field in ``facet_fields``, all from one
+aggregate of conditional ``Count``s. Counts are disjunctive: each field's
+options are counted under the search and every other filter, but not the
+field's own selection, so the sidebar shows what picking another option
+would return. ``total`` applies every filter.
+
+Results are cached for ``FACET_CACHE_TIMEOUT`` by the normalized query.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Count, Q
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+FACET_CACHE_TIMEOUT = 60
+# Parameters that change the page, not the matching rows
+IGNORED_PARAMS = ('page', 'page_size', 'ordering', 'format')
+EMPTY_VALUES = ([], (), {}, '', None)
+
+
+def facet_options(model, name):
+    field = model._meta.get_field(name)
+    if isinstance(field, BooleanField):
+        return [True, False]
+    return [value for value, _ in field.flatchoices]
+
+
+def facet_cache_key(basename, query_params):
+    params = sorted(
+        (name, value.strip().lower() if name == 'search' else value)
+        for name, values in query_params.lists() if name not in IGNORED_PARAMS
+        for value in values
+    )
+    digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+    return f'facets:{basename}:{digest}'
+
+
+class FacetMixin:
+    """
+    Adds a ``facets`` action counting the options of ``facet_fields``,
+    which must also be filters of the viewset's filterset.
+    """
+    facet_fields = ()
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        key = facet_cache_key(self.basename, request.query_params)
+        data = cache.get(key)
+        if data is None:
+            data = self.get_facet_counts()
+            cache.set(key, data, FACET_CACHE_TIMEOUT)
+        return Response(data)
+
+    def get_facet_counts(self):
+        queryset = self.get_queryset()
+        selected = {}
+        for backend in self.filter_backends:
+            if not issubclass(backend, DjangoFilterBackend):
+                queryset = backend().filter_queryset(self.request, queryset, self)
+                continue
+            filterset = backend().get_filterset(self.request, queryset, self)
+            if filterset is None:
+                continue
+            if not filterset.is_valid():
+                raise translate_validation(filterset.errors)
+            for name, value in filterset.form.cleaned_data.items():
+                if name in self.facet_fields:
+                    if value not in EMPTY_VALUES:
+                        selected[name] = Q(**{name: value})
+                else:
+                    queryset = filterset.filters[name].filter(queryset, value)
+
+        def others(name=None):
+            condition = Q()
+            for other, q in selected.items():
+                if other != name:
+                    condition &= q
+            return condition
+
+        model = queryset.model
+        options = {name: facet_options(model, name) for name in self.facet_fields}
+        aggregates = {'total': Count('pk', filter=others())}
+        for name, values in options.items():
+            for n, value in enumerate(values):
+                aggregates[f'{name}__{n}'] = Count('pk', filter=others(name) & Q(**{name: value}))
+
+        # Ordering and annotations only matter to the list
+        counts = queryset.order_by().aggregate(**aggregates)
+        data = {'total': counts['total']}
+        for name, values in options.items():
+            data[name] = [{'value': value, 'count': counts[f'{name}__{n}']} for n, value in enumerate(values)]
+        return data
@@ -0,0 +1,143 @@
+"""
+Offline geocoding and "near me" filtering.
+
+Locations are free text, so coordinates are looked up in a local gazetteer
+file (``settings.GAZETTEER_PATH``) instead of calling a geocoding API.
+Nearby searches narrow the table with a bounding box on the indexed
+``(latitude, longitude)`` columns before computing exact distances.
+"""
+import csv
+import math
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ACos, Cos, Least, Radians, Sin
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 25.0
+MAX_RADIUS_KM = 500.0
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer():
+    """Map normalized place names to ``(latitude, longitude)``"""
+    with open(settings.GAZETTEER_PATH, newline='', encoding='utf-8') as handle:
+        return {
+            row['name'].strip().lower(): (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(handle)
+        }
+
+
+def geocode(location):
+    """
+    Return ``(latitude, longitude)`` for a free-text location, or None.
+
+    Tries the whole string first, then each comma-separated part, so
+    "Acacia Mall, Kampala" and "San Francisco, CA" both resolve.
+    """
+    if not location:
+        return None
+    gazetteer = load_gazetteer()
+    normalized = location.strip().lower()
+    candidates = [normalized] + [part.strip() for part in normalized.split(',')]
+    for candidate in candidates:
+        if candidate in gazetteer:
+            return gazetteer[candidate]
+    return None
+
+
+class GeocodedModel:
+    """Remembers the location a row was loaded with, see ``apply_geocode``"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'location' in field_names:
+            instance._loaded_location = instance.location
+        return instance
+
+
+def apply_geocode(instance):
+    """
+    Refresh an instance's coordinates from its location when known. When
+    the location changed to one the gazetteer doesn't know, the old
+    coordinates no longer apply and are cleared.
+    """
+    coordinates = geocode(instance.location)
+    if coordinates is not None:
+        instance.latitude, instance.longitude = coordinates
+    elif instance.location != getattr(instance, '_loaded_location', instance.location):
+        instance.latitude = instance.longitude = None
+    instance._loaded_location = instance.location
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return ``(min_lat, max_lat, min_lng, max_lng)`` enclosing the circle.
+    Longitude bounds are None when the box would wrap a pole or the
+    antimeridian; the latitude range alone still narrows the scan.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), None, None
+
+    delta_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    min_lng, max_lng = longitude - delta_lng, longitude + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def distance_expression(latitude, longitude):
+    """Great-circle distance in km from a point, as an ORM expression"""
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    cosine = (
+        Value(math.cos(lat)) * Cos(Radians(F('latitude')))
+        * Cos(Radians(F('longitude')) - Value(lng))
+        + Value(math.sin(lat)) * Sin(Radians(F('latitude')))
+    )
+    # Rounding can push the cosine a hair above 1, which ACOS rejects
+    return Value(EARTH_RADIUS_KM) * ACos(Least(cosine, Value(1.0)), output_field=FloatField())
+
+
+def parse_near(params):
+    """Return ``(latitude, longitude, radius_km)`` from query params, or None"""
+    near = params.get('near')
+    if not near:
+        return None
+    try:
+        latitude, longitude = (float(part) for part in near.split(','))
+        radius_km = float(params.get('radius_km', DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise ValidationError({'near': 'Expected near=<lat>,<lng> and a numeric radius_km.'})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({'near': 'Coordinates are out of range.'})
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM:g}.'})
+    return latitude, longitude, radius_km
+
+
+class NearFilterBackend(BaseFilterBackend):
+    """
+    Handles ``?near=lat,lng&radius_km=`` and orders results by distance.
+    Place it last in ``filter_backends`` so the distance ordering wins.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        near = parse_near(request.query_params)
+        if near is None:
+            return queryset
+        latitude, longitude, radius_km = near
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+        queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+        if min_lng is not None:
+            queryset = queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+
+        return queryset.annotate(
+            distance_km=distance_expression(latitude, longitude)
+        ).filter(distance_km__lte=radius_km).order_by('distance_km')
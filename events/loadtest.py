@@ -0,0 +1,218 @@
+"""
+Scenario-driven load tests against a running server.
+
+Unlike ``events.benchmarks``, which replays endpoints in-process, this
+drives a real server over HTTP at a fixed arrival rate. Arrivals are
+open-loop: requests start on schedule whether or not earlier ones have
+finished, so a slow server shows up as latency and errors rather than as
+a quietly lower request rate. Past ``max_in_flight`` outstanding requests
+an arrival is dropped and counted as an error.
+
+Each arrival picks a scenario by weight:
+
+``browse``
+    anonymous list, detail and upcoming pages
+``search``
+    typeahead keystrokes and list searches
+``register-rush``
+    a new user registering for one hot event
+``join-storm``
+    a new user joining one hot group
+
+Write scenarios authenticate as fresh users with tokens from
+``authentication.local_clerk.LocalClerk``, so the server under test must
+use it as its Clerk. Every virtual user gets its own ``X-Forwarded-For``
+address, as real clients behind a proxy would, so the per-IP throttles see
+many clients. The server only reads that header with ``NUM_PROXIES=1``;
+with the default of 0 every virtual user shares the runner's address.
+"""
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+from django.contrib.auth.models import User
+
+from group.models import Group
+from .benchmarks import percentile
+from .models import Event
+
+SCENARIO_WEIGHTS = {
+    'browse': 60,
+    'search': 25,
+    'register-rush': 10,
+    'join-storm': 5,
+}
+
+# Users created by a load run, see clear_load_data
+LOAD_USER_PREFIX = 'load-user-'
+
+SEARCH_TERMS = ['bench', 'event', 'group', 'kampala', 'tag']
+
+
+class LoadPlan:
+    """The slugs the scenarios request, taken from seeded data"""
+
+    def __init__(self, events, groups, hot_event, hot_group, search_terms=SEARCH_TERMS):
+        self.events = list(events)
+        self.groups = list(groups)
+        self.hot_event = hot_event
+        self.hot_group = hot_group
+        self.search_terms = list(search_terms)
+
+    @classmethod
+    def from_seed(cls, data):
+        """A plan over the rows created by ``seed_benchmark_data``"""
+        return cls(
+            events=Event.objects.filter(slug__startswith='bench-event-').values_list('slug', flat=True),
+            groups=Group.objects.filter(slug__startswith='bench-group-').values_list('slug', flat=True),
+            hot_event=data['event'].slug,
+            hot_group=data['group'].slug,
+        )
+
+
+def clear_load_data():
+    """Delete rows left behind by ``seed_benchmark_data`` and earlier load runs"""
+    Event.objects.filter(slug__startswith='bench-event-').delete()
+    Group.objects.filter(slug__startswith='bench-group-').delete()
+    User.objects.filter(username__startswith='bench-').delete()
+    User.objects.filter(username__startswith=LOAD_USER_PREFIX).delete()
+
+
+class ScenarioStats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    @property
+    def requests(self):
+        return sum(self.statuses.values())
+
+    def record(self, status, latency=None):
+        if latency is not None:
+            self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        return {
+            'scenario': self.name,
+            'requests': self.requests,
+            'rps': round(self.requests / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'error_rate': round(self.errors / self.requests, 4) if self.requests else 0.0,
+            'statuses': self.statuses,
+        }
+
+
+class VirtualUsers:
+    """Hands out a new Clerk user, token and client address per write"""
+
+    def __init__(self, clerk):
+        self.clerk = clerk
+        self.count = 0
+
+    def next(self):
+        self.count += 1
+        user_id = f'{LOAD_USER_PREFIX}{uuid.uuid4().hex[:12]}'
+        return {
+            'Authorization': f'Bearer {self.clerk.token(user_id)}',
+            'X-Forwarded-For': self.address(self.count),
+        }
+
+    @staticmethod
+    def address(n):
+        return f'10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}'
+
+
+def _browse(plan, users, rng):
+    choice = rng.randrange(5)
+    if choice == 0:
+        return 'get', '/api/events/events/', {}
+    if choice == 1:
+        return 'get', f'/api/events/events/{rng.choice(plan.events)}/', {}
+    if choice == 2:
+        return 'get', '/api/events/events/upcoming/', {}
+    if choice == 3:
+        return 'get', '/api/groups/', {}
+    return 'get', f'/api/groups/{rng.choice(plan.groups)}/', {}
+
+
+def _search(plan, users, rng):
+    term = rng.choice(plan.search_terms)
+    if rng.random() < 0.8:
+        # A keystroke of the typeahead
+        return 'get', f'/api/search/suggest/?q={term[:rng.randint(2, len(term))]}', {}
+    return 'get', f'/api/events/events/?search={term}', {}
+
+
+def _register_rush(plan, users, rng):
+    headers = dict(users.next(), **{'Idempotency-Key': uuid.uuid4().hex})
+    return 'post', f'/api/events/events/{plan.hot_event}/register/', headers
+
+
+def _join_storm(plan, users, rng):
+    return 'post', f'/api/groups/{plan.hot_group}/join/', users.next()
+
+
+SCENARIOS = {
+    'browse': _browse,
+    'search': _search,
+    'register-rush': _register_rush,
+    'join-storm': _join_storm,
+}
+
+
+async def run_load(base_url, plan, clerk, rps=50, duration=30, weights=None,
+                   max_in_flight=500, seed=0):
+    """
+    Replay weighted scenarios at ``rps`` arrivals per second for
+    ``duration`` seconds. Returns one summary per scenario plus an
+    ``all`` row, see ``ScenarioStats.summary``.
+    """
+    weights = {name: weight for name, weight in (weights or SCENARIO_WEIGHTS).items() if weight > 0}
+    names = list(weights)
+    rng = random.Random(seed)
+    users = VirtualUsers(clerk)
+    stats = {name: ScenarioStats(name) for name in names}
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    in_flight = set()
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def fire(name, method, path, headers):
+            started = time.perf_counter()
+            try:
+                status = (await client.request(method, path, headers=headers)).status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            stats[name].record(status, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for n in range(int(rps * duration)):
+            delay = started + n / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights=[weights[name] for name in names])[0]
+            if len(in_flight) >= max_in_flight:
+                stats[name].record('dropped')
+                continue
+            task = asyncio.create_task(fire(name, *SCENARIOS[name](plan, users, rng)))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        elapsed = time.perf_counter() - started
+
+    overall = ScenarioStats('all')
+    for scenario in stats.values():
+        overall.latencies.extend(scenario.latencies)
+        overall.errors += scenario.errors
+        for status, count in scenario.statuses.items():
+            overall.statuses[status] = overall.statuses.get(status, 0) + count
+    return [scenario.summary(elapsed) for scenario in stats.values()] + [overall.summary(elapsed)]
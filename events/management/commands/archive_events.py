@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.archive import ARCHIVE_BATCH_SIZE, archive_past_events
+
+
+class Command(BaseCommand):
+    help = 'Move past events out of the hot set read by the event list, search and upcoming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        archived, restored = archive_past_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} events, restored {restored}'))
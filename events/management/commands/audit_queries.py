@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.benchmarks import seed_benchmark_data
+from events.query_audit import audit_queries, suggested_migrations
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries behind each API action and suggest missing indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--registrations', type=int, default=20)
+        parser.add_argument('--strict', action='store_true',
+                            help='Fail when any finding has an index suggestion')
+
+    def handle(self, *args, **options):
+        # Seeded rows are rolled back, like benchmark_endpoints
+        with transaction.atomic():
+            data = seed_benchmark_data(
+                events=options['events'],
+                groups=options['groups'],
+                members=options['members'],
+                registrations=options['registrations'],
+            )
+            findings = audit_queries(data)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'endpoint':<24}{'node':<12}{'ms':>9}  detail")
+        for finding in findings:
+            line = f"{finding.scenario:<24}{finding.node:<12}{finding.ms:>9}  {finding.detail}"
+            self.stdout.write(self.style.WARNING(line) if finding.suggestion else line)
+
+        migrations = suggested_migrations(findings)
+        for app_label, module in migrations.items():
+            self.stdout.write(f'\n# Suggested migration for {app_label}\n')
+            self.stdout.write(module)
+
+        if not migrations:
+            self.stdout.write(self.style.SUCCESS('\nNo missing indexes found'))
+        elif options['strict']:
+            raise CommandError(f"Missing indexes in: {', '.join(migrations)}")
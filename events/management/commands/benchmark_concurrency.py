@@ -0,0 +1,53 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.benchmarks import CONCURRENCY_ENDPOINTS, load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput of the sync read endpoints on a WSGI server with '
+        'the async ones on an ASGI server, at high concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://localhost:8000',
+                            help='e.g. gunicorn server.wsgi -w 4')
+        parser.add_argument('--asgi-url', default='http://localhost:8001',
+                            help='e.g. gunicorn server.asgi:application -w 4 -k uvicorn.workers.UvicornWorker')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--event', help='Event slug for the detail endpoint')
+        parser.add_argument('--group', help='Group slug for the detail endpoint')
+        parser.add_argument('--token', help='Clerk session token for my_registrations')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else {}
+
+        header = f"{'endpoint':<26}{'server':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses"
+        self.stdout.write(header)
+        for name, sync_path, async_path in CONCURRENCY_ENDPOINTS:
+            if '{event}' in sync_path and not options['event']:
+                continue
+            if '{group}' in sync_path and not options['group']:
+                continue
+            if name == 'event-my-registrations' and not headers:
+                continue
+            for server, base_url, path in (
+                ('wsgi', options['wsgi_url'], sync_path),
+                ('asgi', options['asgi_url'], async_path),
+            ):
+                path = path.format(event=options['event'], group=options['group'])
+                row = asyncio.run(load_test(
+                    base_url, path,
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    headers=headers,
+                ))
+                self.stdout.write(
+                    f"{name:<26}{server:<7}{row['rps']:>10}{row['p50_ms']:>10}"
+                    f"{row['p95_ms']:>10}{row['p99_ms']:>10}  {row['statuses']}"
+                )
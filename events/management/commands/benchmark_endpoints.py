@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.benchmarks import seed_benchmark_data, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Seed benchmark data, replay the hot endpoints and enforce query budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--registrations', type=int, default=20)
+        parser.add_argument('--images', type=int, default=2)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the command can be pointed at a shared database safely.
+        with transaction.atomic():
+            data = seed_benchmark_data(
+                events=options['events'],
+                groups=options['groups'],
+                members=options['members'],
+                registrations=options['registrations'],
+                images=options['images'],
+            )
+            results = run_benchmarks(data, iterations=options['iterations'])
+            transaction.set_rollback(True)
+
+        header = f"{'endpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'budget':>8}"
+        self.stdout.write(header)
+        for result in results:
+            row = result.summary()
+            line = (
+                f"{row['endpoint']:<26}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                f"{row['p99_ms']:>10}{row['queries']:>10}{row['budget']:>8}"
+            )
+            self.stdout.write(self.style.ERROR(line) if result.over_budget or result.over_target else line)
+
+        over = [result.name for result in results if result.over_budget]
+        if over:
+            raise CommandError(f"Query budget exceeded for: {', '.join(over)}")
+        slow = [f'{result.name} (p99 target {result.target_ms} ms)' for result in results if result.over_target]
+        if slow:
+            raise CommandError(f"Latency target missed for: {', '.join(slow)}")
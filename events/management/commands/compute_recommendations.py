@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from events.recommendations import DEFAULT_CHUNK_SIZE, DEFAULT_PER_USER, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user event recommendation table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-user', type=int, default=DEFAULT_PER_USER)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        users = compute_recommendations(per_user=options['per_user'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Computed recommendations for {users} users'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from events.geo import geocode
+from events.models import Event
+from group.models import Group
+
+
+class Command(BaseCommand):
+    help = 'Fill latitude/longitude for events and groups from the offline gazetteer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-geocode rows that already have coordinates')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Event, Group):
+            queryset = model.objects.only('id', 'location', 'latitude', 'longitude').order_by()
+            if not options['all']:
+                queryset = queryset.filter(latitude__isnull=True)
+
+            batch, updated, unknown = [], 0, 0
+            for obj in queryset.iterator(chunk_size=options['batch_size']):
+                coordinates = geocode(obj.location)
+                if coordinates is None:
+                    unknown += 1
+                    continue
+                obj.latitude, obj.longitude = coordinates
+                batch.append(obj)
+                if len(batch) >= options['batch_size']:
+                    updated += model.objects.bulk_update(batch, ['latitude', 'longitude'])
+                    batch = []
+            if batch:
+                updated += model.objects.bulk_update(batch, ['latitude', 'longitude'])
+
+            self.stdout.write(f'{model.__name__}: geocoded {updated}, unknown location {unknown}')
@@ -0,0 +1,80 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+from authentication.local_clerk import LocalClerk
+from events.benchmarks import seed_benchmark_data
+from events.loadtest import SCENARIO_WEIGHTS, LoadPlan, clear_load_data, run_load
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed data, then replay weighted scenarios against a running server at a target '
+        'request rate. Start the server with CLERK_ISSUER_URL and CLERK_API_BASE_URL set '
+        'to http://127.0.0.1:<clerk-port>, IMAGE_STORAGE=server.storage.LocalImageStorage and '
+        'NUM_PROXIES=1 (the runner stands in for one proxy), against the same database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--rps', type=float, default=50)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds')
+        parser.add_argument('--max-in-flight', type=int, default=500)
+        parser.add_argument('--clerk-port', type=int, default=8765,
+                            help='Port of the local Clerk JWKS and user API')
+        for name, weight in SCENARIO_WEIGHTS.items():
+            parser.add_argument(f'--{name}', type=int, default=weight, dest=name.replace('-', '_'),
+                                help=f'Weight of the {name} scenario')
+        parser.add_argument('--events', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Leave the seeded rows in place')
+
+    def handle(self, *args, **options):
+        if options['rps'] <= 0 or options['duration'] <= 0:
+            raise CommandError('--rps and --duration must be positive')
+        weights = {name: options[name.replace('-', '_')] for name in SCENARIO_WEIGHTS}
+        if sum(weights.values()) <= 0:
+            raise CommandError('At least one scenario needs a positive weight')
+
+        if api_settings.NUM_PROXIES != 1:
+            self.stderr.write(self.style.WARNING(
+                'NUM_PROXIES is not 1 here; unless the server under test sets it, every virtual '
+                'user shares one address and the per-IP throttles reject most writes.'
+            ))
+
+        # The server under test runs in another process, so the data is committed
+        clear_load_data()
+        with transaction.atomic():
+            data = seed_benchmark_data(events=options['events'], groups=options['groups'])
+            # The rush should measure contention, not the event filling up
+            Event.objects.filter(pk=data['event'].pk).update(spots_left=1_000_000)
+        plan = LoadPlan.from_seed(data)
+
+        try:
+            with LocalClerk(port=options['clerk_port']) as clerk:
+                self.stdout.write(f"Local Clerk at {clerk.url}, {options['rps']} req/s for {options['duration']}s")
+                rows = asyncio.run(run_load(
+                    options['base_url'], plan, clerk,
+                    rps=options['rps'],
+                    duration=options['duration'],
+                    weights=weights,
+                    max_in_flight=options['max_in_flight'],
+                    seed=options['seed'],
+                ))
+        finally:
+            if not options['keep']:
+                clear_load_data()
+
+        self.stdout.write(
+            f"{'scenario':<16}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}  statuses"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['scenario']:<16}{row['requests']:>10}{row['rps']:>10}{row['p50_ms']:>10}"
+                f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['error_rate']:>9.2%}  {row['statuses']}"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.suggest import rebuild_search_tags
+
+
+class Command(BaseCommand):
+    help = 'Recount the tag vocabulary used for search suggestions'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_tags()
+        self.stdout.write(self.style.SUCCESS(f'{count} tags are suggestible'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending event scores from recent registrations'
+
+    def handle(self, *args, **options):
+        count = rebuild_trending()
+        self.stdout.write(self.style.SUCCESS(f'{count} events are trending'))
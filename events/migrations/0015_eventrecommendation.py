@@ -0,0 +1,30 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_latitude_event_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=200)),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='events.event')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['user_id', '-score'], name='event_rec_user_score_idx')],
+                'unique_together': {('user_id', 'event')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_eventrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEvent',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='events.event')),
+                ('log_score', models.FloatField(db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-log_score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['registered_at'], name='event_reg_registered_at_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:38
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+import django.utils.timezone
+
+
+def backfill_updated_at(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Event.objects.filter(updated_at__isnull=True).update(updated_at=Coalesce('created_at', Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_trendingevent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.CharField(max_length=64)),
+                ('slug', models.CharField(blank=True, max_length=255, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at', 'id'], name='event_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0018_event_event_date_idx_event_event_type_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['date', 'id'], name='event_hot_date_idx'),
+        ),
+    ]
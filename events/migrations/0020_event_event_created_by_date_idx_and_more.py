@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0019_event_is_archived_event_event_hot_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_by', 'date'], name='event_created_by_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['groupId', 'date'], name='event_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['user_id', '-registered_at'], include=('event',), name='event_reg_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['event', '-registered_at'], name='event_reg_event_idx'),
+        ),
+    ]
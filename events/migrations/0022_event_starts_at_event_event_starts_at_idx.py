@@ -0,0 +1,32 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+
+def backfill_starts_at(apps, schema_editor):
+    from events.calendar import event_start
+
+    Event = apps.get_model('events', 'Event')
+    for event in Event.objects.only('id', 'date', 'time').iterator(chunk_size=1000):
+        starts_at = event_start(event)
+        if starts_at is not None:
+            Event.objects.filter(pk=event.pk).update(starts_at=starts_at)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0021_event_title_trigram_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_starts_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['starts_at'], name='event_starts_at_idx'),
+        ),
+    ]
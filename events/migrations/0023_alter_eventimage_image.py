@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:11
+
+from django.db import migrations
+import server.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0022_event_starts_at_event_event_starts_at_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventimage',
+            name='image',
+            field=server.storage.StoredImageField(max_length=255, verbose_name='image'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:19
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0010_alter_groupimage_image'),
+        ('events', '0023_alter_eventimage_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(blank=True, max_length=250, null=True, unique=True)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=200)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('is_online', models.BooleanField(default=False)),
+                ('type', models.CharField(choices=[('Conference', 'Conference'), ('Workshop', 'Workshop'), ('Hackathon', 'Hackathon'), ('Meetup', 'Meetup'), ('Webinar', 'Webinar'), ('Other', 'Other')], max_length=50)),
+                ('tags', models.JSONField()),
+                ('organizer', models.CharField(max_length=100)),
+                ('organizer_image', models.CharField(blank=True, max_length=200, null=True)),
+                ('is_free', models.BooleanField(default=True)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('capacity', models.IntegerField(default=0)),
+                ('registration_url', models.URLField(blank=True, null=True)),
+                ('created_by', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], default='WEEKLY', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('weekdays', models.JSONField(blank=True, default=list)),
+                ('starts_on', models.DateField()),
+                ('time', models.TimeField()),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'event series',
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='occurrence_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='groupId',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='event_series', to='group.group'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='events.eventseries'),
+        ),
+        migrations.AddIndex(
+            model_name='eventseries',
+            index=models.Index(fields=['starts_on', 'until'], name='event_series_window_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_start'), name='event_series_occurrence_uniq'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+def fill_search_tags(apps, schema_editor):
+    # Same counts as events.suggest.rebuild_search_tags, which also redoes the keys
+    schema_editor.execute(r"""
+        INSERT INTO events_searchtag (name, key, weight)
+        SELECT tag, left(lower(regexp_replace(btrim(tag), '\s+', ' ', 'g')), 100), COUNT(*) FROM (
+            SELECT element #>> '{}' AS tag
+            FROM events_event,
+                 jsonb_array_elements(CASE WHEN jsonb_typeof(tags) = 'array' THEN tags ELSE '[]' END) AS element
+            WHERE NOT is_archived AND jsonb_typeof(element) = 'string'
+            UNION ALL
+            SELECT unnest(tags) FROM group_group
+        ) AS used
+        WHERE tag <> ''
+        GROUP BY tag
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0024_eventseries_event_occurrence_start_and_more'),
+        ('group', '0010_alter_groupimage_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField(unique=True)),
+                ('key', models.TextField(db_collation='C', db_index=True)),
+                ('weight', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_search_tags, migrations.RunPython.noop),
+    ]
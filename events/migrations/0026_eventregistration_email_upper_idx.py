@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:48
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0025_searchtag'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(django.db.models.functions.text.Upper('user_email'), name='event_reg_email_upper_idx'),
+        ),
+    ]
@@ -1,9 +1,14 @@
+from django.core.validators import MinValueValidator
 from django.db import models
-from cloudinary.models import CloudinaryField
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.utils.text import slugify
 from django.utils import timezone
+from .geo import GeocodedModel, apply_geocode
+from .calendar import apply_event_start, invalidate_month, invalidate_series_months
+from server.storage import StoredImageField
 
-class Event(models.Model):
+class Event(GeocodedModel, models.Model):
     EVENT_TYPES = (
         ('Conference', 'Conference'),
         ('Workshop', 'Workshop'),
@@ -20,7 +25,12 @@ class Event(models.Model):
     date = models.CharField(max_length=50)
     time = models.CharField(max_length=50)
     end_time = models.CharField(max_length=50, blank=True, null=True)
+    # Parsed from date and time in events.calendar; null when they do not parse
+    starts_at = models.DateTimeField(blank=True, null=True)
     location = models.CharField(max_length=200)
+    # Filled from the offline gazetteer in events.geo
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     is_online = models.BooleanField(default=False)
     type = models.CharField(max_length=50, choices=EVENT_TYPES)
     tags = models.JSONField()
@@ -36,29 +46,134 @@ class Event(models.Model):
     created_by = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
+    # Set by the archive_events command, see events.archive
+    is_archived = models.BooleanField(default=False)
+    # A materialized occurrence of a recurring series and the slot it
+    # replaces, see events.series
+    series = models.ForeignKey('EventSeries', on_delete=models.CASCADE, null=True, blank=True, related_name='occurrences')
+    occurrence_start = models.DateTimeField(blank=True, null=True)
 
 
     def save(self, *args, **kwargs):
         # Generate slug if not provided
         if not self.slug:
             self.slug = slugify(self.title)
+
+        previous_start = self.starts_at
+        if kwargs.get('update_fields') is None:
+            apply_geocode(self)
+            apply_event_start(self)
         
         # Make sure spots_left is calculated correctly
         # if not self.id:  # New event
         #     self.spots_left = self.capacity - self.attendees
             
         super().save(*args, **kwargs)
+        invalidate_month(previous_start)
+        invalidate_month(self.starts_at)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The group an event moves away from, see events.signals
+        if 'groupId_id' in field_names:
+            instance._loaded_group_id = instance.groupId_id
+        return instance
     
     def __str__(self):
         return self.title
     
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='event_lat_lng_idx'),
+            models.Index(fields=['updated_at', 'id'], name='event_updated_at_idx'),
+            # Default ordering, alone and under the admin's type filter
+            models.Index(fields=['date', 'id'], name='event_date_idx'),
+            models.Index(fields=['type', 'date'], name='event_type_date_idx'),
+            # Hot set for list, search and upcoming
+            models.Index(fields=['date', 'id'], name='event_hot_date_idx', condition=Q(is_archived=False)),
+            # my_events, and a group's events in date order
+            models.Index(fields=['created_by', 'date'], name='event_created_by_date_idx'),
+            models.Index(fields=['groupId', 'date'], name='event_group_date_idx'),
+            # Calendar month histograms
+            models.Index(fields=['starts_at'], name='event_starts_at_idx'),
+        ]
+        constraints = [
+            # One row per series slot; also looked up when expanding a series
+            models.UniqueConstraint(fields=['series', 'occurrence_start'], name='event_series_occurrence_uniq'),
+        ]
+
+
+class EventSeries(GeocodedModel, models.Model):
+    """
+    A recurring event stored as one rule instead of a row per occurrence.
+    Occurrences are expanded on request, see events.series.
+    """
+    DAILY = 'DAILY'
+    WEEKLY = 'WEEKLY'
+    MONTHLY = 'MONTHLY'
+    FREQUENCIES = (
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    )
+
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=250, unique=True, blank=True, null=True)
+    description = models.TextField()
+    location = models.CharField(max_length=200)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    is_online = models.BooleanField(default=False)
+    type = models.CharField(max_length=50, choices=Event.EVENT_TYPES)
+    tags = models.JSONField()
+    organizer = models.CharField(max_length=100)
+    organizer_image = models.CharField(max_length=200, blank=True, null=True)
+    is_free = models.BooleanField(default=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # Spots per occurrence
+    capacity = models.IntegerField(default=0)
+    registration_url = models.URLField(blank=True, null=True)
+    groupId = models.ForeignKey('group.Group', on_delete=models.CASCADE, null=True, blank=True, related_name='event_series')
+    created_by = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
+
+    # The recurrence rule: every ``interval`` days, weeks or months from
+    # ``starts_on``, on ``weekdays`` (0 is Monday) for weekly series, until
+    # ``until`` or for ``count`` occurrences, whichever comes first
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    weekdays = models.JSONField(default=list, blank=True)
+    starts_on = models.DateField()
+    time = models.TimeField()
+    end_time = models.TimeField(blank=True, null=True)
+    until = models.DateField(blank=True, null=True)
+    count = models.PositiveIntegerField(blank=True, null=True)
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.title)
+        if kwargs.get('update_fields') is None:
+            apply_geocode(self)
+        super().save(*args, **kwargs)
+        invalidate_series_months()
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        verbose_name_plural = 'event series'
+        indexes = [
+            # Series running during an expanded window, see events.series
+            models.Index(fields=['starts_on', 'until'], name='event_series_window_idx'),
+        ]
 
 
 class EventImage(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='images')
-    image = CloudinaryField('image')
+    image = StoredImageField('image')
 
     def __str__(self):
         return self.event.title
@@ -78,6 +193,85 @@ class EventRegistration(models.Model):
     class Meta:
         unique_together = ['event', 'user_id']  # Prevent duplicate registrations
         ordering = ['-registered_at']
+        indexes = [
+            models.Index(fields=['registered_at'], name='event_reg_registered_at_idx'),
+            # my_registrations; covering, so the event ids come from the index alone
+            models.Index(fields=['user_id', '-registered_at'], name='event_reg_user_idx', include=['event']),
+            # attendees, newest first
+            models.Index(fields=['event', '-registered_at'], name='event_reg_event_idx'),
+            # Case-insensitive email search in the admin
+            models.Index(Upper('user_email'), name='event_reg_email_upper_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user_name or self.user_id} - {self.event.title}"
+
+
+class EventRecommendation(models.Model):
+    """
+    Precomputed event ranking per user, rebuilt by the compute_recommendations command
+    """
+    user_id = models.CharField(max_length=200)  # Same key as EventRegistration.user_id
+    event = models.ForeignKey('Event', on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ['user_id', 'event']
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['user_id', '-score'], name='event_rec_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.event_id} ({self.score:.3f})"
+
+
+class TrendingEvent(models.Model):
+    """
+    Materialized trending ranking, maintained by events.trending.
+    ``log_score`` is the log of the time-decayed registration count
+    measured against a fixed epoch, so rows never need re-decaying.
+    """
+    event = models.OneToOneField('Event', on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    log_score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-log_score']
+
+    def __str__(self):
+        return f"{self.event_id} ({self.log_score:.3f})"
+
+
+class SearchTag(models.Model):
+    """
+    The tag vocabulary of events and groups for search suggestions,
+    weighted by how many use each tag. Maintained by events.suggest.
+    """
+    name = models.TextField(unique=True)
+    # The normalized name; byte order lets one index serve LIKE 'prefix%' and its ordering
+    key = models.TextField(db_collation='C', db_index=True)
+    weight = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.weight})"
+
+
+class Tombstone(models.Model):
+    """
+    Deletion log for delta sync; one row per deleted event or group
+    """
+    model = models.CharField(max_length=50)  # 'event' or 'group'
+    object_id = models.CharField(max_length=64)
+    slug = models.CharField(max_length=255, blank=True, null=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
@@ -0,0 +1,257 @@
+"""
+Query-plan audit.
+
+Replays the API's read actions against seeded data, runs
+``EXPLAIN (ANALYZE, FORMAT JSON)`` on every distinct SELECT they issue and
+flags sequential scans and sorts, with a suggested index for each.
+
+Seeded tables are small enough that Postgres would pick sequential scans
+and in-memory sorts even where an index exists, so plans are taken with
+``enable_seqscan`` and ``enable_sort`` off. A Seq Scan or Sort that
+survives means no index serves that access path, and so does an index
+scan with no index condition, walked end to end only for its order.
+"""
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .benchmarks import LOCAL_IMAGE_STORAGE, _scenarios
+
+# "(user_id)::text = '5'::text", "(owner_id = 3)", "(date)::text >= ..."
+FILTER_COLUMN = re.compile(r'"?(\w+)"?\)?(?:::[\w ]+)?\s*(=|<>|<=|>=|<|>|~~\*?)')
+RANGE_OPERATORS = ('<', '>', '<=', '>=')
+# Literals differ between calls of the same query, e.g. per-row lookups
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def _audit_scenarios(data):
+    """The GET scenarios from events.benchmarks plus the per-user lists"""
+    event, group = data['event'], data['group']
+    owner, member = data['owner'], data['member']
+
+    for scenario in _scenarios(data):
+        if scenario[1] == 'get':
+            yield scenario
+    yield 'event-my-events', 'get', lambda: reverse('event-my-events'), lambda: owner
+    yield 'event-recommended', 'get', lambda: reverse('event-recommended'), lambda: member
+    yield 'group-list', 'get', lambda: reverse('group-list'), lambda: member
+    yield 'group-detail', 'get', lambda: reverse('group-detail', kwargs={'slug': group.slug}), lambda: member
+    yield 'group-my-groups', 'get', lambda: reverse('group-my-groups'), lambda: owner
+    yield 'group-by-category', 'get', lambda: reverse('group-list') + '?category=TECH&ordering=-member_count', lambda: member
+    yield 'group-by-tags', 'get', lambda: reverse('group-list') + '?tags=bench,tag-1', lambda: member
+    yield 'group-by-location', 'get', lambda: reverse('group-list') + '?location=kampala', lambda: member
+    yield 'group-search', 'get', lambda: reverse('group-list') + '?search=bench', lambda: member
+
+
+class Finding:
+    def __init__(self, scenario, node, model, detail, fields, ms):
+        self.scenario = scenario
+        self.node = node
+        self.model = model
+        self.detail = detail
+        self.fields = fields
+        self.ms = ms
+
+    @property
+    def suggestion(self):
+        """``(app_label, model_name, fields)`` for an index, or None"""
+        if self.model is None or not self.fields or _is_indexed(self.model, self.fields):
+            return None
+        return self.model._meta.app_label, self.model._meta.model_name, tuple(self.fields)
+
+
+def _is_indexed(model, fields):
+    """Whether an existing index already leads with ``fields``"""
+    fields = list(fields)
+    existing = [list(index.fields) for index in model._meta.indexes]
+    existing += [list(together) for together in model._meta.unique_together]
+    existing += [
+        [field.name] for field in model._meta.concrete_fields
+        if field.db_index or field.unique or field.primary_key
+    ]
+    return any(index[:len(fields)] == fields for index in existing)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        try:
+            cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql)
+            return cursor.fetchone()[0][0]['Plan']
+        finally:
+            cursor.execute('RESET enable_seqscan')
+            cursor.execute('RESET enable_sort')
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+
+def _model_for_table(table):
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _field_name(model, column):
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return field.name
+    return None
+
+
+def _index_fields(model, index_name, backward=False):
+    """Field names of an existing index, in the order a scan returns rows"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            SELECT a.attname, (i.indoption[k.n - 1] & 1) = 1
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, n)
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+            WHERE c.relname = %s
+            ORDER BY k.n
+            ''',
+            [index_name],
+        )
+        columns = cursor.fetchall()
+    fields = []
+    for column, descending in columns:
+        name = _field_name(model, column)
+        if name is None:
+            return []
+        fields.append(('-' if descending != backward else '') + name)
+    return fields
+
+
+def _filter_fields(model, condition):
+    """Field names compared in a plan condition, equality before range"""
+    equality, ranged = [], []
+    for column, operator in FILTER_COLUMN.findall(condition or ''):
+        name = _field_name(model, column)
+        if name is None or name in equality or name in ranged:
+            continue
+        (ranged if operator in RANGE_OPERATORS else equality).append(name)
+    return equality + ranged
+
+
+def _sort_fields(model, table, keys):
+    """Field names for a Sort Key, or None when it sorts on an expression"""
+    fields = []
+    for key in keys:
+        column, _, direction = key.partition(' ')
+        column = column.split('.')[-1].strip('"')
+        if column.startswith(table + '.'):
+            column = column[len(table) + 1:]
+        name = _field_name(model, column)
+        if name is None:
+            return None
+        fields.append(('-' if direction.startswith('DESC') else '') + name)
+    return fields
+
+
+def plan_findings(scenario, plan):
+    findings = []
+    for node in _walk(plan):
+        ms = round(node.get('Actual Total Time', 0.0), 3)
+        if node['Node Type'] == 'Seq Scan' and node.get('Filter'):
+            model = _model_for_table(node['Relation Name'])
+            fields = _filter_fields(model, node['Filter']) if model else []
+            findings.append(Finding(scenario, 'Seq Scan', model, f"{node['Relation Name']}: {node['Filter']}", fields, ms))
+        elif node['Node Type'] in ('Index Scan', 'Index Only Scan') and node.get('Filter') and not node.get('Index Cond'):
+            model = _model_for_table(node['Relation Name'])
+            fields = []
+            filtered = _filter_fields(model, node['Filter']) if model else []
+            # A unique lookup returns one row however it is found
+            if filtered and not any(model._meta.get_field(name).unique for name in filtered):
+                # Keep the order the index was chosen for, after the filter columns
+                order = _index_fields(model, node['Index Name'], node.get('Scan Direction') == 'Backward')
+                fields = [name for name in filtered if name not in {field.lstrip('-') for field in order}] + order
+            detail = f"{node['Relation Name']} via {node['Index Name']}: {node['Filter']}"
+            findings.append(Finding(scenario, 'Full Index', model, detail, fields, ms))
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            scans = [child for child in _walk(node) if 'Relation Name' in child]
+            model = _model_for_table(scans[0]['Relation Name']) if len(scans) == 1 else None
+            fields = None
+            if model is not None:
+                fields = _sort_fields(model, model._meta.db_table, node['Sort Key'])
+            if fields is not None:
+                # Sorting after a filter wants the filter's equality columns first
+                condition = scans[0].get('Index Cond') or scans[0].get('Filter')
+                prefix = [name for name in _filter_fields(model, condition)
+                          if name not in {field.lstrip('-') for field in fields}]
+                fields = prefix + fields
+            findings.append(Finding(scenario, node['Node Type'], model, ', '.join(node['Sort Key']), fields or [], ms))
+    return findings
+
+
+def audit_queries(data):
+    """
+    Replay each scenario once and EXPLAIN every distinct SELECT it runs.
+    Returns a list of ``Finding``.
+    """
+    rest_framework = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+    client = APIClient(SERVER_NAME='localhost')
+    findings, seen = [], set()
+
+    with override_settings(REST_FRAMEWORK=rest_framework, IMAGE_STORAGE=LOCAL_IMAGE_STORAGE):
+        for name, method, url_factory, user_factory in _audit_scenarios(data):
+            client.force_authenticate(user=user_factory())
+            with CaptureQueriesContext(connection) as ctx:
+                getattr(client, method)(url_factory())
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                shape = LITERAL.sub('?', sql)
+                if not sql.lstrip().upper().startswith('SELECT') or shape in seen:
+                    continue
+                seen.add(shape)
+                findings.extend(plan_findings(name, explain(sql)))
+        client.force_authenticate(user=None)
+
+    return findings
+
+
+def _index_name(model_name, fields):
+    name = '_'.join([model_name] + [field.lstrip('-') for field in fields]).lower()
+    # Django caps index names at 30 characters
+    return name[:26] + '_idx'
+
+
+def suggested_migrations(findings):
+    """Migration modules, per app, adding an index for each finding"""
+    suggestions = sorted({finding.suggestion for finding in findings if finding.suggestion})
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    modules = {}
+    for app_label in sorted({app_label for app_label, _, _ in suggestions}):
+        leaf = loader.graph.leaf_nodes(app_label)
+        lines = [
+            'from django.db import migrations, models',
+            '',
+            '',
+            'class Migration(migrations.Migration):',
+            '',
+            f'    dependencies = [{leaf[0]!r}]' if leaf else '    dependencies = []',
+            '',
+            '    operations = [',
+        ]
+        for _, model_name, fields in (s for s in suggestions if s[0] == app_label):
+            lines += [
+                '        migrations.AddIndex(',
+                f'            model_name={model_name!r},',
+                f'            index=models.Index(fields={list(fields)!r}, name={_index_name(model_name, fields)!r}),',
+                '        ),',
+            ]
+        lines.append('    ]')
+        modules[app_label] = '\n'.join(lines) + '\n'
+    return modules
@@ -0,0 +1,136 @@
+"""
+Tag-similarity event recommendations.
+
+A batch job builds one feature vector per upcoming event (its tags plus its
+type) and one per user (the features of every event they registered for
+plus the tags of their groups), scores users against events with a single
+matrix product per chunk of users and stores the top events per user in
+``EventRecommendation``. The API only ever reads that table.
+"""
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from group.models import Group
+from .models import Event, EventRecommendation, EventRegistration
+
+DEFAULT_PER_USER = 50
+DEFAULT_CHUNK_SIZE = 500
+
+
+def event_features(tags, event_type):
+    """Normalized feature names for an event's tags and type"""
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    features = {f'tag:{str(tag).strip().lower()}' for tag in tags or [] if str(tag).strip()}
+    if event_type:
+        features.add(f'type:{event_type.lower()}')
+    return features
+
+
+def group_features(tags):
+    return {f'tag:{tag.strip().lower()}' for tag in tags or [] if tag.strip()}
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _history_user_ids():
+    """Every user key that has registrations or group memberships"""
+    registered = set(EventRegistration.objects.values_list('user_id', flat=True).distinct())
+    members = {
+        str(user_id) for user_id in
+        Group.members.through.objects.values_list('user_id', flat=True).distinct()
+    }
+    return sorted(registered | members)
+
+
+def _user_profiles(user_ids):
+    """Return ``{user_id: Counter(feature -> weight)}`` and registered event ids"""
+    profiles = defaultdict(Counter)
+    registered = defaultdict(set)
+
+    registrations = EventRegistration.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'event_id', 'event__tags', 'event__type'
+    )
+    for user_id, event_id, tags, event_type in registrations.iterator():
+        profiles[user_id].update(event_features(tags, event_type))
+        registered[user_id].add(event_id)
+
+    memberships = Group.members.through.objects.filter(
+        user_id__in=[int(user_id) for user_id in user_ids if user_id.isdigit()]
+    ).values_list('user_id', 'group__tags')
+    for user_id, tags in memberships.iterator():
+        profiles[str(user_id)].update(group_features(tags))
+
+    return profiles, registered
+
+
+def compute_recommendations(per_user=DEFAULT_PER_USER, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rebuild ``EventRecommendation`` for every user with history.
+
+    Returns the number of users processed. Rows for users who no longer
+    have any history are removed at the end of the run.
+    """
+    started = timezone.now()
+    candidates = list(
+        Event.objects.filter(date__gte=started).values_list('id', 'tags', 'type')
+    )
+
+    vocabulary = {}
+    if candidates:
+        candidate_features = [event_features(tags, event_type) for _, tags, event_type in candidates]
+        vocabulary = {
+            feature: index
+            for index, feature in enumerate(sorted(set().union(*candidate_features)))
+        }
+        event_ids = [event_id for event_id, _, _ in candidates]
+        event_index = {event_id: row for row, event_id in enumerate(event_ids)}
+        events = np.zeros((len(candidates), len(vocabulary)), dtype=np.float32)
+        for row, features in enumerate(candidate_features):
+            events[row, [vocabulary[feature] for feature in features]] = 1.0
+        events = _normalize_rows(events)
+
+    user_ids = _history_user_ids()
+    for offset in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[offset:offset + chunk_size]
+        rows = []
+
+        if vocabulary:
+            profiles, registered = _user_profiles(chunk)
+            users = np.zeros((len(chunk), len(vocabulary)), dtype=np.float32)
+            for row, user_id in enumerate(chunk):
+                for feature, weight in profiles[user_id].items():
+                    if feature in vocabulary:
+                        users[row, vocabulary[feature]] = weight
+            scores = _normalize_rows(users) @ events.T
+
+            for row, user_id in enumerate(chunk):
+                already = [event_index[event_id] for event_id in registered[user_id] if event_id in event_index]
+                scores[row, already] = 0.0
+
+            k = min(per_user, scores.shape[1])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, user_id in enumerate(chunk):
+                for column in top[row]:
+                    score = float(scores[row, column])
+                    if score > 0:
+                        rows.append(EventRecommendation(
+                            user_id=user_id,
+                            event_id=event_ids[column],
+                            score=score,
+                            computed_at=started,
+                        ))
+
+        with transaction.atomic():
+            EventRecommendation.objects.filter(user_id__in=chunk).delete()
+            EventRecommendation.objects.bulk_create(rows)
+
+    EventRecommendation.objects.filter(computed_at__lt=started).delete()
+    return len(user_ids)
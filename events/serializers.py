@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from .models import Event, EventImage, EventRegistration
-from django.conf import settings
+from .models import Event, EventImage, EventRegistration, EventSeries
+from server.fragments import FragmentCacheListSerializer
+from server.tracing import TracedSerializerMixin, TracedListSerializer
 import json
+import logging
+from .tasks import queue_image_upload, upload_event_image
+
+logger = logging.getLogger(__name__)
 
 
 class EventImageSerializer(serializers.ModelSerializer):
@@ -16,20 +21,36 @@ class EventImageSerializer(serializers.ModelSerializer):
             if request is not None:
                 # Ensure we're using the full URL including scheme and domain
                 return request.build_absolute_uri(obj.image.url)
-            return f"{settings.MEDIA_URL}{obj.image}"
+            return obj.image.url
         return None
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(TracedSerializerMixin, serializers.ModelSerializer):
 
-    images = EventImageSerializer(many=True, read_only=True)
+    images = serializers.SerializerMethodField()
     uploaded_images = serializers.ListField(child=serializers.ImageField(max_length=1000000, allow_empty_file=False, use_url=False),
         write_only=True,
         required=False)
+    distance_km = serializers.SerializerMethodField()
+    # Rendered per request on fragment cache hits, see server.fragments
+    fragment_dynamic_fields = ['distance_km', 'is_archived']
+
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date', 'time','registration_url', 'organizer','organizer_image', 'location', 'is_online', 'type', 'tags', 'organizer', 'attendees', 'is_free', 'price', 'spots_left', 'images', 'uploaded_images', 'created_by', 'groupId', 'slug']
+        fields = ['id', 'title', 'description', 'date', 'time','registration_url', 'organizer','organizer_image', 'location', 'latitude', 'longitude', 'distance_km', 'is_online', 'type', 'tags', 'organizer', 'attendees', 'is_free', 'price', 'spots_left', 'images', 'uploaded_images', 'created_by', 'groupId', 'slug', 'is_archived', 'series']
+        read_only_fields = ['is_archived', 'series']
+        list_serializer_class = FragmentCacheListSerializer
 
+    def get_images(self, obj):
+        # Series occurrences without a row (see events.series) have no images
+        if obj.pk is None:
+            return []
+        return EventImageSerializer(obj.images.all(), many=True, context=self.context).data
     
+    def get_distance_km(self, obj):
+        # Only set when the list was filtered with ?near=
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
+
     def validate_tags(self, value):
         # Ensure tags is always a list
         if isinstance(value, str):
@@ -38,7 +59,7 @@ class EventSerializer(serializers.ModelSerializer):
     
 
 
-class EventCreateSerializer(serializers.ModelSerializer):
+class EventCreateSerializer(TracedSerializerMixin, serializers.ModelSerializer):
 
     images = EventImageSerializer(many=True, read_only=True)
     uploaded_images = serializers.ListField(child=serializers.ImageField(max_length=1000000, allow_empty_file=False, use_url=False),
@@ -50,6 +71,8 @@ class EventCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = '__all__'
+        read_only_fields = ['is_archived', 'series', 'occurrence_start']
+        list_serializer_class = TracedListSerializer
 
     def validate_tags(self, value):
         if isinstance(value, list):
@@ -68,11 +91,15 @@ class EventCreateSerializer(serializers.ModelSerializer):
 
     
     def create(self, validated_data):
-        print(validated_data, 'validated_data')
         images_data = validated_data.pop('uploaded_images', [])
+        logger.debug("Creating event", extra={
+            'title': validated_data.get('title'),
+            'image_count': len(images_data),
+        })
         event = Event.objects.create(**validated_data)
+        # Uploads run on the task workers; images appear once they finish
         for image_data in images_data:
-            EventImage.objects.create(event=event, image=image_data)
+            queue_image_upload(upload_event_image, image_data, event_id=event.id)
         return event
     
 
@@ -91,10 +118,11 @@ class EventWithRegistrationSerializer(EventSerializer):
     Event serializer that includes registration status for the current user
     """
     is_registered = serializers.SerializerMethodField()
+    fragment_dynamic_fields = EventSerializer.fragment_dynamic_fields + ['is_registered']
     
     def get_is_registered(self, obj):
         request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.is_authenticated:
+        if obj.pk is not None and request and hasattr(request, 'user') and request.user.is_authenticated:
             return EventRegistration.objects.filter(
                 event=obj, 
                 user_id=request.user.id
@@ -102,4 +130,28 @@ class EventWithRegistrationSerializer(EventSerializer):
         return False
     
     class Meta(EventSerializer.Meta):
-        fields = EventSerializer.Meta.fields + ['is_registered']
\ No newline at end of file
+        fields = EventSerializer.Meta.fields + ['is_registered']
+
+class EventSeriesSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = EventSeries
+        fields = '__all__'
+        read_only_fields = ['slug', 'latitude', 'longitude']
+        list_serializer_class = TracedListSerializer
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(not isinstance(day, int) or not 0 <= day <= 6 for day in value):
+            raise serializers.ValidationError("Weekdays must be a list of numbers from 0 (Monday) to 6.")
+        return value
+
+    def validate_tags(self, value):
+        if isinstance(value, str):
+            return [tag.strip() for tag in value.split(',') if tag.strip()]
+        return value
+
+    def validate(self, attrs):
+        starts_on = attrs.get('starts_on', getattr(self.instance, 'starts_on', None))
+        until = attrs.get('until', getattr(self.instance, 'until', None))
+        if starts_on and until and until < starts_on:
+            raise serializers.ValidationError({'until': "Must not be before starts_on."})
+        return attrs
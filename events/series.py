@@ -0,0 +1,296 @@
+"""
+Recurring event series.
+
+An ``EventSeries`` keeps one recurrence rule instead of an ``Event`` row per
+occurrence. Lists, ``upcoming`` and the calendar expand the series that
+match a request over the date window it covers, into unsaved ``Event``
+instances (``pk`` is None) with the slug ``<series slug>-<YYYY-MM-DD>``.
+
+Recurrence follows ``dateutil.rrule``. An occurrence becomes a row only
+when it has to hold data: someone registers for it, or an organizer edits
+it (an override). The row keeps its slot in ``occurrence_start``, copies
+the series as it was then, and replaces its day's occurrence in every
+later expansion, even when the override or a later edit of the series
+moves the time.
+
+``OccurrenceList`` pages a queryset and its occurrences as one list in the
+queryset's order, without reading rows outside the page.
+"""
+import functools
+import re
+from datetime import date, datetime, timedelta
+
+from dateutil import rrule
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Event, EventSeries
+
+# How far ahead lists and upcoming expand series when no window is given
+SERIES_HORIZON = timedelta(weeks=8)
+# Occurrences expanded per request, across all series
+MAX_OCCURRENCES = 500
+
+OCCURRENCE_SLUG_RE = re.compile(r'^(?P<series>.+)-(?P<day>\d{4}-\d{2}-\d{2})$')
+
+
+FREQUENCIES = {
+    EventSeries.DAILY: rrule.DAILY,
+    EventSeries.WEEKLY: rrule.WEEKLY,
+    EventSeries.MONTHLY: rrule.MONTHLY,
+}
+
+
+def series_rule(series, first):
+    """
+    The ``rrule`` of ``series``, ignoring ``until``. Without a ``count`` it
+    starts at the period holding ``first`` rather than ``starts_on``, so a
+    long-running series is not walked from its beginning on every request.
+    """
+    start, step = series.starts_on, series.interval
+    options = {'freq': FREQUENCIES[series.frequency], 'interval': step}
+    if series.frequency == EventSeries.WEEKLY:
+        options['byweekday'] = sorted(set(series.weekdays or [])) or [start.weekday()]
+    elif series.frequency == EventSeries.MONTHLY:
+        # Months without the start's day of the month are skipped
+        options['bymonthday'] = start.day
+
+    dtstart = start
+    if series.count is not None:
+        options['count'] = series.count
+    elif first > start:
+        if series.frequency == EventSeries.DAILY:
+            dtstart = start + timedelta(days=(first - start).days // step * step)
+        elif series.frequency == EventSeries.WEEKLY:
+            monday = start - timedelta(days=start.weekday())
+            k = (first - monday).days // (7 * step)
+            if k > 0:
+                dtstart = monday + timedelta(weeks=k * step)
+        else:
+            k = ((first.year - start.year) * 12 + first.month - start.month) // step
+            if k > 0:
+                year, month = divmod(start.month - 1 + k * step, 12)
+                dtstart = date(start.year + year, month + 1, 1)
+    return rrule.rrule(dtstart=datetime.combine(dtstart, datetime.min.time()), **options)
+
+
+def occurrence_days(series, first, last):
+    """Days of ``series`` occurrences from ``first`` up to, not including, ``last``"""
+    if series.until is not None:
+        last = min(last, series.until + timedelta(days=1))
+    if first >= last:
+        return
+    for moment in series_rule(series, first):
+        day = moment.date()
+        if day >= last:
+            return
+        if day >= first:
+            yield day
+
+
+def parse_window(params):
+    """
+    The ``[start, end)`` datetimes of ``?from=YYYY-MM-DD&to=YYYY-MM-DD``
+    (both days included; either may be left out), or None when neither is
+    given. Raises ValueError for malformed dates.
+    """
+    if not params.get('from') and not params.get('to'):
+        return None
+    today = timezone.localdate()
+    first = datetime.strptime(params['from'], '%Y-%m-%d').date() if params.get('from') else today
+    last = datetime.strptime(params['to'], '%Y-%m-%d').date() if params.get('to') else first + SERIES_HORIZON
+    start = timezone.make_aware(datetime.combine(first, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), datetime.min.time()))
+    return start, end
+
+
+def occurrence_start(series, day):
+    return timezone.make_aware(datetime.combine(day, series.time))
+
+
+def day_bounds(first, last):
+    """Aware datetimes from the start of ``first`` to the start of ``last``"""
+    return (
+        timezone.make_aware(datetime.combine(first, datetime.min.time())),
+        timezone.make_aware(datetime.combine(last, datetime.min.time())),
+    )
+
+
+def occurrence_slug(series, day):
+    return f'{series.slug}-{day.isoformat()}'
+
+
+def build_occurrence(series, start):
+    """An unsaved ``Event`` for the occurrence of ``series`` at ``start``"""
+    day = timezone.localtime(start).date()
+    occurrence = Event(
+        title=series.title,
+        slug=occurrence_slug(series, day),
+        description=series.description,
+        date=day.isoformat(),
+        time=series.time.strftime('%H:%M'),
+        end_time=series.end_time.strftime('%H:%M') if series.end_time else None,
+        starts_at=start,
+        location=series.location,
+        latitude=series.latitude,
+        longitude=series.longitude,
+        is_online=series.is_online,
+        type=series.type,
+        tags=list(series.tags or []),
+        organizer=series.organizer,
+        organizer_image=series.organizer_image,
+        is_free=series.is_free,
+        price=series.price,
+        spots_left=series.capacity,
+        registration_url=series.registration_url,
+        groupId_id=series.groupId_id,
+        created_by=series.created_by,
+        created_at=series.created_at,
+        updated_at=series.updated_at,
+        series=series,
+        occurrence_start=start,
+    )
+    # Set by NearFilterBackend on the series
+    if getattr(series, 'distance_km', None) is not None:
+        occurrence.distance_km = series.distance_km
+    return occurrence
+
+
+def expand_series(queryset, start, end, limit=MAX_OCCURRENCES):
+    """
+    Unsaved occurrences of the series in ``queryset`` starting in
+    ``[start, end)``, ordered by start. Days that already have a row are
+    left out, whatever time the row was saved with; the rows are listed
+    with the other events. One query.
+    """
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(end).date() + timedelta(days=1)
+    # Only series running during the window
+    queryset = queryset.filter(Q(until__isnull=True) | Q(until__gte=first), starts_on__lt=last)
+    day_start, day_end = day_bounds(first, last)
+    series_list = queryset.order_by().annotate(materialized=ArrayAgg(
+        'occurrences__occurrence_start',
+        filter=Q(occurrences__occurrence_start__gte=day_start, occurrences__occurrence_start__lt=day_end),
+    ))
+    occurrences = []
+    for series in series_list:
+        taken = {timezone.localtime(saved).date() for saved in series.materialized or []}
+        for day in occurrence_days(series, first, last):
+            slot = occurrence_start(series, day)
+            if start <= slot < end and day not in taken:
+                occurrences.append(build_occurrence(series, slot))
+    occurrences.sort(key=lambda occurrence: occurrence.starts_at)
+    return occurrences[:limit]
+
+
+def resolve_occurrence(slug):
+    """
+    The event at an occurrence slug: its row when it has one, otherwise
+    an unsaved occurrence. None when the slug names no occurrence.
+    """
+    match = OCCURRENCE_SLUG_RE.match(slug or '')
+    if match is None:
+        return None
+    try:
+        day = datetime.strptime(match.group('day'), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    series = EventSeries.objects.filter(slug=match.group('series')).first()
+    if series is None or next(occurrence_days(series, day, day + timedelta(days=1)), None) is None:
+        return None
+    # A row saved before the series' time changed still owns its day
+    day_start, day_end = day_bounds(day, day + timedelta(days=1))
+    row = Event.objects.filter(
+        series=series, occurrence_start__gte=day_start, occurrence_start__lt=day_end
+    ).first()
+    return row or build_occurrence(series, occurrence_start(series, day))
+
+
+def materialize(occurrence):
+    """Save an unsaved occurrence, or return the row a concurrent request saved"""
+    try:
+        with transaction.atomic():
+            occurrence.save()
+        return occurrence
+    except IntegrityError:
+        return Event.objects.get(series=occurrence.series, occurrence_start=occurrence.occurrence_start)
+
+
+class OccurrenceList:
+    """
+    ``queryset`` and unsaved ``occurrences`` merged in the queryset's
+    ordering, sliceable like a queryset so paginators can page it.
+
+    An occurrence's place is its index among the occurrences plus the
+    rows ordered before it (ties go to rows). A slice counts those rows
+    for the occurrences that can reach it in one aggregate, then reads
+    only the rows between them.
+    """
+
+    def __init__(self, queryset, occurrences):
+        self.queryset = queryset
+        # Plain field and annotation names; the occurrences carry the same attributes
+        self.ordering = [term for term in queryset.query.order_by if isinstance(term, str)]
+        self.occurrences = sorted(occurrences, key=functools.cmp_to_key(self._compare))
+        self._positions = []
+
+    def _compare(self, a, b):
+        for term in self.ordering:
+            name = term.lstrip('-')
+            left, right = getattr(a, name), getattr(b, name)
+            if left != right:
+                result = -1 if left < right else 1
+                return -result if term.startswith('-') else result
+        return 0
+
+    def _rows_before(self, occurrence):
+        condition = Q()
+        for term in reversed(self.ordering):
+            name = term.lstrip('-')
+            value = getattr(occurrence, name)
+            lookup = 'gt' if term.startswith('-') else 'lt'
+            condition = Q(**{f'{name}__{lookup}': value}) | (Q(**{name: value}) & condition)
+        return condition
+
+    def positions(self, stop):
+        """Merged indexes of the occurrences that can fall before ``stop``"""
+        wanted = min(stop, len(self.occurrences))
+        if wanted > len(self._positions):
+            pending = range(len(self._positions), wanted)
+            aggregates = {}
+            for n in pending:
+                condition = self._rows_before(self.occurrences[n])
+                aggregates[f'before_{n}'] = Count('pk', filter=condition) if condition else Count('pk')
+            counts = self.queryset.order_by().aggregate(**aggregates)
+            self._positions += [n + counts[f'before_{n}'] for n in pending]
+        return self._positions[:wanted]
+
+    def count(self):
+        return self.queryset.count() + len(self.occurrences)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        if stop is None:
+            stop = self.count()
+        placed = {}
+        skipped = 0
+        for occurrence, position in zip(self.occurrences, self.positions(stop)):
+            if position < start:
+                skipped += 1
+            elif position < stop:
+                placed[position] = occurrence
+        rows = iter(self.queryset[start - skipped:stop - skipped - len(placed)])
+        merged = []
+        for position in range(start, stop):
+            item = placed.get(position) or next(rows, None)
+            if item is None:
+                break
+            merged.append(item)
+        return merged
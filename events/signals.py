@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from group.models import Group, GroupImage
+from group.tasks import refresh_event_count
+from .calendar import invalidate_month, invalidate_series_months
+from .models import Event, EventImage, EventSeries, Tombstone
+from .suggest import add_search_tags
+from .tasks import delete_stored_image
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Group)
+def record_tombstone(sender, instance, **kwargs):
+    """Log deletions so delta sync can tell clients to drop the row"""
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=str(instance.pk),
+        slug=instance.slug,
+    )
+
+
+@receiver(post_delete, sender=EventImage)
+@receiver(post_delete, sender=GroupImage)
+def delete_image_asset(sender, instance, **kwargs):
+    """Queue removal of the stored file behind a deleted image row"""
+    if instance.image:
+        delete_stored_image.delay(public_id=instance.image.public_id)
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_calendar_month(sender, instance, **kwargs):
+    invalidate_month(instance.starts_at)
+
+
+@receiver(post_delete, sender=EventSeries)
+def invalidate_series_calendar(sender, instance, **kwargs):
+    invalidate_series_months()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Group)
+def add_suggested_tags(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'tags' in update_fields:
+        add_search_tags(instance.tags)
+
+
+# Cached list fragments (server.fragments) are keyed on updated_at, so
+# changes to what a row renders bump it on the row itself. Membership
+# changes are bumped in GroupViewSet.join/leave: an m2m_changed receiver
+# would cost every join an extra query.
+@receiver(post_save, sender=EventImage)
+@receiver(post_delete, sender=EventImage)
+def touch_event(sender, instance, **kwargs):
+    now = timezone.now()
+    Event.objects.filter(pk=instance.event_id).update(updated_at=now)
+    # Groups render their events too
+    Group.objects.filter(events=instance.event_id).update(updated_at=now)
+
+
+@receiver(post_save, sender=GroupImage)
+@receiver(post_delete, sender=GroupImage)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def touch_group(sender, instance, **kwargs):
+    group_id = instance.group_id if sender is GroupImage else instance.groupId_id
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Event)
+def count_saved_event(sender, instance, created, update_fields=None, **kwargs):
+    """Recount the groups an event joined or left, see Group.event_count"""
+    if update_fields is not None and 'groupId' not in update_fields:
+        return
+    current = instance.groupId_id
+    # Unknown for instances that were neither loaded nor just created
+    previous = getattr(instance, '_loaded_group_id', None if created else ...)
+    if previous != current:
+        for group_id in {previous, current} - {None, ...}:
+            refresh_event_count.delay(group_id=group_id)
+    instance._loaded_group_id = current
+
+
+@receiver(post_delete, sender=Event)
+def count_deleted_event(sender, instance, origin=None, **kwargs):
+    # Nothing to recount when the group itself is being deleted
+    if instance.groupId_id is not None and not isinstance(origin, Group):
+        refresh_event_count.delay(group_id=instance.groupId_id)
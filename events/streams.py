@@ -0,0 +1,158 @@
+"""
+Live seat counts for events.
+
+``register``/``unregister`` publish each event's new ``spots_left`` and
+``attendees`` after their transaction commits. Clients follow an event at
+``/api/events/events/<slug>/stream/`` with Server-Sent Events or, on the
+same path, a WebSocket, instead of polling the detail endpoint.
+
+Streams are served by a raw ASGI app mounted in front of Django in
+``server.asgi`` so each connection is a suspended coroutine that notices
+client disconnects, rather than a worker thread.
+"""
+import asyncio
+import json
+import logging
+import re
+
+from django.conf import settings
+
+from server.pubsub import get_broker
+from .models import Event
+
+STREAM_PATH = re.compile(r'^/api/events/events/(?P<slug>[^/]+)/stream/?$')
+HEARTBEAT_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+def seats_channel(slug):
+    return f'event:{slug}:seats'
+
+
+def seats_payload(event):
+    return {'slug': event.slug, 'spots_left': event.spots_left, 'attendees': event.attendees}
+
+
+def publish_seats(event):
+    """
+    Push an event's current seat counts to every follower. Live updates are
+    best-effort: a broker failure is logged, never raised into the write
+    that already committed.
+    """
+    try:
+        get_broker().publish(seats_channel(event.slug), seats_payload(event))
+    except Exception:
+        logger.exception('Could not publish seat counts for %s', event.slug)
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _snapshot(slug):
+    return await Event.objects.filter(slug=slug).values('slug', 'spots_left', 'attendees').afirst()
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin1')
+    if origin and origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+        return [(b'access-control-allow-origin', origin.encode('latin1')), (b'vary', b'Origin')]
+    return []
+
+
+async def _next_message(subscription, disconnected):
+    """
+    Wait for a message, a disconnect or the heartbeat interval.
+    Returns the message, or None on heartbeat; raises ClientDisconnected
+    once the client has gone.
+    """
+    getter = asyncio.ensure_future(subscription.get())
+    done, _ = await asyncio.wait({getter, disconnected}, timeout=HEARTBEAT_SECONDS,
+                                 return_when=asyncio.FIRST_COMPLETED)
+    if disconnected in done:
+        getter.cancel()
+        raise ClientDisconnected
+    if getter in done:
+        return getter.result()
+    getter.cancel()
+    return None
+
+
+async def _wait_for_disconnect(receive, disconnect_type):
+    while (await receive())['type'] != disconnect_type:
+        pass
+
+
+async def sse_stream(scope, receive, send, slug):
+    snapshot = await _snapshot(slug)
+    if snapshot is None:
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not found'})
+        return
+
+    subscription = get_broker().subscribe(seats_channel(slug))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive, 'http.disconnect'))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stop nginx from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        message = snapshot
+        while True:
+            if message is None:
+                body = b': keepalive\n\n'
+            else:
+                body = f'event: seats\ndata: {json.dumps(message)}\n\n'.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            message = await _next_message(subscription, disconnected)
+    except ClientDisconnected:
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def websocket_stream(scope, receive, send, slug):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    snapshot = await _snapshot(slug)
+    if snapshot is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe(seats_channel(slug))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive, 'websocket.disconnect'))
+    try:
+        message = snapshot
+        while True:
+            if message is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(message)})
+            message = await _next_message(subscription, disconnected)
+    except ClientDisconnected:
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+def with_seat_streams(django_application):
+    """Wrap the Django ASGI app, serving stream paths directly"""
+
+    async def application(scope, receive, send):
+        match = STREAM_PATH.match(scope.get('path', '')) if scope['type'] in ('http', 'websocket') else None
+        if match is None:
+            return await django_application(scope, receive, send)
+        if scope['type'] == 'websocket':
+            return await websocket_stream(scope, receive, send, match['slug'])
+        return await sse_stream(scope, receive, send, match['slug'])
+
+    return application
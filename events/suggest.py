@@ -0,0 +1,228 @@
+"""
+Typeahead suggestions for the search box.
+
+``suggest(q)`` returns the best prefix and fuzzy matches among hot event
+titles, group names and tags. With ``pg_trgm`` installed, titles and names
+are matched in Postgres through trigram GIN indexes on ``UPPER(title)`` and
+``UPPER(name)``: a prefix ``LIKE`` or a trigram word-similarity hit, prefix
+matches first. Without it (another database, or a server where the
+extension is not available) they come from an in-process ``PrefixIndex``
+that is rebuilt every ``INDEX_TIMEOUT`` seconds.
+
+Tags are served from the ``SearchTag`` table by an indexed prefix query.
+Saving an event or group adds its new tags at once; ``rebuild_search_tags``
+recounts the weights and drops unused tags, so run it periodically.
+
+Short queries are shared by many users and match the most rows, so their
+results are cached for ``SUGGEST_CACHE_TIMEOUT``.
+"""
+import bisect
+import hashlib
+import threading
+import time
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Upper
+
+from group.models import Group
+from .models import Event, SearchTag
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_QUERY_LENGTH = 100
+# Fuzzy matching on one or two characters matches nearly everything
+FUZZY_MIN_LENGTH = 3
+
+SUGGEST_CACHE_TIMEOUT = 30
+CACHED_PREFIX_LENGTH = 6
+INDEX_TIMEOUT = 60
+# Bounds the work for one- and two-letter prefixes on large indexes
+SCAN_LIMIT = 1000
+
+
+def normalize(q):
+    return ' '.join(q.lower().split())[:MAX_QUERY_LENGTH]
+
+
+class PrefixIndex:
+    """
+    Sorted word-suffix keys searched with ``bisect``. Every word of a label
+    starts a key, so "meet" finds "Python Meetup".
+    """
+
+    def __init__(self, entries):
+        self.items = []
+        keys = []
+        for label, value, weight in entries:
+            words = normalize(label).split()
+            item = len(self.items)
+            self.items.append((value, weight))
+            for position in range(len(words)):
+                keys.append((' '.join(words[position:]), position, item))
+        keys.sort()
+        self.keys = [key for key, _, _ in keys]
+        self.positions = [(position, item) for _, position, item in keys]
+
+    def search(self, q, limit):
+        q = normalize(q)
+        start = bisect.bisect_left(self.keys, q)
+        best = {}
+        for n in range(start, min(start + SCAN_LIMIT, len(self.keys))):
+            if not self.keys[n].startswith(q):
+                break
+            position, item = self.positions[n]
+            # Matches at the start of the label rank first
+            best[item] = min(best.get(item, position), position)
+        ranked = sorted(best, key=lambda item: (best[item] > 0, -self.items[item][1]))
+        return [self.items[item][0] for item in ranked[:limit]]
+
+
+_indexes = {}
+_lock = threading.Lock()
+_trigram = {}
+
+
+def _event_entries():
+    for title, slug, attendees in Event.objects.filter(is_archived=False).values_list('title', 'slug', 'attendees'):
+        yield title, {'title': title, 'slug': slug}, attendees
+
+
+def _group_entries():
+    for name, slug, member_count in Group.objects.values_list('name', 'slug', 'member_count'):
+        yield name, {'name': name, 'slug': slug}, member_count
+
+
+SOURCES = {
+    'events': _event_entries,
+    'groups': _group_entries,
+}
+
+# Tag counts over live events (tags is a JSON list) and groups, in one pass each
+TAG_COUNTS_SQL = f"""
+    SELECT tag, COUNT(*) FROM (
+        SELECT element #>> '{{}}' AS tag
+        FROM {Event._meta.db_table},
+             jsonb_array_elements(CASE WHEN jsonb_typeof(tags) = 'array' THEN tags ELSE '[]' END) AS element
+        WHERE NOT is_archived AND jsonb_typeof(element) = 'string'
+        UNION ALL
+        SELECT unnest(tags) FROM {Group._meta.db_table}
+    ) AS used
+    WHERE tag <> ''
+    GROUP BY tag
+"""
+
+
+def add_search_tags(tags):
+    """Make new tags suggestible before the next rebuild"""
+    names = {tag for tag in tags or () if isinstance(tag, str) and tag}
+    if names:
+        SearchTag.objects.bulk_create(
+            [SearchTag(name=name, key=normalize(name), weight=1) for name in names], ignore_conflicts=True
+        )
+
+
+def rebuild_search_tags():
+    """
+    Recount every tag's weight and drop tags nothing uses any more.
+    Returns the number of tags.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(TAG_COUNTS_SQL)
+        counts = cursor.fetchall()
+    with transaction.atomic():
+        SearchTag.objects.exclude(name__in=[name for name, _ in counts]).delete()
+        SearchTag.objects.bulk_create(
+            [SearchTag(name=name, key=normalize(name), weight=count) for name, count in counts],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['key', 'weight'],
+        )
+    return len(counts)
+
+
+def _tag_matches(q, limit):
+    """The heaviest tags starting with ``q``, among the first ``SCAN_LIMIT`` in key order"""
+    matches = SearchTag.objects.filter(key__startswith=q).order_by('key').values_list('name', 'weight')[:SCAN_LIMIT]
+    return [name for name, _ in sorted(matches, key=lambda match: (-match[1], match[0]))[:limit]]
+
+
+def get_index(name):
+    """The named ``PrefixIndex``, rebuilt once it is older than ``INDEX_TIMEOUT``"""
+    built = _indexes.get(name)
+    if built is None or time.monotonic() - built[0] > INDEX_TIMEOUT:
+        with _lock:
+            built = _indexes.get(name)
+            if built is None or time.monotonic() - built[0] > INDEX_TIMEOUT:
+                built = (time.monotonic(), PrefixIndex(SOURCES[name]()))
+                _indexes[name] = built
+    return built[1]
+
+
+def reset_indexes():
+    _indexes.clear()
+    _trigram.clear()
+
+
+def trigram_enabled():
+    """Whether ``pg_trgm`` is installed in the current database"""
+    if connection.vendor != 'postgresql':
+        return False
+    if connection.alias not in _trigram:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram[connection.alias] = cursor.fetchone()[0]
+    return _trigram[connection.alias]
+
+
+def _trigram_matches(queryset, field, q, weight, limit):
+    upper = q.upper()
+    match = Q(_match__startswith=upper)
+    if len(q) >= FUZZY_MIN_LENGTH:
+        match |= Q(_match__trigram_word_similar=upper)
+    return (
+        queryset.annotate(_match=Upper(field))
+        .filter(match)
+        .annotate(
+            _prefix=Case(When(_match__startswith=upper, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            _similarity=TrigramWordSimilarity(q, field),
+        )
+        .order_by('-_prefix', '-_similarity', f'-{weight}')[:limit]
+    )
+
+
+def _suggest(q, limit):
+    if trigram_enabled():
+        events = [
+            {'title': title, 'slug': slug} for title, slug in _trigram_matches(
+                Event.objects.filter(is_archived=False), 'title', q, 'attendees', limit
+            ).values_list('title', 'slug')
+        ]
+        groups = [
+            {'name': name, 'slug': slug} for name, slug in _trigram_matches(
+                Group.objects.all(), 'name', q, 'member_count', limit
+            ).values_list('name', 'slug')
+        ]
+    else:
+        events = get_index('events').search(q, limit)
+        groups = get_index('groups').search(q, limit)
+    return {'events': events, 'groups': groups, 'tags': _tag_matches(q, limit)}
+
+
+def suggest(q, limit=DEFAULT_LIMIT):
+    """Up to ``limit`` suggestions each for events, groups and tags"""
+    q = normalize(q)
+    if not q:
+        return {'events': [], 'groups': [], 'tags': []}
+    if len(q) > CACHED_PREFIX_LENGTH:
+        return _suggest(q, limit)
+
+    key = 'suggest:%d:%s' % (limit, hashlib.md5(q.encode()).hexdigest())
+    data = cache.get(key)
+    if data is None:
+        data = _suggest(q, limit)
+        cache.set(key, data, SUGGEST_CACHE_TIMEOUT)
+    return data
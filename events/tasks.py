@@ -0,0 +1,35 @@
+"""Background side effects of event requests, see ``taskqueue.queue``"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from server.storage import get_image_storage
+from server.tracing import span
+from taskqueue.queue import task
+from .models import Event, EventImage
+
+
+def queue_image_upload(upload_task, uploaded_file, **kwargs):
+    """Stage an uploaded file in the task queue for ``upload_task``"""
+    uploaded_file.seek(0)
+    return upload_task.delay(
+        payload=uploaded_file.read(),
+        filename=uploaded_file.name,
+        content_type=getattr(uploaded_file, 'content_type', None) or '',
+        **kwargs
+    )
+
+
+@task
+def upload_event_image(event_id, filename, content_type='', payload=None):
+    if not Event.objects.filter(pk=event_id).exists():
+        return
+    with span('image.upload', model='EventImage', event=event_id):
+        image = get_image_storage().save(SimpleUploadedFile(filename, payload, content_type))
+    EventImage.objects.create(event_id=event_id, image=image)
+
+
+# Keeps the name it had when images always lived on Cloudinary, so queued rows still run
+@task(name='events.tasks.delete_cloudinary_asset')
+def delete_stored_image(public_id):
+    """Remove an image from storage once nothing references it"""
+    with span('image.destroy', public_id=public_id):
+        get_image_storage().delete(public_id)
@@ -1,8 +1,35 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from datetime import date, time as dt_time, timedelta
 from rest_framework import status
 from rest_framework.test import APIClient
-from .models import Event
+from .models import Event, EventImage, EventRegistration, EventRecommendation, EventSeries, SearchTag, TrendingEvent
+from taskqueue.models import Task
+from .trending import rebuild_trending
+from .streams import publish_seats, with_seat_streams
+from .recommendations import compute_recommendations
+from .benchmarks import seed_benchmark_data, run_benchmarks
+from .archive import archive_past_events
+from .query_audit import audit_queries, plan_findings
+from .serializers import EventSerializer
+from .series import occurrence_days
+from .suggest import rebuild_search_tags, reset_indexes, suggest
+from .tasks import delete_stored_image, upload_event_image
+from group.models import Group
+from server.idempotency import idempotency_cache_key
+from server.throttling import IPTokenBucketThrottle
 
 class EventTests(TestCase):
     def setUp(self):
@@ -39,3 +66,916 @@ class EventTests(TestCase):
             format='json'
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class EndpointQueryBudgetTests(TestCase):
+    """Fails when a hot endpoint runs more queries than its budget allows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_benchmark_data(events=30, groups=3, members=8, registrations=4)
+
+    def test_endpoints_within_query_budget(self):
+        for result in run_benchmarks(self.data, iterations=3):
+            with self.subTest(endpoint=result.name):
+                self.assertLess(max(result.statuses), 400, result.summary())
+                self.assertLessEqual(result.max_queries, result.budget, result.summary())
+
+
+@override_settings(REST_FRAMEWORK=dict(
+    settings.REST_FRAMEWORK,
+    DEFAULT_THROTTLE_RATES={'register': '1/min', 'register_ip': '5/min'},
+))
+class RegisterThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='throttled-user')
+        self.event = Event.objects.create(
+            title='Throttled Event', description='x', date='2099-01-01', time='10:00',
+            location='Kampala', type='Meetup', tags=[], organizer='x',
+            spots_left=10, created_by='someone',
+        )
+        self.url = reverse('event-register', kwargs={'slug': self.event.slug})
+
+    def test_user_bucket_returns_retry_after(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_ip_bucket_applies_across_users(self):
+        for i in range(5):
+            self.client.force_authenticate(user=User.objects.create(username=f'ip-user-{i}'))
+            self.assertEqual(self.client.post(self.url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=User.objects.create(username='ip-user-extra'))
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_concurrent_requests_cannot_share_a_token(self):
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'})
+        view = mock.Mock(throttle_scope='race')
+        results, barrier = [], threading.Barrier(10)
+        get = LocMemCache.get
+
+        def slow_get(cache, *args, **kwargs):
+            # Widen the window between reading and writing the bucket
+            value = get(cache, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        def request_token():
+            barrier.wait()
+            results.append(IPTokenBucketThrottle().allow_request(request, view))
+
+        rest_framework = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={'race': '3/min'})
+        with override_settings(REST_FRAMEWORK=rest_framework), mock.patch.object(LocMemCache, 'get', slow_get):
+            threads = [threading.Thread(target=request_token) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(True), 3)
+
+
+class RegistrationsCalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='feed-user')
+        self.event = Event.objects.create(
+            title='Feed Event', description='Bring a laptop, please', date='2099-01-01',
+            time='10:00', end_time='12:00', location='Kampala', type='Meetup', tags=[],
+            organizer='x', spots_left=10, created_by='someone',
+        )
+        EventRegistration.objects.create(event=self.event, user_id=str(self.user.id))
+        self.client.force_authenticate(user=self.user)
+        self.url = self.client.get(reverse('event-calendar-url')).data['url']
+        self.client.force_authenticate(user=None)
+
+    def test_feed_and_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('SUMMARY:Feed Event', body)
+        self.assertIn('DTSTART:20990101T100000', body)
+        self.assertIn('DESCRIPTION:Bring a laptop\\, please', body)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_feed_changes_when_registrations_change(self):
+        etag = self.client.get(self.url)['ETag']
+        EventRegistration.objects.filter(user_id=str(self.user.id)).delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tampered_token_is_rejected(self):
+        response = self.client.get(self.url + 'x')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NearbyEventTests(TestCase):
+    def setUp(self):
+        for title, location in [('Kampala Meetup', 'Acacia Mall, Kampala'),
+                                ('Entebbe Meetup', 'Entebbe'),
+                                ('Nairobi Meetup', 'Nairobi, Kenya'),
+                                ('Online Meetup', 'Zoom')]:
+            Event.objects.create(
+                title=title, description='x', date='2099-01-01', time='10:00',
+                location=location, type='Meetup', tags=[], organizer='x', created_by='x',
+            )
+
+    def test_locations_are_geocoded_offline(self):
+        kampala = Event.objects.get(title='Kampala Meetup')
+        self.assertAlmostEqual(kampala.latitude, 0.3476)
+        self.assertIsNone(Event.objects.get(title='Online Meetup').latitude)
+
+    def test_moving_to_an_unknown_location_clears_coordinates(self):
+        event = Event.objects.get(title='Kampala Meetup')
+        event.location = 'Online'
+        event.save()
+        event.refresh_from_db()
+        self.assertIsNone(event.latitude)
+        self.assertIsNone(event.longitude)
+
+        response = APIClient().get(reverse('event-list'), {'near': '0.31,32.58', 'radius_km': 50})
+        self.assertEqual([event['title'] for event in response.data['results']], ['Entebbe Meetup'])
+
+    def test_near_returns_distance_sorted_results_within_radius(self):
+        response = APIClient().get(reverse('event-list'), {'near': '0.31,32.58', 'radius_km': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [event['title'] for event in response.data['results']]
+        self.assertEqual(titles, ['Kampala Meetup', 'Entebbe Meetup'])
+        self.assertLess(response.data['results'][0]['distance_km'], 5)
+
+    def test_invalid_near_is_rejected(self):
+        response = APIClient().get(reverse('event-list'), {'near': 'kampala'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecommendedEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='rec-user')
+        defaults = dict(description='x', date='2099-01-01', time='10:00', location='x',
+                        organizer='x', created_by='x')
+        past = Event.objects.create(title='Past Python', type='Workshop', tags=['python', 'django'],
+                                    **dict(defaults, date='2000-01-01'))
+        self.django_event = Event.objects.create(title='Django Night', type='Meetup', tags=['django'], **defaults)
+        self.yoga_event = Event.objects.create(title='Yoga', type='Other', tags=['wellness'], **defaults)
+        EventRegistration.objects.create(event=past, user_id=str(self.user.id))
+
+    def test_recommendations_rank_by_tag_similarity(self):
+        compute_recommendations()
+        self.assertEqual(
+            list(EventRecommendation.objects.filter(user_id=str(self.user.id)).values_list('event__title', flat=True)),
+            ['Django Night'],
+        )
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('event-recommended'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['title'] for event in response.data['results']], ['Django Night'])
+
+    def test_falls_back_to_upcoming_without_history(self):
+        response = APIClient().get(reverse('event-recommended'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+
+class TrendingEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        defaults = dict(description='x', date='2099-01-01', time='10:00', location='x',
+                        type='Meetup', tags=[], organizer='x', created_by='x', spots_left=10)
+        self.hot = Event.objects.create(title='Hot', **defaults)
+        self.warm = Event.objects.create(title='Warm', **defaults)
+        now = timezone.now()
+        for i in range(3):
+            EventRegistration.objects.create(event=self.hot, user_id=f'h{i}', registered_at=now)
+        # More registrations, but two days old
+        for i in range(5):
+            EventRegistration.objects.create(event=self.warm, user_id=f'w{i}', registered_at=now - timedelta(days=2))
+
+    def test_recent_registrations_outrank_older_ones(self):
+        rebuild_trending()
+        response = APIClient().get(reverse('event-trending'))
+        self.assertEqual([event['title'] for event in response.data], ['Hot', 'Warm'])
+
+    def test_incremental_update_matches_rebuild(self):
+        rebuild_trending()
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(username='trend-user'))
+        client.post(reverse('event-register', kwargs={'slug': self.warm.slug}))
+        incremental = TrendingEvent.objects.get(event=self.warm).log_score
+
+        rebuild_trending()
+        self.assertAlmostEqual(TrendingEvent.objects.get(event=self.warm).log_score, incremental, places=3)
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        defaults = dict(description='x', date='2099-01-01', time='10:00', location='x',
+                        type='Meetup', tags=[], organizer='x', created_by='x')
+        self.kept = Event.objects.create(title='Kept', **defaults)
+        self.changed = Event.objects.create(title='Changed', **defaults)
+        self.removed = Event.objects.create(title='Removed', **defaults)
+        self.client = APIClient()
+
+    def test_returns_changes_and_tombstones_since_token(self):
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+        Event.objects.filter(pk__in=[self.kept.pk, self.removed.pk]).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.changed.title = 'Changed again'
+        self.changed.save()
+        removed_id = str(self.removed.pk)
+        self.removed.delete()
+
+        response = self.client.get(reverse('event-list'), {'updated_since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['title'] for event in response.data['results']], ['Changed again'])
+        self.assertEqual(response.data['deleted'], [{'id': removed_id, 'slug': 'removed'}])
+        self.assertFalse(response.data['has_more'])
+        self.assertTrue(response.data['sync_token'])
+
+    def test_expired_token_requires_full_resync(self):
+        response = self.client.get(reverse('event-list'), {'updated_since': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_async_list_returns_the_same_delta(self):
+        self.removed.delete()
+        for since in [(timezone.now() - timedelta(minutes=1)).isoformat(), '2000-01-01T00:00:00Z', 'garbage']:
+            expected = self.client.get(reverse('event-list'), {'updated_since': since}, SERVER_NAME='localhost')
+            response = async_to_sync(self.async_client.get)(
+                '/api/async/events/', {'updated_since': since}, SERVER_NAME='localhost'
+            )
+            self.assertEqual(response.status_code, expected.status_code)
+            # Tokens are issued from the time of each call
+            data, expected = response.json(), expected.json()
+            self.assertEqual(bool(data.pop('sync_token', None)), bool(expected.pop('sync_token', None)))
+            self.assertEqual(data, expected)
+
+
+class SeatStreamTests(TestCase):
+    def setUp(self):
+        self.event = Event.objects.create(
+            title='Stream Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x', spots_left=5,
+        )
+
+    async def _follow(self, until):
+        """Run the SSE app until ``until(sent)`` holds, then disconnect"""
+        async def not_found_app(scope, receive, send):
+            raise AssertionError('stream path should not reach Django')
+
+        app = with_seat_streams(not_found_app)
+        sent, inbox = [], asyncio.Queue()
+        scope = {'type': 'http', 'path': f'/api/events/events/{self.event.slug}/stream/', 'headers': []}
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(app(scope, inbox.get, send))
+        for step in until:
+            for _ in range(200):
+                if step(sent):
+                    break
+                await asyncio.sleep(0.01)
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+        return sent
+
+    def test_stream_sends_snapshot_then_published_updates(self):
+        def publish_after_snapshot(sent):
+            if len(sent) == 2:
+                self.event.spots_left = 4
+                publish_seats(self.event)
+            return len(sent) >= 3
+
+        sent = async_to_sync(self._follow)([lambda sent: len(sent) >= 2, publish_after_snapshot])
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'"spots_left": 5', sent[1]['body'])
+        self.assertIn(b'"spots_left": 4', sent[2]['body'])
+
+    def test_broker_failure_does_not_fail_registration(self):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='stream-user'))
+        with mock.patch('events.streams.get_broker') as get_broker, \
+                mock.patch('events.streams.logger'), self.captureOnCommitCallbacks(execute=True):
+            get_broker.return_value.publish.side_effect = ConnectionError('redis is down')
+            response = client.post(reverse('event-register', kwargs={'slug': self.event.slug}))
+        self.assertEqual(response.data['status'], 'registered')
+        get_broker.return_value.publish.assert_called_once()
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user_async')
+        self.event = Event.objects.create(
+            title='Async Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+
+    async def test_list_matches_sync_list(self):
+        response = await self.async_client.get('/api/async/events/', SERVER_NAME='localhost')
+        expected = await sync_to_async(
+            lambda: APIClient(SERVER_NAME='localhost').get('/api/events/events/').json()
+        )()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+
+    async def test_detail_falls_back_to_slugified_lookup(self):
+        response = await self.async_client.get('/api/async/events/Async Event/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['slug'], self.event.slug)
+
+        response = await self.async_client.get('/api/async/events/missing/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_my_registrations_requires_authentication(self):
+        response = await self.async_client.get('/api/async/events/my_registrations/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 401)
+
+        await EventRegistration.objects.acreate(event=self.event, user_id=self.user.id, user_name='x', user_email='x@example.com')
+        with mock.patch('events.async_views.authenticate', mock.AsyncMock(return_value=self.user)):
+            response = await self.async_client.get('/api/async/events/my_registrations/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['slug'] for event in response.json()], [self.event.slug])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='x')
+        self.event = Event.objects.create(
+            title='Admin Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+        EventRegistration.objects.bulk_create([
+            EventRegistration(event=self.event, user_id=f'user_{i}', user_name=f'User {i}')
+            for i in range(30)
+        ])
+        self.client.force_login(self.admin)
+
+    def test_changelist_uses_estimate_only_when_unfiltered(self):
+        with mock.patch('server.paginators.estimated_count', return_value=2_000_000):
+            response = self.client.get('/admin/events/eventregistration/', SERVER_NAME='localhost')
+            self.assertEqual(response.context['cl'].result_count, 2_000_000)
+
+            response = self.client.get('/admin/events/eventregistration/?q=user_1', SERVER_NAME='localhost')
+            self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_search_matches_whole_ids_emails_and_event_slugs(self):
+        EventRegistration.objects.filter(user_id='user_2').update(user_email='Someone@Example.com')
+        for term, count in [('user_2', 1), ('someone@example.com', 1), ('admin-event', 30), ('user', 0)]:
+            response = self.client.get('/admin/events/eventregistration/', {'q': term}, SERVER_NAME='localhost')
+            self.assertEqual(response.context['cl'].result_count, count, term)
+
+    def test_registration_inline_is_paginated(self):
+        url = f'/admin/events/event/{self.event.pk}/change/'
+        response = self.client.get(url, SERVER_NAME='localhost')
+        formset = response.context['inline_admin_formsets'][1].formset
+        self.assertEqual(len(formset.forms), 25)
+        self.assertContains(response, 'page 1 of 2')
+
+        response = self.client.get(f'{url}?eventregistration_page=2', SERVER_NAME='localhost')
+        self.assertEqual(len(response.context['inline_admin_formsets'][1].formset.forms), 5)
+
+
+class EventArchiveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        defaults = dict(description='x', time='10:00', location='x', type='Meetup', tags=[], organizer='x', created_by='x')
+        self.past = Event.objects.create(title='Past Event', date='2000-01-01', **defaults)
+        self.recent = Event.objects.create(title='Recent Event', date=timezone.now().date().isoformat(), **defaults)
+        self.url = reverse('event-list')
+
+    def slugs(self, response):
+        return {event['slug'] for event in response.data['results']}
+
+    def test_list_reads_hot_set_unless_archived_requested(self):
+        self.assertEqual(archive_past_events(), (1, 0))
+
+        self.assertEqual(self.slugs(self.client.get(self.url)), {self.recent.slug})
+        self.assertEqual(self.slugs(self.client.get(self.url, {'search': 'Event'})), {self.recent.slug})
+        response = self.client.get(self.url, {'include_archived': 'true'})
+        self.assertEqual(self.slugs(response), {self.past.slug, self.recent.slug})
+
+        response = self.client.get(reverse('event-detail', args=[self.past.slug]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_archived'])
+
+    def test_events_moved_back_into_window_are_restored(self):
+        archive_past_events()
+        Event.objects.filter(pk=self.past.pk).update(date='2099-01-01')
+
+        self.assertEqual(archive_past_events(), (0, 1))
+        self.assertIn(self.past.slug, self.slugs(self.client.get(self.url)))
+
+    def test_archived_events_show_up_in_the_next_sync(self):
+        since = self.client.get(self.url, {'updated_since': timezone.now().isoformat()}).data['sync_token']
+        archive_past_events()
+
+        response = self.client.get(self.url, {'updated_since': since})
+        self.assertEqual([(event['slug'], event['is_archived']) for event in response.data['results']],
+                         [(self.past.slug, True)])
+
+
+class QueryAuditTests(TestCase):
+    def test_seq_scan_on_unindexed_column_gets_a_suggestion(self):
+        plan = {'Node Type': 'Seq Scan', 'Relation Name': 'events_event',
+                'Filter': "((organizer)::text = 'x'::text)", 'Actual Total Time': 1.0}
+        [finding] = plan_findings('event-list', plan)
+        self.assertEqual(finding.suggestion, ('events', 'event', ('organizer',)))
+
+    def test_api_access_paths_are_indexed(self):
+        data = seed_benchmark_data(events=20, groups=3, members=6, registrations=3)
+        missing = [(f.scenario, f.detail) for f in audit_queries(data) if f.suggestion]
+        self.assertEqual(missing, [])
+
+
+class BatchEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user_batch')
+        self.event = Event.objects.create(
+            title='Batch Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+        EventRegistration.objects.create(event=self.event, user_id=self.user.id)
+
+    def batch(self, *paths, parallel=False):
+        return self.client.post(reverse('batch'), {
+            'requests': [{'id': str(n), 'path': path} for n, path in enumerate(paths)],
+            'parallel': parallel,
+        }, format='json')
+
+    def test_sub_requests_share_one_authentication(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer token')
+        with mock.patch('authentication.auth.ClerkAuthentication.authenticate',
+                        return_value=(self.user, 'token')) as authenticate:
+            response = self.batch('/api/events/events/upcoming/', '/api/events/events/my_registrations/', '/api/groups/')
+
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual([r['status'] for r in response.data['responses']], [200, 200, 200])
+        self.assertEqual(response.data['responses'][1]['body'][0]['slug'], self.event.slug)
+
+    def test_rejects_unknown_paths_and_oversized_batches(self):
+        response = self.batch('/api/nope/', '/api/events/events/missing/')
+        self.assertEqual([r['status'] for r in response.data['responses']], [404, 404])
+
+        self.assertEqual(self.batch('/api/batch/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch(*['/api/groups/'] * 11).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_views_and_failures_answer_per_item(self):
+        with mock.patch('server.batch.logger'), \
+                mock.patch('events.views.EventViewSet.upcoming', side_effect=RuntimeError('boom')):
+            response = self.batch('/api/async/events/', '/api/events/events/upcoming/', '/api/groups/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['responses']], [200, 500, 200])
+        self.assertEqual(response.data['responses'][0]['body']['results'][0]['slug'], self.event.slug)
+
+
+class ParallelBatchTests(TransactionTestCase):
+    def test_parallel_matches_sequential(self):
+        for n in range(3):
+            Event.objects.create(
+                title=f'Parallel {n}', description='x', date='2099-01-01', time='10:00', location='x',
+                type='Meetup', tags=[], organizer='x', created_by='x',
+            )
+        client = APIClient()
+        paths = ['/api/events/events/', '/api/events/events/upcoming/', '/api/events/events/parallel-1/',
+                 '/api/async/events/']
+        results = [
+            client.post(reverse('batch'), {
+                'requests': [{'path': path} for path in paths], 'parallel': parallel,
+            }, format='json').data['responses']
+            for parallel in (False, True)
+        ]
+        self.assertEqual(results[0], results[1])
+        self.assertEqual([r['status'] for r in results[1]], [200, 200, 200, 200])
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user_idem')
+        self.client.force_authenticate(user=self.user)
+        self.event = Event.objects.create(
+            title='Idempotent Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x', spots_left=5,
+        )
+        self.url = reverse('event-register', args=[self.event.slug])
+
+    def test_retry_replays_first_response(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        retry = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendees, 1)
+
+        # A new key runs the view again
+        response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='def')
+        self.assertEqual(response.data['status'], 'already_registered')
+
+    def test_reused_key_with_a_different_body_is_rejected(self):
+        url = reverse('event-list')
+        payload = {
+            'title': 'Keyed Event', 'description': 'x', 'date': '2099-01-01', 'time': '10:00',
+            'location': 'x', 'type': 'Meetup', 'tags': [], 'organizer': 'x', 'created_by': 'x',
+        }
+        first = self.client.post(url, payload, format='json', HTTP_IDEMPOTENCY_KEY='create')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        retry = self.client.post(url, payload, format='json', HTTP_IDEMPOTENCY_KEY='create')
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        other = self.client.post(url, dict(payload, title='Other Event'), format='json', HTTP_IDEMPOTENCY_KEY='create')
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Event.objects.filter(title__in=['Keyed Event', 'Other Event']).count(), 1)
+
+    def test_duplicate_while_first_is_running_conflicts(self):
+        request = mock.Mock(user=self.user, method='POST', path=self.url)
+        cache.add(idempotency_cache_key(request, 'abc') + ':lock', True)
+        with mock.patch('server.idempotency.LOCK_WAIT', 0):
+            response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(EventRegistration.objects.filter(event=self.event).exists())
+
+
+class ImageCleanupTests(TestCase):
+    def test_deleting_an_image_queues_asset_removal(self):
+        event = Event.objects.create(
+            title='Image Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+        EventImage.objects.create(event=event, image='events/poster')
+        event.delete()
+
+        queued = Task.objects.get(name='events.tasks.delete_cloudinary_asset')
+        self.assertEqual(queued.kwargs, {'public_id': 'events/poster'})
+
+    def test_local_storage_round_trip(self):
+        event = Event.objects.create(
+            title='Local Image Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(IMAGE_STORAGE='server.storage.LocalImageStorage', MEDIA_ROOT=media_root):
+            upload_event_image(event_id=event.id, filename='poster.PNG', content_type='image/png', payload=b'png')
+            image = EventImage.objects.get(event=event)
+            self.assertEqual(image.image.format, 'png')
+            stored = os.path.join(media_root, 'images', f'{image.image.public_id}.png')
+            self.assertTrue(os.path.exists(stored))
+
+            delete_stored_image(public_id=image.image.public_id)
+            self.assertFalse(os.path.exists(stored))
+
+
+class ImageStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.event = Event.objects.create(
+            title='Stored Image Event', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+        EventImage.objects.create(event=self.event, image='image/upload/v7/events/poster.jpg')
+
+    def image_url(self):
+        response = self.client.get(reverse('event-detail', kwargs={'slug': self.event.slug}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['images'][0]['image']
+
+    def test_urls_come_from_the_configured_backend(self):
+        with override_settings(CLOUDINARY={'cloud_name': 'demo'}):
+            self.assertEqual(self.image_url(), 'http://res.cloudinary.com/demo/image/upload/v7/events/poster.jpg')
+        with override_settings(IMAGE_STORAGE='server.storage.LocalImageStorage'):
+            self.assertEqual(self.image_url(), 'http://testserver/media/images/events/poster.jpg')
+        # No client is built just to resolve URLs
+        with override_settings(IMAGE_STORAGE='server.storage.S3ImageStorage',
+                               IMAGE_S3={'bucket': 'media', 'endpoint_url': 'http://minio:9000'}):
+            self.assertEqual(self.image_url(), 'http://minio:9000/media/images/events/poster.jpg')
+            with override_settings(IMAGE_BASE_URL='https://cdn.example.com/'):
+                self.assertEqual(self.image_url(), 'https://cdn.example.com/images/events/poster.jpg')
+
+
+class SearchSuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_indexes()
+        self.client = APIClient()
+        owner = User.objects.create(username='suggest-owner')
+        for title, attendees, tags in [
+            ('Python Meetup', 5, ['python', 'community']),
+            ('PyData Workshop', 50, ['data']),
+            ('Advanced Python Patterns', 20, []),
+        ]:
+            Event.objects.create(
+                title=title, description='x', date='2099-01-01', time='10:00', location='x',
+                type='Meetup', tags=tags, organizer='x', created_by='x', attendees=attendees,
+            )
+        Event.objects.create(
+            title='Python Archive', description='x', date='2000-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x', is_archived=True,
+        )
+        Group.objects.create(name='Kampala Pythonistas', description='x', category='TECH',
+                             tags=['python'], location='Kampala', owner=owner)
+
+    def test_prefix_matches_rank_label_starts_first(self):
+        response = self.client.get(reverse('search-suggest'), {'q': 'Py'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [event['title'] for event in response.data['events']],
+            ['PyData Workshop', 'Python Meetup', 'Advanced Python Patterns'],
+        )
+        self.assertEqual([group['slug'] for group in response.data['groups']], ['kampala-pythonistas'])
+        self.assertEqual(response.data['tags'], ['python'])
+
+        response = self.client.get(reverse('search-suggest'), {'q': 'python m', 'limit': 1})
+        self.assertEqual([event['title'] for event in response.data['events']], ['Python Meetup'])
+
+    def test_short_prefixes_are_cached(self):
+        self.client.get(reverse('search-suggest'), {'q': 'py'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('search-suggest'), {'q': ' PY '})
+        self.assertEqual(len(response.data['events']), 3)
+
+    def test_tags_come_from_the_rebuilt_vocabulary(self):
+        Event.objects.filter(title='PyData Workshop').update(tags=['python', 'pytorch'])
+        Event.objects.create(
+            title='Stats Night', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=['pyspark'], organizer='x', created_by='x',
+        )
+        self.assertEqual(suggest('py')['tags'], ['pyspark', 'python'])
+
+        self.assertEqual(rebuild_search_tags(), 4)
+        cache.clear()
+        # python: two events and a group; data is no longer used
+        self.assertEqual(suggest('py')['tags'], ['python', 'pyspark', 'pytorch'])
+        self.assertFalse(SearchTag.objects.filter(name='data').exists())
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for n, (event_type, is_online, is_free) in enumerate([
+            ('Meetup', True, True), ('Meetup', False, True),
+            ('Workshop', True, False), ('Conference', False, False),
+        ]):
+            Event.objects.create(
+                title=f'{event_type} facet {n}', description='x', date='2099-01-01', time='10:00',
+                location='x', type=event_type, tags=[], organizer='x', created_by='x',
+                is_online=is_online, is_free=is_free,
+            )
+        Event.objects.create(
+            title='Other talk', description='x', date='2099-01-01', time='10:00', location='x',
+            type='Meetup', tags=[], organizer='x', created_by='x',
+        )
+
+    def counts(self, data, name):
+        return {option['value']: option['count'] for option in data[name]}
+
+    def test_counts_come_from_one_query_and_exclude_own_selection(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('event-facets'), {'search': 'facet', 'type': 'Meetup', 'is_online': 'true'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 1)
+        # Types among online matches, online flags among meetups
+        self.assertEqual(self.counts(response.data, 'type'), {
+            'Conference': 0, 'Workshop': 1, 'Hackathon': 0, 'Meetup': 1, 'Webinar': 0, 'Other': 0,
+        })
+        self.assertEqual(self.counts(response.data, 'is_online'), {True: 1, False: 1})
+        self.assertEqual(self.counts(response.data, 'is_free'), {True: 1, False: 0})
+
+        # Same query, parameters reordered and differently cased search
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                reverse('event-facets') + '?is_online=true&type=Meetup&search=FACET&page=2'
+            )
+        self.assertEqual(cached.data, response.data)
+
+    def test_group_category_facets(self):
+        owner = User.objects.create(username='facet-owner')
+        for n, category in enumerate(('TECH', 'TECH', 'SOCIAL')):
+            Group.objects.create(name=f'{category} group {n}', description='x', category=category,
+                                 tags=[], location='x', owner=owner)
+        response = self.client.get(reverse('group-facets'))
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(self.counts(response.data, 'category')['TECH'], 2)
+
+        response = self.client.get(reverse('event-facets'), {'type': 'Nope'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarHistogramTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('event-calendar')
+        for n, (date, event_type) in enumerate([
+            ('2099-03-01', 'Meetup'), ('2099-03-01', 'Workshop'), ('2099-03-01', 'Meetup'),
+            ('2099-03-31', 'Meetup'), ('2099-04-01', 'Meetup'), ('Sometime in March', 'Meetup'),
+        ]):
+            Event.objects.create(
+                title=f'Calendar {n}', description='x', date=date, time='23:30', location='x',
+                type=event_type, tags=[], organizer='x', created_by='x',
+            )
+
+    def test_counts_per_day_from_one_aggregate(self):
+        # The histogram, and the series running that month
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'month': '2099-03', 'by': 'type'})
+        self.assertEqual(response.data['days'], [
+            {'date': '2099-03-01', 'count': 3, 'by_type': {'Meetup': 2, 'Workshop': 1}},
+            {'date': '2099-03-31', 'count': 1, 'by_type': {'Meetup': 1}},
+        ])
+        self.assertEqual(self.client.get(self.url, {'month': 'March'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changes_invalidate_both_months(self):
+        self.assertEqual(len(self.client.get(self.url, {'month': '2099-03'}).data['days']), 2)
+        self.assertEqual(len(self.client.get(self.url, {'month': '2099-04'}).data['days']), 1)
+
+        event = Event.objects.get(title='Calendar 3')
+        event.date = '2099-04-02'
+        event.save()
+        self.assertEqual(len(self.client.get(self.url, {'month': '2099-03'}).data['days']), 1)
+        self.assertEqual(len(self.client.get(self.url, {'month': '2099-04'}).data['days']), 2)
+
+        event.delete()
+        self.assertEqual(len(self.client.get(self.url, {'month': '2099-04'}).data['days']), 1)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='fragment-user')
+        self.owner = User.objects.create(username='fragment-owner')
+        self.group = Group.objects.create(name='Fragment Group', description='x', category='TECH',
+                                          tags=[], location='x', owner=self.owner)
+        self.events = [
+            Event.objects.create(
+                title=f'Fragment {n}', description='x', date='2099-01-01', time='10:00', location='x',
+                type='Meetup', tags=[], organizer='x', created_by='x', spots_left=5, groupId=self.group,
+            )
+            for n in range(3)
+        ]
+
+    def rendered(self, url):
+        original = EventSerializer.to_representation
+        with mock.patch.object(EventSerializer, 'to_representation', autospec=True, side_effect=original) as render:
+            response = self.client.get(url)
+        return response, render.call_count
+
+    def test_list_is_assembled_from_cached_fragments(self):
+        first, renders = self.rendered(reverse('event-list'))
+        self.assertEqual(renders, 3)
+        second, renders = self.rendered(reverse('event-list'))
+        self.assertEqual(renders, 0)
+        self.assertEqual(second.data['results'], first.data['results'])
+
+        # Only the changed event is rendered again
+        event = self.events[1]
+        event.title = 'Fragment renamed'
+        event.save()
+        third, renders = self.rendered(reverse('event-list'))
+        self.assertEqual(renders, 1)
+        self.assertIn('Fragment renamed', [row['title'] for row in third.data['results']])
+
+    def test_registration_and_membership_refresh_fragments(self):
+        self.client.get(reverse('group-list'))
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('event-register', kwargs={'slug': self.events[0].slug}))
+        self.client.post(reverse('group-join', kwargs={'slug': self.group.slug}))
+
+        [group] = self.client.get(reverse('group-list')).data['results']
+        self.assertIn('fragment-user', [member['username'] for member in group['members']])
+        attendees = {event['slug']: event['attendees'] for event in group['events']}
+        self.assertEqual(attendees[self.events[0].slug], 1)
+
+
+class EventSeriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='series-user', email='series@example.com')
+        # Tuesdays and Thursdays of March 2099; the 3rd is a Tuesday
+        self.series = EventSeries.objects.create(
+            title='Weekly Python', description='x', location='x', type='Meetup', tags=['python'],
+            organizer='x', created_by='x', capacity=20, frequency=EventSeries.WEEKLY, weekdays=[1, 3],
+            starts_on=date(2099, 3, 3), time=dt_time(18, 0), until=date(2099, 3, 31),
+        )
+        Event.objects.create(
+            title='One-off', description='x', date='2099-03-04', time='10:00', location='x',
+            type='Workshop', tags=[], organizer='x', created_by='x', spots_left=5,
+        )
+
+    def slugs(self, params):
+        response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event['slug'] for event in response.data['results']], response.data['count']
+
+    def test_recurrence_rules(self):
+        series = EventSeries(frequency=EventSeries.MONTHLY, interval=1, starts_on=date(2099, 1, 31), count=4)
+        self.assertEqual(list(occurrence_days(series, date(2099, 1, 1), date(2100, 1, 1))),
+                         [date(2099, 1, 31), date(2099, 3, 31), date(2099, 5, 31), date(2099, 7, 31)])
+        series = EventSeries(frequency=EventSeries.WEEKLY, interval=2, weekdays=[0, 4], starts_on=date(2099, 3, 4))
+        self.assertEqual(list(occurrence_days(series, date(2099, 3, 10), date(2099, 3, 28))),
+                         [date(2099, 3, 16), date(2099, 3, 20)])
+
+    def test_list_merges_occurrences_without_rows(self):
+        slugs, count = self.slugs({'from': '2099-03-01', 'to': '2099-03-10'})
+        self.assertEqual(slugs, ['weekly-python-2099-03-03', 'one-off', 'weekly-python-2099-03-05',
+                                 'weekly-python-2099-03-10'])
+        self.assertEqual(count, 4)
+        self.assertFalse(Event.objects.filter(series=self.series).exists())
+
+        self.assertEqual(self.slugs({'from': '2099-03-01', 'to': '2099-03-31', 'type': 'Workshop'})[0], ['one-off'])
+        # Pages line up with the merged order
+        Event.objects.create(
+            title='Late One-off', description='x', date='2099-03-31', time='20:00', location='x',
+            type='Workshop', tags=[], organizer='x', created_by='x', spots_left=5,
+        )
+        first, count = self.slugs({'from': '2099-03-01', 'to': '2099-03-31'})
+        second, _ = self.slugs({'from': '2099-03-01', 'to': '2099-03-31', 'page': 2})
+        self.assertEqual(count, 11)
+        self.assertEqual(first[1], 'one-off')
+        # Rows go first among events of the same day
+        self.assertEqual(first[-1], 'late-one-off')
+        self.assertEqual(second, ['weekly-python-2099-03-31'])
+
+    def test_registering_materializes_one_occurrence(self):
+        slug = 'weekly-python-2099-03-05'
+        self.assertIsNone(self.client.get(reverse('event-detail', kwargs={'slug': slug})).data['id'])
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('event-register', kwargs={'slug': slug}))
+        self.assertEqual(response.data['status'], 'registered')
+
+        row = Event.objects.get(series=self.series)
+        self.assertEqual((row.slug, row.attendees, row.spots_left), (slug, 1, 19))
+        slugs, count = self.slugs({'from': '2099-03-01', 'to': '2099-03-10'})
+        self.assertEqual(slugs.count(slug), 1)
+        self.assertEqual(count, 4)
+        self.assertEqual(self.client.get(reverse('event-detail', kwargs={'slug': slug})).data['id'], row.id)
+        self.assertEqual(self.client.get(reverse('event-detail', kwargs={'slug': 'weekly-python-2099-03-06'})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_editing_the_series_time_keeps_registered_days_single(self):
+        slug = 'weekly-python-2099-03-05'
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('event-register', kwargs={'slug': slug}))
+        self.series.time = dt_time(19, 0)
+        self.series.save()
+
+        slugs, count = self.slugs({'from': '2099-03-01', 'to': '2099-03-10'})
+        self.assertEqual(slugs.count(slug), 1)
+        self.assertEqual(count, 4)
+        detail = self.client.get(reverse('event-detail', kwargs={'slug': slug})).data
+        self.assertEqual((detail['time'], detail['attendees']), ('18:00', 1))
+        # Days without a row follow the new time
+        detail = self.client.get(reverse('event-detail', kwargs={'slug': 'weekly-python-2099-03-10'})).data
+        self.assertEqual(detail['time'], '19:00')
+
+    def test_async_views_match_the_sync_views(self):
+        for path, params in [('/api/async/events/', {'from': '2099-03-01', 'to': '2099-03-10'}),
+                             ('/api/async/events/weekly-python-2099-03-05/', {})]:
+            expected = self.client.get(path.replace('/api/async/', '/api/events/'), params, SERVER_NAME='localhost').json()
+            response = async_to_sync(self.async_client.get)(path, params, SERVER_NAME='localhost')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected)
+
+    def test_calendar_and_upcoming_include_occurrences(self):
+        url = reverse('event-calendar')
+        days = self.client.get(url, {'month': '2099-03'}).data['days']
+        self.assertEqual(len(days), 10)
+        self.assertEqual(days[1], {'date': '2099-03-04', 'count': 1})
+
+        self.series.until = date(2099, 3, 10)
+        self.series.save()
+        self.assertEqual(len(self.client.get(url, {'month': '2099-03'}).data['days']), 4)
+
+        soon = EventSeries.objects.create(
+            title='Daily Standup', description='x', location='x', type='Meetup', tags=[], organizer='x',
+            created_by='x', frequency=EventSeries.DAILY, starts_on=timezone.localdate() + timedelta(days=1),
+            time=dt_time(9, 0),
+        )
+        upcoming = self.client.get(reverse('event-upcoming')).data
+        self.assertEqual(len(upcoming), 10)
+        self.assertEqual({event['series'] for event in upcoming}, {soon.id})
+        response = async_to_sync(self.async_client.get)('/api/async/events/upcoming/', SERVER_NAME='localhost')
+        self.assertEqual(response.json(), self.client.get(reverse('event-upcoming')).json())
@@ -0,0 +1,90 @@
+"""
+Trending events ranked by time-decayed registration velocity.
+
+Each registration at time ``t`` contributes ``exp(DECAY * (t - EPOCH))`` to
+its event's score. Measuring against a fixed epoch instead of "now" means a
+score never has to be decayed again: every row would be scaled by the same
+factor, so the ranking is unchanged. Scores are stored as logarithms to
+stay within float range, and a new registration is folded in with a single
+atomic ``logaddexp`` UPDATE.
+
+``rebuild_trending`` recomputes the table from the recent window; run it
+periodically to drop unregistrations and events that went quiet.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import EventRegistration, TrendingEvent
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE_HOURS = 24
+DECAY = math.log(2) / (HALF_LIFE_HOURS * 3600)
+# Registrations older than this weigh less than 1/128 of a fresh one
+WINDOW = timedelta(hours=HALF_LIFE_HOURS * 7)
+
+TRENDING_CACHE_KEY = 'events:trending'
+TRENDING_CACHE_TIMEOUT = 30
+
+
+def registration_weight(registered_at):
+    """Log of one registration's contribution"""
+    return DECAY * (registered_at - EPOCH).total_seconds()
+
+
+def _logaddexp(a, b):
+    """``log(exp(a) + exp(b))`` as an ORM expression, stable for large inputs"""
+    return Greatest(a, b) + Ln(Value(1.0) + Exp(-Abs(a - b)))
+
+
+def record_registration(event_id, registered_at=None):
+    """Fold one new registration into the event's trending score"""
+    weight = registration_weight(registered_at or timezone.now())
+    updated = TrendingEvent.objects.filter(event_id=event_id).update(
+        log_score=_logaddexp(F('log_score'), Value(weight))
+    )
+    if not updated:
+        _, created = TrendingEvent.objects.get_or_create(event_id=event_id, defaults={'log_score': weight})
+        if not created:
+            # Another request created the row first
+            TrendingEvent.objects.filter(event_id=event_id).update(
+                log_score=_logaddexp(F('log_score'), Value(weight))
+            )
+
+
+def rebuild_trending(now=None):
+    """
+    Recompute every score from registrations inside ``WINDOW``.
+    Returns the number of events that are trending.
+    """
+    now = now or timezone.now()
+    sums = defaultdict(float)
+    # Shift exponents by the newest possible weight so exp() stays in range
+    shift = registration_weight(now)
+    registrations = EventRegistration.objects.filter(
+        registered_at__gte=now - WINDOW
+    ).order_by().values_list('event_id', 'registered_at')
+    for event_id, registered_at in registrations.iterator(chunk_size=2000):
+        sums[event_id] += math.exp(registration_weight(registered_at) - shift)
+
+    rows = [
+        TrendingEvent(event_id=event_id, log_score=math.log(total) + shift)
+        for event_id, total in sums.items() if total > 0
+    ]
+    with transaction.atomic():
+        TrendingEvent.objects.exclude(event_id__in=list(sums)).delete()
+        TrendingEvent.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['event'],
+            update_fields=['log_score', 'updated_at'],
+        )
+    cache.delete(TRENDING_CACHE_KEY)
+    return len(rows)
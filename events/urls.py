@@ -1,10 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EventViewSet
+from .views import EventSeriesViewSet, EventViewSet, SearchSuggestView
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'events', EventViewSet)
+router.register(r'series', EventSeriesViewSet)
 
 urlpatterns = [
     path('events/', include(router.urls)),
-]
\ No newline at end of file
+    path('search/suggest/', SearchSuggestView.as_view(), name='search-suggest'),
+    # Async read paths, for the ASGI deployment
+    path('async/events/', async_views.event_list, name='async-event-list'),
+    path('async/events/upcoming/', async_views.event_upcoming, name='async-event-upcoming'),
+    path('async/events/my_registrations/', async_views.my_registrations, name='async-event-my-registrations'),
+    path('async/events/<str:slug>/', async_views.event_detail, name='async-event-detail'),
+]
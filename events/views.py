@@ -1,29 +1,49 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Event, EventRegistration
-from .serializers import EventSerializer, EventCreateSerializer
+from .models import Event, EventRegistration, EventSeries
+from .serializers import EventSerializer, EventCreateSerializer, EventSeriesSerializer
+from .geo import NearFilterBackend
+from .sync import DeltaSyncMixin
+from .facets import FacetMixin
+from .archive import include_archived
+from .streams import publish_seats
+from .trending import TRENDING_CACHE_KEY, TRENDING_CACHE_TIMEOUT, record_registration
+from .suggest import DEFAULT_LIMIT, MAX_LIMIT, suggest
+from .calendar import ICalendarRenderer, feed_etag, feed_response, make_feed_token, month_histogram, read_feed_token
+from .series import SERIES_HORIZON, OccurrenceList, expand_series, materialize, parse_window, resolve_occurrence
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 import json
 import logging
+from datetime import datetime
 from django.utils.text import slugify
 from django.http import Http404
 from django.db import transaction
 from django.utils import timezone
-from django.db.models import Case, When, Value, IntegerField
+from django.db.models import Case, When, Value, IntegerField, Count, Max
+from django.urls import reverse
+from django.core.cache import cache
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.settings import api_settings
+from server.idempotency import idempotent
+from server.throttling import ACTION_THROTTLES, PreAuthThrottleMixin
 
 logger = logging.getLogger(__name__)
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(FacetMixin, DeltaSyncMixin, PreAuthThrottleMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter, NearFilterBackend]
     filterset_fields = ['type', 'is_online', 'is_free']
+    facet_fields = ['type', 'is_online', 'is_free']
     search_fields = ['title', 'description', 'location', 'organizer']
     ordering_fields = ['date', 'price', 'attendees']
     lookup_field = 'slug'
+    sync_model = 'event'
 
     def get_queryset(self):
         """
@@ -31,6 +51,12 @@ class EventViewSet(viewsets.ModelViewSet):
         """
         queryset = super().get_queryset()
         now = timezone.now()
+
+        # Lists only read the hot set unless archived events are asked for.
+        # Delta sync must see archiving, so it reads both.
+        syncing = self.action == 'list' and 'updated_since' in self.request.query_params
+        if self.action in ('list', 'upcoming', 'facets') and not syncing and not include_archived(self.request):
+            queryset = queryset.filter(is_archived=False)
         
         # Order by: upcoming events first (by date), then past events (most recent first)
         return queryset.annotate(
@@ -41,6 +67,35 @@ class EventViewSet(viewsets.ModelViewSet):
             )
         ).order_by('-is_upcoming', 'date', '-date')
 
+    def filter_series(self, queryset):
+        """Apply this request's filters to an ``EventSeries`` queryset"""
+        for backend in self.filter_backends:
+            # OccurrenceList places occurrences in the events' ordering
+            if backend is not filters.OrderingFilter:
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    def get_occurrences(self, series, start, end):
+        """Unsaved occurrences of ``series`` in ``[start, end)``, see events.series"""
+        now = timezone.now()
+        occurrences = expand_series(series, start, end)
+        for occurrence in occurrences:
+            # As annotated by get_queryset, for OccurrenceList
+            occurrence.is_upcoming = int(occurrence.starts_at >= now)
+        return occurrences
+
+    def get_occurrence(self, slug):
+        """
+        A series occurrence for the detail actions that make sense on one.
+        Registering for or editing an occurrence saves it as a row.
+        """
+        if self.action not in ('retrieve', 'register', 'update', 'partial_update'):
+            return None
+        occurrence = resolve_occurrence(slug)
+        if occurrence is not None and occurrence.pk is None and self.action != 'retrieve':
+            occurrence = materialize(occurrence)
+        return occurrence
+
     def get_object(self):
         """
         Override to handle slug lookups with spaces and special characters
@@ -58,6 +113,9 @@ class EventViewSet(viewsets.ModelViewSet):
         if not obj:
             normalized_slug = slugify(slug_from_url)
             obj = queryset.filter(slug=normalized_slug).first()
+
+        if not obj:
+            obj = self.get_occurrence(slug_from_url)
         
         if obj is None:
             raise Http404(f"No event found with slug: {slug_from_url}")
@@ -69,15 +127,96 @@ class EventViewSet(viewsets.ModelViewSet):
             return EventCreateSerializer
         return EventSerializer    
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def get_list_events(self):
+        """
+        Events merged with the occurrences of matching series. ``?from=`` and
+        ``?to=`` (YYYY-MM-DD) limit both to a date window; without them
+        series are expanded over the next ``SERIES_HORIZON``. Shared with
+        the async list.
+        """
+        try:
+            window = parse_window(self.request.query_params)
+        except ValueError:
+            raise ParseError('from and to must be YYYY-MM-DD.')
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if window is None:
+            now = timezone.now()
+            window = (now, now + SERIES_HORIZON)
+        else:
+            queryset = queryset.filter(starts_at__gte=window[0], starts_at__lt=window[1])
+        occurrences = self.get_occurrences(self.filter_series(EventSeries.objects.all()), *window)
+        return OccurrenceList(queryset, occurrences) if occurrences else queryset
+
+    def get_upcoming_events(self):
+        """The next ten events, occurrences included. Shared with the async view."""
+        now = timezone.now()
+        events = self.get_queryset().filter(date__gte=now).order_by('date')
+        occurrences = self.get_occurrences(EventSeries.objects.all(), now, now + SERIES_HORIZON)
+        if occurrences:
+            events = OccurrenceList(events, occurrences)
+        return events[:10]
+
+    def list(self, request, *args, **kwargs):
+        if 'updated_since' in request.query_params:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_list_events()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Custom endpoint to get upcoming events sorted by date"""
-        now = timezone.now()
-        events = self.get_queryset().filter(date__gte=now).order_by('date')[:10]
-        serializer = self.get_serializer(events, many=True)
+        serializer = self.get_serializer(self.get_upcoming_events(), many=True)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Custom endpoint to get upcoming events with the fastest recent registrations
+        Reads the materialized TrendingEvent ranking and is cached briefly
+        """
+        data = cache.get(TRENDING_CACHE_KEY)
+        if data is None:
+            events = Event.objects.filter(
+                trending__isnull=False,
+                date__gte=timezone.now(),
+            ).order_by('-trending__log_score').prefetch_related('images')[:10]
+            data = self.get_serializer(events, many=True).data
+            cache.set(TRENDING_CACHE_KEY, data, TRENDING_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """
+        Custom endpoint to get upcoming events ranked for the current user
+        Reads the table built by the compute_recommendations command and
+        falls back to plain upcoming events for users without history
+        """
+        now = timezone.now()
+        events = Event.objects.none()
+        if request.user.is_authenticated:
+            events = Event.objects.filter(
+                recommendations__user_id=str(request.user.id),
+                date__gte=now,
+            ).order_by('-recommendations__score')
+        if not events.exists():
+            events = self.get_queryset().filter(date__gte=now).order_by('date')
+
+        page = self.paginate_queryset(events.prefetch_related('images'))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'], throttle_classes=ACTION_THROTTLES, throttle_scope='register')
+    @idempotent
     def register(self, request, slug=None):
         """Custom endpoint to register for an event"""
         event = self.get_object()
@@ -94,11 +233,12 @@ class EventViewSet(viewsets.ModelViewSet):
         user_email = request.user.email
         user_name = request.user.first_name + ' ' + request.user.last_name
 
-        print(f"Request user: {request.user.email}")
-
-        print(f"User ID: {user_id}")
-        print(f"User Email: {user_email}")
-        print(f"User Name: {user_name}")
+        logger.debug("Registering user for event", extra={
+            'event': event.slug,
+            'user_id': user_id,
+            'user_email': user_email,
+            'user_name': user_name,
+        })
 
         # Check if the event uses external registration
         if event.registration_url:
@@ -124,30 +264,36 @@ class EventViewSet(viewsets.ModelViewSet):
         # Register user for the event using a database transaction
         with transaction.atomic():
             # Create registration record
-            EventRegistration.objects.create(
+            registration = EventRegistration.objects.create(
                 event=event,
                 user_id=user_id,
                 user_email=request.user.email,
                 user_name=user_name
             )
+            record_registration(event.id, registration.registered_at)
             
             # Update event counts
             event.attendees += 1
             event.spots_left -= 1
-            event.save(update_fields=['attendees', 'spots_left'])
+            event.save(update_fields=['attendees', 'spots_left', 'updated_at'])
+            transaction.on_commit(lambda: publish_seats(event), robust=True)
         
         return Response({
             'status': 'registered',
             'message': 'Successfully registered for the event'
         })
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], throttle_classes=ACTION_THROTTLES, throttle_scope='unregister')
     def unregister(self, request, slug=None):
         """Custom endpoint to unregister from an event"""
         event = self.get_object()
         user_id = request.user.id
 
-        print(f"Request user: {request.user.email}")
+        logger.debug("Unregistering user from event", extra={
+            'event': event.slug,
+            'user_id': user_id,
+            'user_email': request.user.email,
+        })
         
         try:
             # Use transaction to ensure data consistency
@@ -158,7 +304,8 @@ class EventViewSet(viewsets.ModelViewSet):
                 # Update event counts
                 event.attendees -= 1
                 event.spots_left += 1
-                event.save(update_fields=['attendees', 'spots_left'])
+                event.save(update_fields=['attendees', 'spots_left', 'updated_at'])
+                transaction.on_commit(lambda: publish_seats(event), robust=True)
             
             return Response({
                 'status': 'unregistered',
@@ -180,11 +327,15 @@ class EventViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(events, many=True)
         return Response(serializer.data)
     
-    @action(detail=False, methods=['get'])
-    def my_registrations(self, request):
+    @action(detail=False, methods=['get'], renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES + [ICalendarRenderer])
+    def my_registrations(self, request, format=None):
         """
         Custom endpoint to get all events the current user is registered for
+        Served as an iCalendar feed at ``my_registrations.ics``
         """
+        if request.accepted_renderer.format == ICalendarRenderer.format:
+            return self.registrations_feed(request)
+
         user_id = request.user.id
         
         # Get registrations for this user
@@ -197,6 +348,56 @@ class EventViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.data)
     
+    def registrations_feed(self, request):
+        """
+        iCalendar feed of the events a user is registered for.
+        Calendar apps cannot send a Clerk token, so the feed also accepts
+        the signed ``token`` handed out by ``calendar_url``.
+        """
+        token = request.query_params.get('token')
+        if token:
+            user_id = read_feed_token(token)
+            if user_id is None:
+                raise Http404("Unknown calendar feed")
+        elif request.user.is_authenticated:
+            user_id = str(request.user.id)
+        else:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+
+        events = Event.objects.filter(registrations__user_id=user_id)
+        registrations = EventRegistration.objects.filter(user_id=user_id).aggregate(
+            latest=Max('registered_at'), total=Count('id')
+        )
+        etag = feed_etag(f'registrations:{user_id}', events, registrations['latest'], registrations['total'])
+        return feed_response(request, events, 'My registrations', etag, private=True)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Custom endpoint returning event counts per day of ``?month=YYYY-MM``
+        ``?by=type`` splits each day's count by event type
+        """
+        try:
+            month = datetime.strptime(request.query_params.get('month', ''), '%Y-%m').date()
+        except ValueError:
+            return Response({'month': 'Expected YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+        split = request.query_params.get('by')
+        if split not in (None, 'type'):
+            return Response({'by': 'Only "type" is supported.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(month_histogram(
+            Event.objects.all(), month, split,
+            occurrences=lambda start, end: expand_series(EventSeries.objects.all(), start, end, limit=None),
+        ))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def calendar_url(self, request):
+        """
+        Custom endpoint returning the personal registrations feed URL
+        """
+        url = reverse('event-my-registrations', kwargs={'format': 'ics'})
+        url += f'?token={make_feed_token(request.user.id)}'
+        return Response({'url': request.build_absolute_uri(url)})
+
     @action(detail=True, methods=['get'])
     def attendees(self, request, slug=None):
         """
@@ -228,4 +429,28 @@ class EventViewSet(viewsets.ModelViewSet):
             'event': event.title,
             'total_attendees': len(attendees_data),
             'attendees': attendees_data
-        })
\ No newline at end of file
+        })
+
+class EventSeriesViewSet(viewsets.ModelViewSet):
+    """
+    Recurring events. Their occurrences are listed with the other events,
+    see events.series
+    """
+    queryset = EventSeries.objects.all().order_by('starts_on', 'id')
+    serializer_class = EventSeriesSerializer
+    lookup_field = 'slug'
+
+
+class SearchSuggestView(APIView):
+    """
+    Typeahead suggestions across event titles, group names and tags,
+    see events.suggest
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        return Response(suggest(request.query_params.get('q', ''), max(limit, 1)))
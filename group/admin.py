@@ -1,3 +1,35 @@
 from django.contrib import admin
+from server.paginators import EstimatedCountPaginator
+from .models import Group, GroupImage
 
-# Register your models here.
+
+class GroupImageInline(admin.TabularInline):
+    model = GroupImage
+    extra = 0
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'location', 'member_count', 'event_count', 'owner', 'created_at')
+    list_filter = ('category', 'is_online')
+    # Also backs the groupId autocomplete on EventAdmin
+    search_fields = ('name', '=slug')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner', 'members')
+    readonly_fields = ('created_at', 'updated_at')
+    inlines = [GroupImageInline]
+
+
+class GroupImageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'group', 'is_cover', 'created_at')
+    list_filter = ('is_cover',)
+    search_fields = ('=group__slug',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('group',)
+    raw_id_fields = ('group',)
+
+
+admin.site.register(Group, GroupAdmin)
+admin.site.register(GroupImage, GroupImageAdmin)
@@ -0,0 +1,24 @@
+"""Async group read endpoints, see ``events.async_views``"""
+from asgiref.sync import sync_to_async
+
+from events.async_views import async_view, get_by_slug, json_response, paginate, serialize, viewset_for
+from .views import GroupViewSet
+
+GROUP_PREFETCH = ['owner', 'images', 'members', 'events__images']
+
+
+@async_view
+async def group_list(request):
+    view = viewset_for(GroupViewSet, request, 'list')
+    queryset = await sync_to_async(lambda: view.filter_queryset(view.get_queryset()))()
+    return await paginate(view, queryset, prefetch=GROUP_PREFETCH)
+
+
+@async_view
+async def group_detail(request, slug):
+    view = viewset_for(GroupViewSet, request, 'retrieve', slug=slug)
+    queryset = await sync_to_async(lambda: view.filter_queryset(view.get_queryset()))()
+    group, error = await get_by_slug(queryset, slug, 'group')
+    if error:
+        return error
+    return json_response(await serialize(view, group, many=False, prefetch=GROUP_PREFETCH))
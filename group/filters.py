@@ -0,0 +1,40 @@
+"""
+Group discovery filters.
+
+``?category=``, ``?is_online=``, ``?location=`` (case-insensitive) and
+``?tags=a,b`` (groups carrying all of them) each hit an index declared on
+``Group``. ``?search=`` is full-text search over the stored
+``search_vector`` (name weighted above description), ranked best first
+unless ``?ordering=`` asks for something else.
+"""
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+
+from .models import SEARCH_CONFIG, Group
+
+
+class GroupFilter(django_filters.FilterSet):
+    location = django_filters.CharFilter(field_name='location', lookup_expr='iexact')
+    tags = django_filters.CharFilter(method='filter_tags')
+
+    class Meta:
+        model = Group
+        fields = ['category', 'is_online', 'location', 'tags']
+
+    def filter_tags(self, queryset, name, value):
+        tags = [tag.strip() for tag in value.split(',') if tag.strip()]
+        return queryset.filter(tags__contains=tags) if tags else queryset
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        query = SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(rank=SearchRank(F('search_vector'), query))
+        if filters.OrderingFilter.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-rank', '-created_at')
+        return queryset
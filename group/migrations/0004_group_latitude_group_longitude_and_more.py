@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0003_alter_group_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['latitude', 'longitude'], name='group_lat_lng_idx'),
+        ),
+    ]
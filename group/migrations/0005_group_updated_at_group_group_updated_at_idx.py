@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:38
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Group = apps.get_model('group', 'Group')
+    Group.objects.filter(updated_at__isnull=True).update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0004_group_latitude_group_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['updated_at', 'id'], name='group_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0005_group_updated_at_group_group_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['created_at'], name='group_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['category', 'created_at'], name='group_category_created_idx'),
+        ),
+    ]
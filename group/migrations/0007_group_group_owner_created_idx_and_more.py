@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0006_group_group_created_at_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['owner', '-created_at'], name='group_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupimage',
+            index=models.Index(fields=['group', '-is_cover', '-created_at'], name='group_image_order_idx'),
+        ),
+    ]
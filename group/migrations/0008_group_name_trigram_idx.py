@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:05
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # events 0021 installs pg_trgm where the server has it
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS group_name_trgm_idx ON group_group '
+        'USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS group_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0021_event_title_trigram_idx'),
+        ('group', '0007_group_group_owner_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
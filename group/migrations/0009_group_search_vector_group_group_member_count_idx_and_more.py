@@ -0,0 +1,62 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def backfill_search_vector(apps, schema_editor):
+    Group = apps.get_model('group', 'Group')
+    Group.objects.update(search_vector=(
+        django.contrib.postgres.search.SearchVector('name', weight='A', config='english')
+        + django.contrib.postgres.search.SearchVector('description', weight='B', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0008_group_name_trigram_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['member_count'], name='group_member_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['event_count'], name='group_event_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['category', 'member_count'], name='group_category_members_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['category', 'event_count'], name='group_category_events_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['is_online', 'created_at'], name='group_online_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(django.db.models.functions.text.Upper('location'), models.F('created_at'), name='group_location_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='group_tags_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='group_search_idx'),
+        ),
+    ]
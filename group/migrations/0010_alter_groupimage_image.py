@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:11
+
+from django.db import migrations
+import server.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0009_group_search_vector_group_group_member_count_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='groupimage',
+            name='image',
+            field=server.storage.StoredImageField(max_length=255, verbose_name='image'),
+        ),
+    ]
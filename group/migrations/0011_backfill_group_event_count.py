@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def fill_event_count(apps, schema_editor):
+    # Same count as group.tasks.refresh_event_count
+    schema_editor.execute("""
+        UPDATE group_group SET event_count = (
+            SELECT COUNT(*) FROM events_event WHERE events_event."groupId_id" = group_group.id
+        )
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0026_eventregistration_email_upper_idx'),
+        ('group', '0010_alter_groupimage_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_event_count, migrations.RunPython.noop),
+    ]
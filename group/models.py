@@ -1,11 +1,24 @@
 # models.py
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import User
-from cloudinary.models import CloudinaryField
 from django.utils.text import slugify
+from events.geo import GeocodedModel, apply_geocode
+from server.storage import StoredImageField
 
-class Group(models.Model):
+SEARCH_CONFIG = 'english'
+
+
+def group_search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+class Group(GeocodedModel, models.Model):
     CATEGORY_CHOICES = [
         ('TECH', 'Technology'),
         ('HEALTH', 'Health & Wellness'),
@@ -23,18 +36,29 @@ class Group(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     tags = ArrayField(models.CharField(max_length=50), blank=True)
     location = models.CharField(max_length=255)
+    # Filled from the offline gazetteer in events.geo
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     is_online = models.BooleanField(default=False)
     member_count = models.PositiveIntegerField(default=1)
     event_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups')
     members = models.ManyToManyField(User, related_name='group')
+    # Kept in step with name and description by save(), see group.filters
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     def save(self, *args, **kwargs):
         # Generate slug if not provided
         if not self.slug:
             self.slug = slugify(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            apply_geocode(self)
         super().save(*args, **kwargs)
+        if update_fields is None or {'name', 'description'} & set(update_fields):
+            Group.objects.filter(pk=self.pk).update(search_vector=group_search_vector())
     
     def __str__(self):
         return self.name
@@ -53,16 +77,39 @@ class Group(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='group_lat_lng_idx'),
+            models.Index(fields=['updated_at', 'id'], name='group_updated_at_idx'),
+            # Default ordering, alone and under the admin's category filter
+            models.Index(fields=['created_at'], name='group_created_at_idx'),
+            models.Index(fields=['category', 'created_at'], name='group_category_created_idx'),
+            # my_groups
+            models.Index(fields=['owner', '-created_at'], name='group_owner_created_idx'),
+            # Discovery filters and orderings, see group.filters
+            models.Index(fields=['member_count'], name='group_member_count_idx'),
+            models.Index(fields=['event_count'], name='group_event_count_idx'),
+            models.Index(fields=['category', 'member_count'], name='group_category_members_idx'),
+            models.Index(fields=['category', 'event_count'], name='group_category_events_idx'),
+            models.Index(fields=['is_online', 'created_at'], name='group_online_created_idx'),
+            models.Index(Upper('location'), 'created_at', name='group_location_created_idx'),
+            GinIndex(fields=['tags'], name='group_tags_idx'),
+            GinIndex(fields=['search_vector'], name='group_search_idx'),
+        ]
 
 
 class GroupImage(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='images')
-    image = CloudinaryField('image', folder='groups')
+    # Uploaded under 'groups/', see group.tasks
+    image = StoredImageField('image')
     is_cover = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-is_cover', '-created_at']
+        indexes = [
+            # A group's images in display order, looked up per group by the serializer
+            models.Index(fields=['group', '-is_cover', '-created_at'], name='group_image_order_idx'),
+        ]
     
     def __str__(self):
         image_type = "Cover" if self.is_cover else "Profile"
@@ -2,8 +2,11 @@
 from rest_framework import serializers
 from .models import Group, GroupImage
 from django.contrib.auth.models import User
-from django.conf import settings
 from events.serializers import EventSerializer
+from events.tasks import queue_image_upload
+from .tasks import upload_group_image
+from server.fragments import FragmentCacheListSerializer
+from server.tracing import TracedSerializerMixin
 
 class UserSerializer(serializers.ModelSerializer):
     clerk_id = serializers.SerializerMethodField()
@@ -29,10 +32,10 @@ class GroupImageSerializer(serializers.ModelSerializer):
             if request is not None:
                 # Ensure we're using the full URL including scheme and domain
                 return request.build_absolute_uri(obj.image.url)
-            return f"{settings.MEDIA_URL}{obj.image}"
+            return obj.image.url
         return None
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     members = UserSerializer(many=True, read_only=True)
     images = GroupImageSerializer(many=True, read_only=True)
@@ -52,23 +55,33 @@ class GroupSerializer(serializers.ModelSerializer):
     primary_image_url = serializers.SerializerMethodField()
     member_count = serializers.ReadOnlyField()
     event_count = serializers.ReadOnlyField()
+    distance_km = serializers.SerializerMethodField()
 
     events = EventSerializer(many=True, read_only=True)
+    # Rendered per request on fragment cache hits, see server.fragments
+    fragment_dynamic_fields = ['distance_km']
     
     class Meta:
         model = Group
         fields = [
             'id', 'name', 'slug', 'description', 'category', 'tags', 
-            'location', 'is_online', 'member_count', 'event_count',
+            'location', 'latitude', 'longitude', 'distance_km', 'is_online',
+            'member_count', 'event_count',
             'created_at', 'owner', 'members', 'images', 'uploaded_images', 
             'uploaded_cover_image', 'cover_image_url', 'primary_image_url',
             'events'
         ]
         read_only_fields = [
             'slug', 'created_at', 'member_count', 'event_count', 
-            'owner', 'members'
+            'owner', 'members', 'latitude', 'longitude'
         ]
+        list_serializer_class = FragmentCacheListSerializer
     
+    def get_distance_km(self, obj):
+        # Only set when the list was filtered with ?near=
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
+
     def get_cover_image_url(self, obj):
         cover_image = obj.images.filter(is_cover=True).first()
         if cover_image and cover_image.image:
@@ -106,21 +119,11 @@ class GroupSerializer(serializers.ModelSerializer):
         # Add the creator as the first member
         group.members.add(user)
         
-        # Save the cover image if provided
+        # Uploads run on the task workers; images appear once they finish
         if cover_image:
-            GroupImage.objects.create(
-                group=group,
-                image=cover_image,
-                is_cover=True
-            )
-        
-        # Save regular images
+            queue_image_upload(upload_group_image, cover_image, group_id=group.id, is_cover=True)
         for image_data in regular_images:
-            GroupImage.objects.create(
-                group=group,
-                image=image_data,
-                is_cover=False
-            )
+            queue_image_upload(upload_group_image, image_data, group_id=group.id)
         
         return group
     
@@ -134,24 +137,12 @@ class GroupSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         
-        # Update or create cover image
+        # The upload task swaps the cover in once it is stored, and removing
+        # the old cover's row queues deletion of its stored file
         if cover_image:
-            # Delete existing cover images
-            GroupImage.objects.filter(group=instance, is_cover=True).delete()
-            # Create new cover image
-            GroupImage.objects.create(
-                group=instance,
-                image=cover_image,
-                is_cover=True
-            )
-        
-        # Add new regular images
+            queue_image_upload(upload_group_image, cover_image, group_id=instance.id, is_cover=True)
         for image_data in regular_images:
-            GroupImage.objects.create(
-                group=instance,
-                image=image_data,
-                is_cover=False
-            )
+            queue_image_upload(upload_group_image, image_data, group_id=instance.id)
         
         return instance
 
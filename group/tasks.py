@@ -0,0 +1,33 @@
+"""Background side effects of group requests, see ``taskqueue.queue``"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+
+from events.models import Event
+from server.storage import get_image_storage
+from server.tracing import span
+from taskqueue.queue import task
+from .models import Group, GroupImage
+
+
+@task
+def upload_group_image(group_id, filename, content_type='', is_cover=False, payload=None):
+    if not Group.objects.filter(pk=group_id).exists():
+        return
+    with span('image.upload', model='GroupImage', group=group_id):
+        stored = get_image_storage().save(SimpleUploadedFile(filename, payload, content_type), folder='groups')
+    image = GroupImage.objects.create(group_id=group_id, image=stored, is_cover=is_cover)
+    if is_cover:
+        # Replace the old cover only once the new one is in place
+        GroupImage.objects.filter(group_id=group_id, is_cover=True).exclude(pk=image.pk).delete()
+
+
+@task
+def refresh_member_count(group_id):
+    count = Group.members.through.objects.filter(group_id=group_id).count()
+    Group.objects.filter(pk=group_id).update(member_count=count, updated_at=timezone.now())
+
+
+@task
+def refresh_event_count(group_id):
+    count = Event.objects.filter(groupId=group_id).count()
+    Group.objects.filter(pk=group_id).update(event_count=count, updated_at=timezone.now())
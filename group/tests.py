@@ -1,3 +1,68 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from events.models import Event
+from taskqueue.queue import run_pending
+from .models import Group
+
+
+class GroupDiscoveryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        owner = User.objects.create(username='discovery-owner')
+        for name, description, category, tags, location, members in [
+            ('Kampala Python', 'Weekly python hacking', 'TECH', ['python', 'open-source'], 'Kampala', 40),
+            ('Runners Club', 'Morning runs and the odd python talk', 'HEALTH', ['running'], 'Entebbe', 90),
+            ('Data Science UG', 'Machine learning with python', 'TECH', ['python', 'data'], 'kampala', 10),
+        ]:
+            Group.objects.create(name=name, description=description, category=category, tags=tags,
+                                 location=location, member_count=members, owner=owner)
+
+    def names(self, params):
+        response = self.client.get(reverse('group-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [group['name'] for group in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.names({'category': 'TECH', 'ordering': '-member_count'}),
+                         ['Kampala Python', 'Data Science UG'])
+        self.assertEqual(self.names({'tags': 'python,data'}), ['Data Science UG'])
+        self.assertEqual(sorted(self.names({'location': 'KAMPALA'})), ['Data Science UG', 'Kampala Python'])
+
+    def test_search_ranks_name_matches_first(self):
+        self.assertEqual(self.names({'search': 'python'})[0], 'Kampala Python')
+        self.assertEqual(self.names({'search': 'python', 'ordering': '-member_count'})[0], 'Runners Club')
+
+        group = Group.objects.get(name='Runners Club')
+        group.description = 'Morning runs'
+        group.save()
+        self.assertNotIn('Runners Club', self.names({'search': 'python'}))
+
+    def test_ordering(self):
+        self.assertEqual(self.names({'ordering': 'member_count'}),
+                         ['Data Science UG', 'Kampala Python', 'Runners Club'])
+
+    def test_event_count_follows_events(self):
+        python, runners = Group.objects.get(name='Kampala Python'), Group.objects.get(name='Runners Club')
+        events = [
+            Event.objects.create(
+                title=f'Meetup {i}', description='x', date='2099-01-01', time='10:00', location='x',
+                type='Meetup', tags=[], organizer='x', created_by='x', groupId=python,
+            )
+            for i in range(3)
+        ]
+        run_pending()
+        self.assertEqual(self.names({'ordering': '-event_count'})[0], 'Kampala Python')
+
+        moved = Event.objects.get(pk=events[0].pk)
+        moved.groupId = runners
+        moved.save()
+        events[1].delete()
+        run_pending()
+        python.refresh_from_db()
+        runners.refresh_from_db()
+        self.assertEqual((python.event_count, runners.event_count), (1, 1))
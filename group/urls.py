@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import GroupViewSet, debug_auth
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'groups', GroupViewSet)
@@ -8,4 +9,7 @@ router.register(r'groups', GroupViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('debug-auth/', debug_auth, name='debug-auth'),
-]
\ No newline at end of file
+    # Async read paths, for the ASGI deployment
+    path('async/groups/', async_views.group_list, name='async-group-list'),
+    path('async/groups/<str:slug>/', async_views.group_detail, name='async-group-detail'),
+]
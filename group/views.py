@@ -1,30 +1,52 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, status, filters
 from rest_framework.views import APIView
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from .filters import GroupFilter, RankedSearchFilter
 from .models import Group
 from .serializers import GroupSerializer
+from .tasks import refresh_member_count
 from django.http import Http404
+from django.utils import timezone
 from django.utils.text import slugify
 from authentication.auth import ClerkAuthentication
+from server.idempotency import idempotent
+from server.paginators import EstimatedCountPagination
+from server.throttling import ACTION_THROTTLES, PreAuthThrottleMixin
+from events.calendar import ICalendarRenderer, feed_etag, feed_response
+from events.geo import NearFilterBackend
+from events.sync import DeltaSyncMixin
+from events.facets import FacetMixin
+from django_filters.rest_framework import DjangoFilterBackend
+import logging
 
+logger = logging.getLogger(__name__)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def debug_auth(request):
-    print("User:", request.user)
-    print("Auth:", request.auth_token)
+    logger.debug("Debug auth", extra={
+        'user': str(request.user),
+        'has_token': bool(getattr(request, 'auth_token', None)),
+    })
     return Response({
         "user": str(request.user),
         "auth": str(request.auth_token)
     })
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(FacetMixin, DeltaSyncMixin, PreAuthThrottleMixin, viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter, NearFilterBackend]
+    filterset_class = GroupFilter
+    facet_fields = ['category', 'is_online']
+    search_fields = ['name', 'description']
+    ordering_fields = ['member_count', 'event_count', 'created_at']
+    pagination_class = EstimatedCountPagination
     lookup_field = 'slug'
+    sync_model = 'group'
  
 
 
@@ -51,6 +73,10 @@ class GroupViewSet(viewsets.ModelViewSet):
             raise Http404(f"No group found with slug: {slug_from_url}")
             
         return obj
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
 
     # Get groups created by the current user
@@ -61,25 +87,35 @@ class GroupViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['get'], renderer_classes=[ICalendarRenderer])
+    def calendar(self, request, slug=None, format=None):
+        """iCalendar feed of the group's events, served at ``calendar.ics``"""
+        group = self.get_object()
+        events = group.events.all()
+        etag = feed_etag(f'group:{group.id}', events, group.name)
+        return feed_response(request, events, group.name, etag)
+
+    @action(detail=True, methods=['post'], throttle_classes=ACTION_THROTTLES, throttle_scope='join')
+    @idempotent
     def join(self, request, slug=None):
         group = self.get_object()
         user = request.user
 
-        print(f"Request user: {request.user.email}")
+        logger.debug("Joining group", extra={'group': group.slug, 'user': user.username})
         
         if user in group.members.all():
             return Response({'detail': 'User is already a member of this group.'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
         group.members.add(user)
-        group.member_count = group.members.count()
-        group.save()
+        # The member list is part of the group's cached fragment
+        Group.objects.filter(pk=group.pk).update(updated_at=timezone.now())
+        refresh_member_count.delay(group_id=group.id)
         
         return Response({'detail': 'Successfully joined the group.'}, 
                        status=status.HTTP_200_OK)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], throttle_classes=ACTION_THROTTLES, throttle_scope='leave')
     def leave(self, request, slug=None):
         group = self.get_object()
         user = request.user
@@ -93,8 +129,9 @@ class GroupViewSet(viewsets.ModelViewSet):
                            status=status.HTTP_400_BAD_REQUEST)
         
         group.members.remove(user)
-        group.member_count = group.members.count()
-        group.save()
+        # The member list is part of the group's cached fragment
+        Group.objects.filter(pk=group.pk).update(updated_at=timezone.now())
+        refresh_member_count.delay(group_id=group.id)
         
         return Response({'detail': 'Successfully left the group.'}, 
                        status=status.HTTP_200_OK)
\ No newline at end of file
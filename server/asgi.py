@@ -2,6 +2,11 @@
 ASGI config for server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Live event streams (see ``events.streams``) are served here directly; every
+other request goes to Django, including the async read endpoints under
+``/api/async/`` (see ``events.async_views``). Run it with an ASGI server, e.g.::
+
+    gunicorn server.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +18,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it loads models
+from events.streams import with_seat_streams  # noqa: E402
+
+application = with_seat_streams(django_application)
@@ -0,0 +1,157 @@
+"""
+Batch endpoint for page-load fan-out.
+
+``POST /api/batch/`` with::
+
+    {"requests": [{"id": "upcoming", "path": "/api/events/events/upcoming/"},
+                  {"id": "groups", "path": "/api/groups/?page=2"}],
+     "parallel": true}
+
+authenticates the caller once, runs each GET through the normal URL
+resolver and views with that user, and returns every response in one
+body. With ``parallel`` the sub-requests run on a small thread pool, each
+thread with its own database connection. Async views are run to
+completion on the calling thread. A sub-request that raises is reported
+as that item's 500; the rest of the batch still answers.
+"""
+import asyncio
+import contextvars
+import copy
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.http import Http404, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .tracing import span
+
+MAX_REQUESTS = 10
+MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False, max_length=100)
+    path = serializers.CharField(max_length=2000)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/') or value.startswith('/api/batch/'):
+            raise serializers.ValidationError('Only API paths other than the batch endpoint can be batched.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one request is required.')
+        if len(value) > MAX_REQUESTS:
+            raise serializers.ValidationError(f'At most {MAX_REQUESTS} requests can be batched.')
+        return value
+
+
+def _sub_request(request, path):
+    """A GET for ``path`` that reuses the batch request's authentication"""
+    path, _, query = path.partition('?')
+    django_request = request._request
+    sub = copy.copy(django_request)
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = dict(
+        django_request.META,
+        REQUEST_METHOD='GET',
+        PATH_INFO=path,
+        QUERY_STRING=query,
+        HTTP_ACCEPT='application/json',
+    )
+    sub.GET = QueryDict(query)
+    sub.POST = QueryDict()
+    # DRF's Request takes these instead of running the authenticators again
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _body(response):
+    if hasattr(response, 'data'):
+        return response.data
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    content = content.decode(response.charset or 'utf-8')
+    # Plain JsonResponses, such as the async views', nest like DRF data
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content)
+    return content
+
+
+def run_sub_request(request, item):
+    path = item['path']
+    with span('batch.request', path=path):
+        try:
+            match = resolve(path.partition('?')[0])
+        except Resolver404:
+            return {'id': item.get('id'), 'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+
+        sub = _sub_request(request, path)
+        sub.resolver_match = match
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        try:
+            response = view(sub, *match.args, **match.kwargs)
+            body = _body(response)
+        except Http404:
+            return {'id': item.get('id'), 'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+        except Exception:
+            logger.exception('Batched request to %s failed', path)
+            return {
+                'id': item.get('id'),
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'body': {'detail': 'Internal server error.'},
+            }
+        return {'id': item.get('id'), 'status': response.status_code, 'body': body}
+
+
+def _run_in_thread(request, item):
+    try:
+        return run_sub_request(request, item)
+    finally:
+        # Pool threads are not request threads, so nothing else closes these
+        connections.close_all()
+
+
+class BatchView(APIView):
+    """Run several GET requests with one authentication"""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+        # Authenticate now, once, before fanning out
+        request.user
+
+        if serializer.validated_data['parallel'] and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(items))) as pool:
+                # Each task gets a copy of the context so its spans join this trace
+                futures = [
+                    pool.submit(contextvars.copy_context().run, _run_in_thread, request, item)
+                    for item in items
+                ]
+                responses = [future.result() for future in futures]
+        else:
+            responses = [run_sub_request(request, item) for item in items]
+
+        return Response({'responses': responses})
@@ -0,0 +1,76 @@
+"""
+Per-object fragment cache for list serializers.
+
+A serializer whose Meta sets ``list_serializer_class =
+FragmentCacheListSerializer`` renders lists from cached per-object
+representations. Keys combine the model, primary key, ``updated_at``, the
+serializer class, the request's scheme and host and the image storage
+(image URLs are absolute), so a saved object simply gets a new key and
+stale fragments age out after ``FRAGMENT_TIMEOUT``. One ``get_many`` fetches a page's
+fragments; only misses go through the serializer and are stored with one
+``set_many``.
+
+Anything that changes a representation must bump the object's
+``updated_at``, see ``events.signals``. Fields that vary per request or
+are written without touching ``updated_at`` are listed in the
+serializer's ``fragment_dynamic_fields`` and rendered fresh on every hit.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+from .tracing import TracedListSerializer, current_span
+
+FRAGMENT_TIMEOUT = 60 * 60
+# Bump to drop every cached fragment, e.g. when a serializer's output changes
+FRAGMENT_VERSION = 2
+
+
+def fragment_variant(serializer):
+    request = serializer.context.get('request')
+    origin = f'{request.scheme}://{request.get_host()}' if request is not None else ''
+    # Image URLs also depend on the storage backend, see server.storage
+    storage = f'{settings.IMAGE_STORAGE}:{settings.IMAGE_BASE_URL}'
+    raw = f'{type(serializer).__module__}.{type(serializer).__name__}:{FRAGMENT_VERSION}:{origin}:{storage}'
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def fragment_key(instance, variant):
+    updated_at = getattr(instance, 'updated_at', None)
+    stamp = updated_at.timestamp() if updated_at else 'none'
+    return f'fragment:{instance._meta.label_lower}:{instance.pk}:{stamp}:{variant}'
+
+
+class FragmentCacheListSerializer(TracedListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if not items:
+            return []
+        child = self.child
+        variant = fragment_variant(child)
+        dynamic = [child.fields[name] for name in getattr(child, 'fragment_dynamic_fields', ()) if name in child.fields]
+
+        # Unsaved instances, like series occurrences, are always rendered
+        keys = [fragment_key(item, variant) if item.pk is not None else None for item in items]
+        cached = cache.get_many([key for key in keys if key])
+        missing = {}
+        representations = []
+        for key, item in zip(keys, items):
+            representation = cached.get(key) if key else None
+            if representation is None:
+                representation = child.to_representation(item)
+                if key:
+                    missing[key] = representation
+            else:
+                for field in dynamic:
+                    representation[field.field_name] = field.to_representation(field.get_attribute(item))
+            representations.append(representation)
+
+        if missing:
+            cache.set_many(missing, FRAGMENT_TIMEOUT)
+        current = current_span()
+        current.set_attribute('fragment_hits', len(cached))
+        current.set_attribute('fragment_misses', len(missing))
+        return representations
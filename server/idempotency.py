@@ -0,0 +1,126 @@
+"""
+``Idempotency-Key`` support for unsafe API actions.
+
+The first response to a keyed request is stored in the shared Django cache
+for ``IDEMPOTENCY_TTL`` and replayed for any retry with the same key, user
+and path, without running the view again. Keys are scoped per user and
+path, so two clients cannot collide on the same key. Each entry keeps a
+fingerprint of the request's method, path and body; reusing a key for a
+different request gets a 422 instead of the first request's response.
+
+A retry that arrives while the first request is still running waits for
+its result; if none appears within ``LOCK_WAIT`` it gets a 409 and can
+retry again. The cache bounds the store: entries expire after the TTL and
+the backend evicts under memory pressure (``MAX_ENTRIES`` for locmem,
+``maxmemory`` for Redis), so point ``CACHE_URL`` at a shared cache in
+production to cover retries that land on another worker.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
+from django.http.request import RawPostDataException
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = 24 * 3600
+# Longer than any keyed request should take, so a crashed worker's lock expires
+LOCK_TIMEOUT = 60
+LOCK_WAIT = 5
+POLL_INTERVAL = 0.1
+MAX_KEY_LENGTH = 255
+
+
+def idempotency_cache_key(request, key):
+    user = request.user.pk if request.user.is_authenticated else 'anonymous'
+    digest = hashlib.sha256(f'{user}:{request.method}:{request.path}:{key}'.encode()).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def request_fingerprint(request):
+    """A hash of what a keyed request asks for: method, full path and body"""
+    digest = hashlib.sha256(f'{request.method}:{request.get_full_path()}\n'.encode())
+    try:
+        digest.update(request.body)
+    except (RawPostDataException, RequestDataTooBig):
+        # Large uploads are streamed, not kept whole; hash the parsed form instead
+        data = request.data
+        items = data.lists() if hasattr(data, 'lists') else ((name, [value]) for name, value in data.items())
+        for name, values in sorted(items):
+            for value in values:
+                if hasattr(value, 'size'):
+                    value = f'{value.name}:{value.size}'
+                digest.update(f'{name}={value}\n'.encode())
+    return digest.hexdigest()
+
+
+def _mismatch():
+    return Response({
+        'detail': f'This {IDEMPOTENCY_HEADER} was already used for a different request.'
+    }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def _replay(stored):
+    response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _wait_for(cache_key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return stored
+    return None
+
+
+def idempotent(view_method):
+    """Make a viewset handler honour the ``Idempotency-Key`` header"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({'detail': f'{IDEMPOTENCY_HEADER} is too long.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = idempotency_cache_key(request, key)
+        fingerprint = request_fingerprint(request)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            if stored.get('fingerprint', fingerprint) != fingerprint:
+                return _mismatch()
+            return _replay(stored)
+
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, True, LOCK_TIMEOUT):
+            stored = _wait_for(cache_key)
+            if stored is not None:
+                if stored.get('fingerprint', fingerprint) != fingerprint:
+                    return _mismatch()
+                return _replay(stored)
+            return Response({
+                'detail': f'A request with this {IDEMPOTENCY_HEADER} is still in progress.'
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            # Server errors are worth retrying, so they are not remembered
+            if response.status_code < 500:
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': {name: response[name] for name in ('Location',) if response.has_header(name)},
+                }, IDEMPOTENCY_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
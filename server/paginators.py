@@ -0,0 +1,84 @@
+"""
+Paginators for tables too large to ``COUNT(*)`` on every page view.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+def estimated_count(model, using='default'):
+    """
+    Postgres' planner estimate of a table's row count, kept fresh by
+    autovacuum/ANALYZE. Returns None when no estimate is available.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # -1 means the table was never analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner estimate for unfiltered querysets on big tables and
+    an exact count otherwise, so the admin changelist does not scan the
+    whole table just to number its pages.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model, using=self.object_list.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """API pagination that counts unfiltered lists like ``EstimatedCountPaginator``"""
+    django_paginator_class = EstimatedCountPaginator
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset that shows one page of related rows. The page comes from
+    ``?<page_param>=`` and is set by ``PaginatedInlineMixin.get_formset``.
+    """
+    per_page = 20
+    page_param = 'page'
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_page'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self._page = paginator.get_page(self.page_number)
+        return self._page.object_list
+
+    @property
+    def page(self):
+        self.get_queryset()
+        return self._page
+
+
+class PaginatedInlineMixin:
+    formset = PaginatedInlineFormSet
+    template = 'admin/paginated_tabular.html'
+    per_page = 20
+    page_param = None
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_param = self.page_param or f'{self.opts.model_name}_page'
+        formset.page_number = request.GET.get(formset.page_param, 1)
+        return formset
@@ -0,0 +1,139 @@
+"""
+Publish/subscribe fan-out for live updates.
+
+Publishers are ordinary (sync) request handlers; subscribers are coroutines
+serving long-lived connections on the ASGI app. Each subscriber owns a small
+asyncio queue, so an idle connection costs one queue and one suspended
+coroutine.
+
+``InProcessBroker`` fans out inside one process, which is enough when the
+API and the streams are served by the same ASGI worker. ``RedisBroker``
+relays messages through Redis so publishes from any worker (WSGI or ASGI)
+reach subscribers in every process. Select one with ``settings.PUBSUB``.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def get_pubsub_setting(name, default=None):
+    return getattr(settings, 'PUBSUB', {}).get(name, default)
+
+
+class Subscription:
+    # Only the latest state matters to these clients, so a slow consumer
+    # loses its oldest messages instead of growing without bound
+    max_pending = 16
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+
+    def deliver(self, message):
+        """Thread-safe hand-off from a publisher to this subscriber's loop"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop has shut down
+            self.close()
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Must be called from the subscriber's event loop"""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self.fan_out(channel, message)
+
+    def fan_out(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes to Redis and runs one pattern subscription per process that
+    feeds the local fan-out, so Redis sees one connection per worker rather
+    than one per client.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.url = get_pubsub_setting('REDIS_URL')
+        self.prefix = get_pubsub_setting('PREFIX', 'meetula:')
+        self._publisher = None
+        self._listener = None
+
+    def publish(self, channel, message):
+        import redis
+
+        if self._publisher is None:
+            self._publisher = redis.Redis.from_url(self.url)
+        self._publisher.publish(self.prefix + channel, json.dumps(message))
+
+    def subscribe(self, channel):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return super().subscribe(channel)
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(self.prefix + '*')
+        try:
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                channel = message['channel'].decode()[len(self.prefix):]
+                self.fan_out(channel, json.loads(message['data']))
+        except Exception:
+            logger.exception("Redis pub/sub listener stopped")
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    return import_string(get_pubsub_setting('BACKEND', 'server.pubsub.InProcessBroker'))()
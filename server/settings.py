@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,14 +39,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'events',
     'rest_framework',
     'authentication',
-    'group'
+    'group',
+    'taskqueue',
 ]
 
 MIDDLEWARE = [
+    "server.tracing.TracingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     'django.middleware.security.SecurityMiddleware',
@@ -75,7 +80,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'server.wsgi.application'
+ASGI_APPLICATION = 'server.asgi.application'
+
 
+# Retried creates, registrations and joins carry an Idempotency-Key (server.idempotency)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 CORS_ALLOWED_ORIGINS = [
     "https://www.meetula.com",
@@ -149,6 +159,31 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # Token-bucket rates for server.throttling; "<scope>_ip" is the per-IP bucket
+    'DEFAULT_THROTTLE_RATES': {
+        'register': '10/min',
+        'register_ip': '60/min',
+        'unregister': '10/min',
+        'unregister_ip': '60/min',
+        'join': '20/min',
+        'join_ip': '120/min',
+        'leave': '20/min',
+        'leave_ip': '120/min',
+        'verify_token': '30/min',
+        'verify_token_ip': '120/min',
+    },
+    # Proxies in front of the app that append to X-Forwarded-For. Client IPs
+    # for the per-IP buckets are read that many hops from the right; with 0
+    # the header is ignored, so clients cannot pick their own address.
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
+}
+
+# Cache
+# Throttle buckets live here, so use Redis (redis://), which updates them
+# atomically, whenever more than one worker process serves requests.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
 }
 
 
@@ -176,6 +211,61 @@ CLERK_API_BASE_URL = env("CLERK_API_BASE_URL")
 CLERK_ISSUER_URL = env("CLERK_ISSUER_URL")
 CLERK_JWKS_URL = f"{CLERK_ISSUER_URL}/.well-known/jwks.json"
 CLERK_AUDIENCE = "http://localhost:3000"
+# Svix signing secret (whsec_...) of the Clerk user webhook endpoint
+CLERK_WEBHOOK_SECRET = env('CLERK_WEBHOOK_SECRET', default='')
+
+# Offline gazetteer used to geocode event and group locations
+GAZETTEER_PATH = env('GAZETTEER_PATH', default=os.path.join(BASE_DIR, 'events', 'data', 'gazetteer.csv'))
+
+# Past events older than this are archived by the archive_events command
+EVENT_ARCHIVE_AFTER_DAYS = env.int('EVENT_ARCHIVE_AFTER_DAYS', default=30)
+
+
+# Tracing and logging
+# Spans are sampled per trace; SAMPLE_RATE 0 disables tracing entirely.
+
+TRACING = {
+    'SAMPLE_RATE': env.float('TRACING_SAMPLE_RATE', default=0.0),
+    'EXPORTER': env('TRACING_EXPORTER', default='server.tracing.ConsoleExporter'),
+    'FILE_PATH': env('TRACING_FILE_PATH', default=os.path.join(BASE_DIR, 'traces.jsonl')),
+}
+
+# Live update fan-out; use server.pubsub.RedisBroker with more than one worker process
+PUBSUB = {
+    'BACKEND': env('PUBSUB_BACKEND', default='server.pubsub.InProcessBroker'),
+    'REDIS_URL': env('PUBSUB_REDIS_URL', default='redis://localhost:6379/0'),
+}
+
+# Background tasks (taskqueue); EAGER runs them in-process after commit, without a worker
+TASKS = {
+    'EAGER': env.bool('TASKS_EAGER', default=False),
+}
+
+LOG_LEVEL = env('LOG_LEVEL', default='INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'server.tracing.StructuredFormatter',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        app: {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        }
+        for app in ('authentication', 'events', 'group', 'server', 'taskqueue')
+    },
+}
 
 
 # Internationalization
@@ -195,15 +285,31 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+MEDIA_URL = env('MEDIA_URL', default='/media/')
+MEDIA_ROOT = env('MEDIA_ROOT', default=os.path.join(BASE_DIR, 'media'))
+
+# Where uploaded event and group images go, see server.storage:
+# CloudinaryImageStorage, S3ImageStorage or LocalImageStorage (under MEDIA_ROOT)
+IMAGE_STORAGE = env('IMAGE_STORAGE', default='server.storage.CloudinaryImageStorage')
+# Serve local and S3 images from here instead, e.g. a CDN
+IMAGE_BASE_URL = env('IMAGE_BASE_URL', default='')
 
-cloudinary.config(
-    cloud_name=env('CLOUD_NAME'),
-    api_key=env('API_KEY'),
-    api_secret=env('API_SECRET')
-) 
+# Read when the Cloudinary backend is first used
+CLOUDINARY = {
+    'cloud_name': env('CLOUD_NAME', default=''),
+    'api_key': env('API_KEY', default=''),
+    'api_secret': env('API_SECRET', default=''),
+}
+
+IMAGE_S3 = {
+    'bucket': env('IMAGE_S3_BUCKET', default=''),
+    'prefix': env('IMAGE_S3_PREFIX', default='images'),
+    # Set for S3-compatible services (MinIO, R2, Spaces, ...)
+    'endpoint_url': env('IMAGE_S3_ENDPOINT_URL', default=None),
+    'region_name': env('IMAGE_S3_REGION', default=None),
+    'access_key_id': env('IMAGE_S3_ACCESS_KEY_ID', default=None),
+    'secret_access_key': env('IMAGE_S3_SECRET_ACCESS_KEY', default=None),
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
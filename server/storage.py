@@ -0,0 +1,231 @@
+"""
+Image storage for ``EventImage`` and ``GroupImage``.
+
+``settings.IMAGE_STORAGE`` names the backend class, built on first use so
+no backend is configured or imported at settings import. Backends store
+an upload and return the name kept in the image column, in the
+``image/upload/[v<version>/]<public_id>.<format>`` form ``CloudinaryField``
+used, delete by public id, and turn a stored name into a URL without any
+network call.
+
+``StoredImageField`` holds such a name and gives it a ``url`` from the
+configured backend, so serializers never know which one is in use.
+``IMAGE_BASE_URL`` points the local and S3 backends at a CDN.
+
+``LocalImageStorage`` keeps files under ``MEDIA_ROOT`` so load tests and
+development never leave the machine.
+"""
+import os
+import re
+import uuid
+from functools import cached_property, lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# Same layout as cloudinary.models.CLOUDINARY_FIELD_DB_RE
+NAME_RE = re.compile(
+    r'(?:(?:image|raw|video)/(?:upload|private|authenticated)/)?'
+    r'(?:v(?P<version>\d+)/)?(?P<public_id>.*?)(?:\.(?P<format>[^./]+))?$'
+)
+
+
+def new_public_id(folder=''):
+    return '/'.join(filter(None, [folder, uuid.uuid4().hex]))
+
+
+def upload_format(uploaded_file):
+    return os.path.splitext(uploaded_file.name or '')[1].lstrip('.').lower() or 'jpg'
+
+
+class StoredImage:
+    """A stored image name, as kept in a ``StoredImageField``"""
+
+    def __init__(self, name):
+        self.name = name
+        match = NAME_RE.match(name)
+        self.version = match.group('version')
+        self.public_id = match.group('public_id')
+        self.format = match.group('format')
+
+    @property
+    def filename(self):
+        return f'{self.public_id}.{self.format}' if self.format else self.public_id
+
+    @property
+    def url(self):
+        return get_image_storage().url(self)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<StoredImage: {self.name}>'
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def __eq__(self, other):
+        if isinstance(other, StoredImage):
+            return self.name == other.name
+        return self.name == other
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class StoredImageDescriptor(DeferredAttribute):
+    def __set__(self, instance, value):
+        if value is not None and not isinstance(value, StoredImage):
+            value = StoredImage(value)
+        instance.__dict__[self.field.attname] = value
+
+
+class StoredImageField(models.CharField):
+    """A ``CharField`` of stored image names, read back as ``StoredImage``"""
+    descriptor_class = StoredImageDescriptor
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 255)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, StoredImage):
+            return value
+        return StoredImage(str(value))
+
+    def get_prep_value(self, value):
+        return None if value is None else str(value)
+
+
+class CloudinaryImageStorage:
+    """Cloudinary, configured from ``settings.CLOUDINARY``"""
+
+    def __init__(self):
+        import cloudinary
+
+        options = getattr(settings, 'CLOUDINARY', {})
+        if not options.get('cloud_name'):
+            raise ImproperlyConfigured('CLOUDINARY needs a cloud_name')
+        cloudinary.config(**options)
+
+    def save(self, uploaded_file, folder=''):
+        import cloudinary.uploader
+
+        options = {'folder': folder} if folder else {}
+        result = cloudinary.uploader.upload(uploaded_file, resource_type='image', **options)
+        return f"image/upload/v{result['version']}/{result['public_id']}.{result['format']}"
+
+    def delete(self, public_id):
+        import cloudinary.uploader
+
+        result = cloudinary.uploader.destroy(public_id)
+        if result.get('result') not in ('ok', 'not found'):
+            raise RuntimeError(f"Cloudinary destroy failed for {public_id}: {result}")
+
+    def url(self, image):
+        from cloudinary import CloudinaryImage
+
+        return CloudinaryImage(image.public_id, format=image.format, version=image.version).url
+
+
+class LocalImageStorage:
+    """Files under ``MEDIA_ROOT/images``, named by a random public id"""
+    location = 'images'
+
+    def __init__(self):
+        self.storage = FileSystemStorage(
+            location=os.path.join(settings.MEDIA_ROOT, self.location),
+            base_url=settings.IMAGE_BASE_URL or f'{settings.MEDIA_URL}{self.location}/',
+        )
+
+    def save(self, uploaded_file, folder=''):
+        image = StoredImage(f'image/upload/{new_public_id(folder)}.{upload_format(uploaded_file)}')
+        self.storage.save(image.filename, uploaded_file)
+        return image.name
+
+    def delete(self, public_id):
+        directory, name = os.path.split(public_id)
+        if not self.storage.exists(directory or '.'):
+            return
+        for filename in self.storage.listdir(directory or '.')[1]:
+            if os.path.splitext(filename)[0] == name:
+                self.storage.delete(os.path.join(directory, filename))
+
+    def url(self, image):
+        return self.storage.url(image.filename)
+
+
+class S3ImageStorage:
+    """
+    An S3-compatible bucket, configured from ``settings.IMAGE_S3``. Objects
+    are keyed ``<prefix>/<public_id>.<format>``; set ``IMAGE_BASE_URL`` to
+    serve them from a CDN instead of the bucket endpoint.
+    """
+
+    def __init__(self):
+        self.options = dict(getattr(settings, 'IMAGE_S3', {}))
+        if not self.options.get('bucket'):
+            raise ImproperlyConfigured('IMAGE_S3 needs a bucket')
+        self.bucket = self.options['bucket']
+        self.prefix = self.options.get('prefix', 'images').strip('/')
+        endpoint = self.options.get('endpoint_url')
+        if settings.IMAGE_BASE_URL:
+            self.base_url = settings.IMAGE_BASE_URL.rstrip('/')
+        elif endpoint:
+            self.base_url = f"{endpoint.rstrip('/')}/{self.bucket}"
+        else:
+            region = self.options.get('region_name') or 'us-east-1'
+            self.base_url = f'https://{self.bucket}.s3.{region}.amazonaws.com'
+
+    @cached_property
+    def client(self):
+        import boto3
+
+        return boto3.client(
+            's3',
+            endpoint_url=self.options.get('endpoint_url'),
+            region_name=self.options.get('region_name'),
+            aws_access_key_id=self.options.get('access_key_id'),
+            aws_secret_access_key=self.options.get('secret_access_key'),
+        )
+
+    def key(self, filename):
+        return f'{self.prefix}/{filename}' if self.prefix else filename
+
+    def save(self, uploaded_file, folder=''):
+        image = StoredImage(f'image/upload/{new_public_id(folder)}.{upload_format(uploaded_file)}')
+        extra = {'ContentType': uploaded_file.content_type} if getattr(uploaded_file, 'content_type', None) else {}
+        uploaded_file.seek(0)
+        self.client.upload_fileobj(uploaded_file, self.bucket, self.key(image.filename), ExtraArgs=extra)
+        return image.name
+
+    def delete(self, public_id):
+        # The format is not part of the public id
+        listing = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self.key(public_id))
+        keys = [
+            {'Key': item['Key']} for item in listing.get('Contents', [])
+            if os.path.splitext(item['Key'])[0] == self.key(public_id)
+        ]
+        if keys:
+            self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': keys})
+
+    def url(self, image):
+        return f'{self.base_url}/{self.key(image.filename)}'
+
+
+@lru_cache(maxsize=1)
+def get_image_storage():
+    return import_string(settings.IMAGE_STORAGE)()
+
+
+@receiver(setting_changed)
+def reset_image_storage(setting, **kwargs):
+    if setting in ('IMAGE_STORAGE', 'IMAGE_BASE_URL', 'IMAGE_S3', 'CLOUDINARY', 'MEDIA_ROOT', 'MEDIA_URL'):
+        get_image_storage.cache_clear()
@@ -0,0 +1,165 @@
+"""
+Token-bucket throttles backed by the shared Django cache.
+
+Each scope is configured in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``
+with DRF's ``"<requests>/<period>"`` syntax: the bucket holds that many
+tokens and refills at the same average rate. User buckets use the scope
+name, IP buckets use ``"<scope>_ip"`` and fall back to the scope's rate.
+A scope without a configured rate is not throttled.
+
+Buckets live in the ``default`` cache, so point ``CACHE_URL`` at Redis in
+production to share limits between gunicorn workers. On Redis a bucket is
+read, refilled and spent by one Lua script, so concurrent requests on
+different workers cannot all take the same token. Other backends update
+buckets under a lock held by the process, which is exact for the
+per-process locmem cache only.
+"""
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS[1]: bucket; ARGV: capacity, refill per second, now, ttl.
+# Returns {allowed, seconds to wait}, as strings since Redis truncates numbers.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill)
+if tokens < 1 then
+    return {'0', tostring((1 - tokens) / refill)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {'1', '0'}
+"""
+
+_bucket_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Return ``(capacity, seconds)`` for a rate such as ``"10/min"``"""
+    if rate is None:
+        return None, None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache = default_cache
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+    # IP-keyed throttles can be checked before authentication
+    pre_auth = False
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_rate(self, scope):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        capacity, period = parse_rate(self.get_rate(scope))
+        if capacity is None:
+            return True
+
+        key = self.cache_format % {'scope': scope, 'ident': self.get_ident_key(request, view)}
+        if isinstance(self.cache, RedisCache):
+            allowed, wait = self.take_token_redis(key, capacity, period)
+        else:
+            with _bucket_lock:
+                allowed, wait = self.take_token(key, capacity, period)
+        self.wait_seconds = None if allowed else wait
+        return allowed
+
+    def take_token(self, key, capacity, period):
+        """Spend a token from the bucket at ``key``; ``(allowed, seconds to wait)``"""
+        refill_per_second = capacity / period
+        now = time.time()
+
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - updated) * refill_per_second)
+
+        if tokens < 1:
+            return False, (1 - tokens) / refill_per_second
+
+        # Expire idle buckets once they would have refilled anyway
+        self.cache.set(key, (tokens - 1, now), period)
+        return True, None
+
+    def take_token_redis(self, key, capacity, period):
+        """``take_token`` as one atomic script on the Redis server"""
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        # EVALSHA, loading the script on first use
+        take_token = client.register_script(TAKE_TOKEN_SCRIPT)
+        allowed, wait = take_token(keys=[key], args=[capacity, capacity / period, time.time(), period])
+        return allowed in (b'1', '1'), float(wait)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Buckets per authenticated user, per client IP for anonymous requests"""
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user_{request.user.pk}'
+        return f'ip_{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Buckets per client IP, honouring ``NUM_PROXIES`` like DRF's throttles"""
+    pre_auth = True
+
+    def get_rate(self, scope):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        return rates.get(f'{scope}_ip', rates.get(scope))
+
+    def get_ident_key(self, request, view):
+        return f'ip_{self.get_ident(request)}'
+
+
+ACTION_THROTTLES = [IPTokenBucketThrottle, UserTokenBucketThrottle]
+
+
+class PreAuthThrottleMixin:
+    """
+    Checks ``pre_auth`` throttles before authentication runs, so a client
+    over its IP limit is rejected without a JWKS lookup or Clerk API call.
+    The remaining throttles run at the usual point, after permissions.
+    """
+    # Set per action through ``@action(throttle_scope=...)``
+    throttle_scope = None
+
+    def initial(self, request, *args, **kwargs):
+        self._check_throttles(request, pre_auth=True)
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        self._check_throttles(request, pre_auth=False)
+
+    def _check_throttles(self, request, pre_auth):
+        durations = [
+            throttle.wait()
+            for throttle in self.get_throttles()
+            if getattr(throttle, 'pre_auth', False) == pre_auth
+            and not throttle.allow_request(request, self)
+        ]
+        if durations:
+            self.throttled(request, max((d for d in durations if d is not None), default=None))
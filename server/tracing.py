@@ -0,0 +1,291 @@
+"""
+Lightweight request tracing.
+
+Spans are opened with the ``span()`` context manager and collected per
+trace. When the root span finishes, the whole trace is handed to the
+configured exporter in one call. Sampling is decided once per trace, so an
+unsampled request pays for little more than a context variable lookup.
+
+Configuration lives in ``settings.TRACING``::
+
+    TRACING = {
+        'SAMPLE_RATE': 0.1,
+        'EXPORTER': 'server.tracing.FileExporter',
+        'FILE_PATH': '/var/log/meetula/traces.jsonl',
+    }
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_current_span = ContextVar('current_span', default=None)
+
+
+def get_tracing_setting(name, default=None):
+    return getattr(settings, 'TRACING', {}).get(name, default)
+
+
+class Span:
+    sampled = True
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.children = []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+        }
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class _NoopSpan:
+    """Stands in for every span of an unsampled trace"""
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def traceparent(self):
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _parse_traceparent(header):
+    """Return ``(trace_id, parent_id, sampled)`` from a W3C traceparent header"""
+    try:
+        _version, trace_id, parent_id, flags = header.split('-')
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _should_sample(remote=None):
+    """
+    Sample when the local rate allows it. An upstream sampled flag is only
+    followed while tracing is enabled, so clients cannot switch it on.
+    """
+    rate = get_tracing_setting('SAMPLE_RATE', 0.0)
+    if rate <= 0:
+        return False
+    if remote:
+        return remote[2]
+    return random.random() < rate
+
+
+@contextmanager
+def span(name, traceparent=None, **attributes):
+    """
+    Time a block of work as a span of the current trace.
+
+    Outside an active trace a new root span is started and the sampling
+    decision is made here; ``traceparent`` lets a root span continue a
+    trace started by an upstream service.
+    """
+    parent = _current_span.get()
+
+    if parent is NOOP_SPAN:
+        yield NOOP_SPAN
+        return
+
+    if parent is None:
+        remote = _parse_traceparent(traceparent)
+        if not _should_sample(remote):
+            token = _current_span.set(NOOP_SPAN)
+            try:
+                yield NOOP_SPAN
+            finally:
+                _current_span.reset(token)
+            return
+        trace_id, parent_id = (remote[0], remote[1]) if remote else (uuid.uuid4().hex, None)
+    else:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set_attribute('error', repr(e))
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        if parent is None:
+            get_exporter().export(_flatten(current))
+        else:
+            parent.children.append(current)
+
+
+def _flatten(root):
+    spans = [root]
+    for child in root.children:
+        spans.extend(_flatten(child))
+    return spans
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+class ConsoleExporter:
+    """Writes each finished span as one JSON log line"""
+
+    def export(self, spans):
+        for finished in spans:
+            logger.info(json.dumps(finished.to_dict(), default=str))
+
+
+class FileExporter:
+    """Appends finished spans to a JSON-lines file"""
+
+    def __init__(self):
+        self.path = get_tracing_setting('FILE_PATH', 'traces.jsonl')
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(finished.to_dict(), default=str) + '\n' for finished in spans)
+        with self._lock, open(self.path, 'a') as handle:
+            handle.write(lines)
+
+
+@lru_cache(maxsize=1)
+def get_exporter():
+    return import_string(get_tracing_setting('EXPORTER', 'server.tracing.ConsoleExporter'))()
+
+
+def _db_span(execute, sql, params, many, context):
+    with span('db.query', sql=sql[:500], many=many):
+        return execute(sql, params, many, context)
+
+
+class TracingMiddleware:
+    """
+    Opens the root span of each request and traces its ORM queries.
+    Works in both the WSGI and ASGI handlers; under ASGI, queries run on
+    sync_to_async threads and are not traced individually.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _root_span(self, request):
+        return span(
+            'http.request',
+            traceparent=request.headers.get('traceparent'),
+            method=request.method,
+            path=request.path,
+        )
+
+    def _finish(self, root, response):
+        root.set_attribute('status', response.status_code)
+        response['traceparent'] = root.traceparent()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self._root_span(request) as root:
+            if not root.sampled:
+                return self.get_response(request)
+
+            with connection.execute_wrapper(_db_span):
+                response = self.get_response(request)
+            return self._finish(root, response)
+
+    async def __acall__(self, request):
+        with self._root_span(request) as root:
+            response = await self.get_response(request)
+            if not root.sampled:
+                return response
+            return self._finish(root, response)
+
+
+class TracedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with span('serializer.render', serializer=type(self.child).__name__, many=True):
+            return super().data
+
+
+class TracedSerializerMixin:
+    """
+    Records a span around top-level serializer rendering. Pair it with
+    ``list_serializer_class = TracedListSerializer`` on the Meta to cover
+    ``many=True`` as well.
+    """
+
+    @property
+    def data(self):
+        with span('serializer.render', serializer=type(self).__name__):
+            return super().data
+
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats log records as JSON, tagged with the active trace if any"""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update({
+            key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        })
+        active = current_span()
+        if active.sampled:
+            payload['trace_id'] = active.trace_id
+            payload['span_id'] = active.span_id
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
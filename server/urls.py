@@ -18,12 +18,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from .batch import BatchView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('events.urls')),
     path('api/', include('group.urls')),
     path('api/', include('authentication.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
 
 # Add this if you need to serve media files during development
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at',)
+    exclude = ('payload',)
+    actions = ['retry']
+
+    @admin.action(description='Queue selected tasks again')
+    def retry(self, request, queryset):
+        queryset.update(status=Task.QUEUED, attempts=0, run_at=timezone.now())
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from taskqueue.queue import POLL_INTERVAL, run_pending, start_workers
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Worker threads')
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true', help='Run every due task, then exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            ran = run_pending()
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} tasks'))
+            return
+
+        stop, threads = start_workers(options['concurrency'], options['poll_interval'])
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        self.stdout.write(f"Started {len(threads)} workers")
+        # Wake up periodically so signals are handled promptly
+        while not stop.wait(1):
+            pass
+        for thread in threads:
+            # Let each worker finish the task it is running
+            thread.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -0,0 +1,151 @@
+"""
+Background tasks stored in Postgres.
+
+Register a function with ``@task`` in an app's ``tasks.py`` and call
+``func.delay(**kwargs)`` from a view. The task row is written in the
+caller's transaction, so it only becomes visible to workers if that
+transaction commits. ``manage.py run_workers`` runs the queue.
+
+Each worker claims one due row with ``SELECT ... FOR UPDATE SKIP LOCKED``
+and runs the task inside that transaction: concurrent workers never pick
+the same row, and if a worker dies mid-task its lock is released and the
+row is picked up again. Failures are retried with exponential backoff up to
+``max_attempts``. A task may therefore run more than once and should be
+safe to repeat.
+
+Set ``TASKS['EAGER']`` to run tasks in-process right after the enqueuing
+transaction commits, e.g. in development without a worker.
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from server.tracing import span
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 10
+POLL_INTERVAL = 1.0
+
+_registry = {}
+
+
+def get_task_setting(name, default=None):
+    return getattr(settings, 'TASKS', {}).get(name, default)
+
+
+def task(func=None, *, name=None, max_attempts=5):
+    """Register ``func`` as a task and give it ``func.delay(payload=None, **kwargs)``"""
+
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+
+        def delay(payload=None, **kwargs):
+            return enqueue(task_name, kwargs, payload=payload, max_attempts=max_attempts)
+
+        func.task_name = task_name
+        func.delay = delay
+        _registry[task_name] = func
+        return func
+
+    return register(func) if func is not None else register
+
+
+def enqueue(name, kwargs=None, payload=None, max_attempts=5, run_at=None):
+    queued = Task.objects.create(
+        name=name,
+        kwargs=kwargs or {},
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if get_task_setting('EAGER', False):
+        transaction.on_commit(lambda: run_next(task_id=queued.pk))
+    return queued
+
+
+def _backoff(attempts):
+    return timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def run_next(task_id=None):
+    """
+    Claim and run one due task. Returns False when there was none.
+    """
+    with transaction.atomic():
+        due = Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.QUEUED, run_at__lte=timezone.now()
+        )
+        if task_id is not None:
+            due = due.filter(pk=task_id)
+        queued = due.order_by('run_at', 'id').first()
+        if queued is None:
+            return False
+
+        try:
+            func = _registry.get(queued.name)
+            if func is None:
+                raise LookupError(f'No task registered as {queued.name}')
+            kwargs = dict(queued.kwargs)
+            if queued.payload is not None:
+                kwargs['payload'] = bytes(queued.payload)
+            # The task's own writes roll back on failure; the retry bookkeeping does not
+            with transaction.atomic(), span('task.run', task=queued.name, attempt=queued.attempts + 1):
+                func(**kwargs)
+        except Exception:
+            queued.attempts += 1
+            queued.last_error = traceback.format_exc()[-4000:]
+            if queued.attempts >= queued.max_attempts:
+                queued.status = Task.FAILED
+                logger.exception("Task failed", extra={'task': queued.name, 'task_id': queued.pk})
+            else:
+                queued.run_at = timezone.now() + _backoff(queued.attempts)
+                logger.warning("Task will be retried", extra={
+                    'task': queued.name, 'task_id': queued.pk, 'attempts': queued.attempts,
+                })
+            queued.save(update_fields=['attempts', 'last_error', 'status', 'run_at'])
+        else:
+            queued.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Run due tasks until the queue is empty; returns how many ran"""
+    ran = 0
+    while (limit is None or ran < limit) and run_next():
+        ran += 1
+    return ran
+
+
+def work(stop, poll_interval=POLL_INTERVAL):
+    """Worker loop: run tasks until ``stop`` (a threading.Event) is set"""
+    try:
+        while not stop.is_set():
+            try:
+                if not run_next():
+                    stop.wait(poll_interval)
+            except Exception:
+                # Lost the database, say; back off and carry on
+                logger.exception("Worker loop error")
+                connection.close()
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def start_workers(count, poll_interval=POLL_INTERVAL):
+    """Start ``count`` worker threads, each with its own connection"""
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(stop, poll_interval), name=f'taskqueue-worker-{n}', daemon=True)
+        for n in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
@@ -0,0 +1,85 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import Task
+from .queue import run_next, run_pending, task
+
+calls = []
+
+
+@task(name='taskqueue.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.explode', max_attempts=2)
+def explode():
+    Task.objects.create(name='written-by-failing-task')
+    raise ValueError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs_then_deletes(self):
+        record.delay(value=1)
+        record.delay(value=2)
+
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_rolled_back_enqueue_never_runs(self):
+        with transaction.atomic():
+            record.delay(value=1)
+            transaction.set_rollback(True)
+
+        self.assertFalse(run_next())
+
+    def test_failures_back_off_then_fail(self):
+        queued = explode.delay()
+
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            self.assertTrue(run_next())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.QUEUED, 1))
+        self.assertGreater(queued.run_at, timezone.now())
+        # The failing task's own writes were rolled back
+        self.assertFalse(Task.objects.filter(name='written-by-failing-task').exists())
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            run_next()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+        self.assertIn('ValueError: boom', queued.last_error)
+        self.assertFalse(run_next())
+
+
+class SkipLockedTests(TransactionTestCase):
+    def test_workers_skip_rows_claimed_by_another(self):
+        queued = record.delay(value=1)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Task.objects.select_for_update().get(pk=queued.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(5)
+        try:
+            self.assertFalse(run_next())
+        finally:
+            release.set()
+            holder.join()
+        self.assertTrue(run_next())